@@ -0,0 +1,133 @@
+"""
+Import-time regression benchmark for the ML command line entry points
+Times `<script> --help` in fresh interpreters and checks that heavy dependencies are not loaded at import
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+ML_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Scripts (relative to ml/) that should start without loading heavy dependencies
+ENTRY_POINTS = [
+    'training/train_vertex.py',
+    'training/train_local.py',
+    'preprocessing/pose_processor.py',
+    'data_collection/video_collector.py',
+    'data_collection/metadata_store.py',
+    'retrieval/pose_index.py',
+    'benchmarks/tflite_benchmark.py',
+    'benchmarks/pose_benchmark.py',
+]
+
+# Modules that only the stage which needs them may import
+HEAVY_MODULES = [
+    'tensorflow',
+    'matplotlib',
+    'sklearn',
+    'cv2',
+    'mediapipe',
+    'pandas',
+    'pyarrow',
+    'google.cloud.storage',
+    'google.cloud.aiplatform',
+    'google.cloud.videointelligence_v1',
+    'pytube',
+    'youtube_search',
+]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Runs the script's module body (not its __main__ block) and reports heavy modules
+_CHECK_SNIPPET = """
+import sys, json, runpy
+runpy.run_path(sys.argv[1], run_name='import_check')
+print(json.dumps([m for m in json.loads(sys.argv[2]) if m in sys.modules]))
+"""
+
+def time_help(script, runs=5):
+    """Median wall time of `python <script> --help` over several fresh interpreters"""
+    samples = []
+    returncode = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, script, '--help'], cwd=ML_ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        samples.append(time.perf_counter() - start)
+        returncode = returncode or result.returncode
+        if result.returncode:
+            print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"{script} --help failed")
+            break
+    return statistics.median(samples), returncode
+
+def import_profile(script, top=10):
+    """Import a script's module body under -X importtime
+
+    Returns:
+        (heavy modules loaded, top-level imports sorted by cumulative microseconds)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHECK_SNIPPET, script, json.dumps(HEAVY_MODULES)],
+        cwd=ML_ROOT, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(f"Importing {script} failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Only count top-level imports (no extra indentation) so nothing is counted twice
+        if match and len(match.group(3)) <= 1:
+            imports.append({'module': match.group(4), 'cumulative_ms': int(match.group(2)) / 1000})
+    imports.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+
+    heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return heavy, imports[:top]
+
+def run_benchmark(scripts, runs=5, budget_seconds=0.5):
+    """Benchmark every script and flag those over budget or loading heavy modules"""
+    results = []
+    for script in scripts:
+        help_seconds, returncode = time_help(script, runs)
+        heavy, top_imports = import_profile(script)
+        passed = returncode == 0 and help_seconds <= budget_seconds and not heavy
+        results.append({
+            'script': script,
+            'help_seconds': help_seconds,
+            'heavy_modules_loaded': heavy,
+            'slowest_imports': top_imports,
+            'passed': passed,
+        })
+        status = 'ok' if passed else 'FAIL'
+        heavy_note = f", loads {', '.join(heavy)}" if heavy else ''
+        print(f"[{status}] {script}: --help in {help_seconds * 1000:.0f} ms{heavy_note}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check CLI startup time of the ML entry points')
+    parser.add_argument('--scripts', nargs='+', default=ENTRY_POINTS,
+                        help='Scripts to check, relative to ml/')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Interpreter launches per script (the median is reported)')
+    parser.add_argument('--budget-seconds', type=float, default=0.5,
+                        help='Maximum allowed --help wall time per script')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scripts, args.runs, args.budget_seconds)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'budget_seconds': args.budget_seconds, 'results': results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    failed = [r['script'] for r in results if not r['passed']]
+    if failed:
+        print(f"{len(failed)} entry points over budget or loading heavy modules: {', '.join(failed)}")
+        sys.exit(1)
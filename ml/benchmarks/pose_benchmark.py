@@ -0,0 +1,234 @@
+"""
+Throughput benchmark for MediaPipe pose landmark extraction
+Runs pose_processor's detector over a fixed clip under a grid of settings and reports frames/sec,
+per-frame latency percentiles, CPU utilization and peak memory as JSON
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from common.profiling import peak_rss_mb, latency_percentiles
+
+def make_synthetic_clip(path, seconds=10, fps=30, width=1280, height=720):
+    """Render a deterministic clip of a figure doing squats with OpenCV
+
+    A drawn figure exercises decoding, resizing and the detector at a fixed
+    cost, but MediaPipe may not find a pose in it; pass a recorded clip with
+    --clip to benchmark the full landmark path.
+    """
+    import cv2
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+
+    rng = np.random.default_rng(42)
+    background = rng.integers(90, 140, size=(height, width, 3), dtype=np.uint8)
+    unit = height / 10
+    cx = width // 2
+    for i in range(int(seconds * fps)):
+        depth = (1 - np.cos(2 * np.pi * i / (2 * fps))) / 2  # one squat every two seconds
+        frame = background.copy()
+        hip_y = int(4.5 * unit + depth * 1.5 * unit)
+        knee_x = int(0.8 * unit + depth * 0.6 * unit)
+        points = {
+            'head': (cx, int(1.5 * unit + depth * 1.5 * unit)),
+            'neck': (cx, int(2.3 * unit + depth * 1.5 * unit)),
+            'hip': (cx, hip_y),
+            'l_knee': (cx - knee_x, int(6.5 * unit + depth * 0.5 * unit)),
+            'r_knee': (cx + knee_x, int(6.5 * unit + depth * 0.5 * unit)),
+            'l_ankle': (cx - int(0.6 * unit), int(8.8 * unit)),
+            'r_ankle': (cx + int(0.6 * unit), int(8.8 * unit)),
+            'l_hand': (cx - int(1.8 * unit), int(3.2 * unit + depth * 1.5 * unit)),
+            'r_hand': (cx + int(1.8 * unit), int(3.2 * unit + depth * 1.5 * unit)),
+        }
+        limbs = [('neck', 'hip'), ('hip', 'l_knee'), ('hip', 'r_knee'), ('l_knee', 'l_ankle'),
+                 ('r_knee', 'r_ankle'), ('neck', 'l_hand'), ('neck', 'r_hand')]
+        for a, b in limbs:
+            cv2.line(frame, points[a], points[b], (40, 60, 200), int(unit * 0.35))
+        cv2.circle(frame, points['head'], int(unit * 0.6), (150, 180, 230), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def write_jpeg_frames(video_path, output_dir, fps=None):
+    """Decode a clip into numbered JPEGs, the layout process_frames reads"""
+    import cv2
+    from preprocessing.pose_processor import iter_video_frames
+
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    for i, _, img in iter_video_frames(video_path, fps):
+        cv2.imwrite(os.path.join(output_dir, f"{i + 1:04d}.jpg"), img)
+        count += 1
+    return count
+
+def count_video_frames(video_path, fps=None):
+    from preprocessing.pose_processor import iter_video_frames
+    return sum(1 for _ in iter_video_frames(video_path, fps))
+
+def _run_worker(source, input_mode, start, count, fps, model_complexity, static_image_mode, resize_width):
+    """Extract landmarks from frames [start, start + count) of a clip or JPEG folder
+
+    Runs in its own process; timing starts after the detector is created.
+    """
+    import cv2
+    from preprocessing.pose_processor import create_pose, detect_landmarks, iter_video_frames
+
+    pose = create_pose(model_complexity, static_image_mode)
+    latencies = []
+    detected = 0
+
+    if input_mode == 'jpeg':
+        paths = [os.path.join(source, f"{i + 1:04d}.jpg") for i in range(start, start + count)]
+        frames = ((i, None, path) for i, path in enumerate(paths))
+    else:
+        frames = iter_video_frames(source, fps, start_sample=start, max_frames=count)
+
+    wall_start = time.time()
+    cpu_start = time.process_time()
+    frame_start = time.perf_counter()
+    for _, _, item in frames:
+        img = cv2.imread(item) if input_mode == 'jpeg' else item
+        if detect_landmarks(pose, img, resize_width):
+            detected += 1
+        now = time.perf_counter()
+        # Per-frame latency covers reading/decoding the frame and inference
+        latencies.append((now - frame_start) * 1000)
+        frame_start = now
+    cpu_seconds = time.process_time() - cpu_start
+    wall_end = time.time()
+    pose.close()
+
+    return {
+        'latencies_ms': latencies,
+        'detected': detected,
+        'cpu_seconds': cpu_seconds,
+        'wall_start': wall_start,
+        'wall_end': wall_end,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def run_setting(clip_path, jpeg_dir, num_frames, fps, model_complexity, mode, resize_width, workers, input_mode):
+    """Benchmark one combination of settings"""
+    source = jpeg_dir if input_mode == 'jpeg' else clip_path
+    chunk = int(np.ceil(num_frames / workers))
+    jobs = [(source, input_mode, start, min(chunk, num_frames - start), fps, model_complexity,
+             mode == 'static', resize_width or None)
+            for start in range(0, num_frames, chunk)]
+
+    # A fresh spawn pool per setting keeps peak memory measurements independent
+    with ProcessPoolExecutor(max_workers=len(jobs), mp_context=multiprocessing.get_context('spawn')) as pool:
+        results = list(pool.map(_run_worker, *zip(*jobs)))
+
+    latencies = np.concatenate([r['latencies_ms'] for r in results])
+    wall = max(r['wall_end'] for r in results) - min(r['wall_start'] for r in results)
+    cpu_seconds = sum(r['cpu_seconds'] for r in results)
+    return {
+        'model_complexity': model_complexity,
+        'mode': mode,
+        'resize_width': resize_width or None,
+        'workers': len(jobs),
+        'input': input_mode,
+        'frames': int(len(latencies)),
+        'frames_with_pose': sum(r['detected'] for r in results),
+        'wall_seconds': wall,
+        'frames_per_second': len(latencies) / wall if wall > 0 else 0.0,
+        'latency': latency_percentiles(latencies),
+        'cpu_seconds': cpu_seconds,
+        # Cores kept busy on average; divide by the core count for machine utilization
+        'cpu_utilization': cpu_seconds / wall if wall > 0 else 0.0,
+        'peak_rss_mb_per_worker': max(r['peak_rss_mb'] or 0 for r in results),
+        'peak_rss_mb_total': sum(r['peak_rss_mb'] or 0 for r in results),
+    }
+
+def run_benchmark(clip_path, fps=None, complexities=(0, 1, 2), modes=('static', 'tracking'),
+                  widths=(0,), workers=(1,), inputs=('video', 'jpeg')):
+    """Run every combination of settings over one clip"""
+    num_frames = count_video_frames(clip_path, fps)
+    if num_frames == 0:
+        raise ValueError(f"No frames decoded from {clip_path}")
+
+    jpeg_dir = None
+    if 'jpeg' in inputs:
+        jpeg_dir = tempfile.mkdtemp(prefix="pose_benchmark_")
+        write_jpeg_frames(clip_path, jpeg_dir, fps)
+
+    results = []
+    try:
+        for complexity, mode, width, worker_count, input_mode in itertools.product(
+                complexities, modes, widths, workers, inputs):
+            result = run_setting(clip_path, jpeg_dir, num_frames, fps, complexity, mode, width,
+                                 worker_count, input_mode)
+            results.append(result)
+            print(f"complexity={complexity} mode={mode} width={width or 'native'} workers={worker_count} "
+                  f"input={input_mode}: {result['frames_per_second']:.1f} frames/s, "
+                  f"p50 {result['latency']['p50_ms']:.1f} ms, p99 {result['latency']['p99_ms']:.1f} ms, "
+                  f"{result['cpu_utilization']:.2f} cores, {result['peak_rss_mb_per_worker']:.0f} MB/worker")
+    finally:
+        if jpeg_dir:
+            shutil.rmtree(jpeg_dir)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark MediaPipe pose extraction throughput')
+    parser.add_argument('--clip', type=str, default=None,
+                        help='Video to benchmark on (a synthetic clip is generated if omitted)')
+    parser.add_argument('--seconds', type=float, default=10,
+                        help='Length of the synthetic clip')
+    parser.add_argument('--resolution', type=str, default='1280x720',
+                        help='Resolution of the synthetic clip (WIDTHxHEIGHT)')
+    parser.add_argument('--fps', type=float, default=None,
+                        help='Sample the clip down to this frame rate (as extract_frames does); default all frames')
+    parser.add_argument('--complexities', type=int, nargs='+', default=[0, 1, 2],
+                        help='MediaPipe model_complexity values')
+    parser.add_argument('--modes', nargs='+', choices=['static', 'tracking'], default=['static', 'tracking'],
+                        help='static_image_mode=True (static) or False (tracking)')
+    parser.add_argument('--widths', type=int, nargs='+', default=[0],
+                        help='Input widths to downscale to before detection (0 = native)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help='Worker process counts')
+    parser.add_argument('--inputs', nargs='+', choices=['video', 'jpeg'], default=['video', 'jpeg'],
+                        help='Decode the video directly or read a JPEG frame folder')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    temp_dir = None
+    clip_path = args.clip
+    if clip_path is None:
+        width, height = (int(v) for v in args.resolution.lower().split('x'))
+        temp_dir = tempfile.mkdtemp(prefix="pose_clip_")
+        clip_path = make_synthetic_clip(os.path.join(temp_dir, 'synthetic.mp4'), args.seconds,
+                                        width=width, height=height)
+        print(f"Generated synthetic clip {clip_path}")
+
+    try:
+        results = run_benchmark(clip_path, args.fps, args.complexities, args.modes, args.widths,
+                                args.workers, args.inputs)
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir)
+
+    report = {
+        'clip': args.clip or f"synthetic {args.resolution} {args.seconds}s",
+        'fps': args.fps,
+        'cpu_count': os.cpu_count(),
+        'peak_rss_mb_main': peak_rss_mb(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,185 @@
+"""
+Benchmarks inference cost of exported TFLite knee exercise models
+Replays landmark windows (recorded or synthetic) through tf.lite.Interpreter on CPU
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from training.train_local import load_config
+from training.windows import load_landmark_windows
+from common.profiling import peak_rss_mb, latency_percentiles
+
+def load_interpreter(model_path, num_threads=1):
+    """Create a CPU TFLite interpreter for a model file"""
+    import tensorflow as tf
+    return tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+
+def synthetic_windows(config, num_windows=256, seed=42):
+    """Generate random landmark windows shaped like real training input"""
+    rng = np.random.default_rng(seed)
+    num_features = config['num_landmarks'] * config['landmark_dims']
+    return rng.random((num_windows, config['sequence_length'], num_features), dtype=np.float32)
+
+def recorded_windows(config, landmarks_dir, max_windows=256):
+    """Load landmark windows from recorded parquet files"""
+    windows = load_landmark_windows(landmarks_dir, config['sequence_length'], max_windows=max_windows)
+    if not windows:
+        raise ValueError(f"No {config['sequence_length']}-frame windows found in {landmarks_dir}")
+    return np.concatenate([w for _, w in windows]).astype(np.float32)
+
+def _prepare(interpreter, batch_size, window_shape):
+    """Resize the input tensor for a batch size and allocate buffers"""
+    input_index = interpreter.get_input_details()[0]['index']
+    interpreter.resize_tensor_input(input_index, [batch_size, *window_shape])
+    interpreter.allocate_tensors()
+    return input_index, interpreter.get_output_details()[0]['index']
+
+def _run(interpreter, input_index, output_index, batch):
+    """Run one inference and return the output"""
+    interpreter.set_tensor(input_index, batch)
+    interpreter.invoke()
+    return interpreter.get_tensor(output_index)
+
+def benchmark_model(model_path, windows, num_threads=1, runs=200, warmup_runs=10,
+                    batch_sizes=(8, 32)):
+    """Measure load, warm-up, single-window latency and batched throughput
+
+    Args:
+        model_path: Path to a .tflite model
+        windows: Array of shape (num_windows, sequence_length, features)
+        num_threads: Interpreter CPU threads
+        runs: Timed single-window invocations
+        warmup_runs: Untimed invocations before measuring latency
+        batch_sizes: Batch sizes to measure throughput for
+
+    Returns:
+        Dictionary of results, suitable for JSON output
+    """
+    print(f"Benchmarking {model_path} ({num_threads} threads)...")
+    window_shape = windows.shape[1:]
+    result = {
+        'model': os.path.basename(model_path),
+        'model_size_mb': os.path.getsize(model_path) / (1024 * 1024),
+        'num_threads': num_threads,
+    }
+
+    # Load and allocate
+    start = time.perf_counter()
+    interpreter = load_interpreter(model_path, num_threads)
+    input_index, output_index = _prepare(interpreter, 1, window_shape)
+    result['load_ms'] = (time.perf_counter() - start) * 1000
+
+    # First invocation pays for lazy kernel setup
+    start = time.perf_counter()
+    _run(interpreter, input_index, output_index, windows[:1])
+    result['first_inference_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for i in range(warmup_runs):
+        _run(interpreter, input_index, output_index, windows[i % len(windows)][None])
+    result['warmup_ms'] = (time.perf_counter() - start) * 1000
+
+    # Single-window latency
+    latencies = []
+    for i in range(runs):
+        window = windows[i % len(windows)][None]
+        start = time.perf_counter()
+        _run(interpreter, input_index, output_index, window)
+        latencies.append((time.perf_counter() - start) * 1000)
+    result['latency'] = latency_percentiles(latencies)
+
+    # Batched throughput
+    result['throughput'] = {}
+    for batch_size in batch_sizes:
+        try:
+            input_index, output_index = _prepare(interpreter, batch_size, window_shape)
+        except (RuntimeError, ValueError) as e:
+            print(f"Batch size {batch_size} not supported by {model_path}: {e}")
+            continue
+
+        num_batches = max(len(windows) // batch_size, 1)
+        batches = [np.resize(windows[i * batch_size:(i + 1) * batch_size], (batch_size, *window_shape))
+                   for i in range(num_batches)]
+        _run(interpreter, input_index, output_index, batches[0])
+
+        iterations = max(runs // batch_size, 1) * num_batches
+        start = time.perf_counter()
+        for i in range(iterations):
+            _run(interpreter, input_index, output_index, batches[i % num_batches])
+        elapsed = time.perf_counter() - start
+        result['throughput'][str(batch_size)] = {
+            'windows_per_sec': iterations * batch_size / elapsed,
+            'batch_latency_ms': elapsed / iterations * 1000,
+        }
+
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def compare_models(model_paths, windows, **kwargs):
+    """Benchmark several models with the same windows and print a summary table
+
+    Each model runs in a fresh process, since peak RSS is a process-wide
+    high-water mark and would otherwise carry over from earlier models.
+    """
+    results = []
+    for path in model_paths:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results.append(pool.submit(benchmark_model, path, windows, **kwargs).result())
+
+    print("\n" + "=" * 80)
+    print(f"{'model':<40} {'p50 ms':>8} {'p99 ms':>8} {'warm-up ms':>11} {'size MB':>8}")
+    for r in results:
+        print(f"{r['model']:<40} {r['latency']['p50_ms']:>8.3f} {r['latency']['p99_ms']:>8.3f} "
+              f"{r['first_inference_ms'] + r['warmup_ms']:>11.1f} {r['model_size_mb']:>8.2f}")
+    print("=" * 80 + "\n")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark TFLite knee exercise models')
+    parser.add_argument('--models', nargs='+', default=None,
+                        help='TFLite model paths (defaults to the latest in ml/models)')
+    parser.add_argument('--config', default='ml/training/config.yaml', help='Config file path')
+    parser.add_argument('--landmarks-dir', default=None,
+                        help='Replay windows from landmark parquet files instead of synthetic data')
+    parser.add_argument('--num-windows', type=int, default=256, help='Number of windows to replay')
+    parser.add_argument('--threads', type=int, default=1, help='Interpreter CPU threads')
+    parser.add_argument('--runs', type=int, default=200, help='Timed single-window runs')
+    parser.add_argument('--warmup-runs', type=int, default=10, help='Untimed warm-up runs')
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[8, 32],
+                        help='Batch sizes to measure throughput for')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+
+    model_paths = args.models
+    if not model_paths:
+        model_paths = sorted(glob.glob('ml/models/knee_exercise_model_*.tflite'))[-1:]
+    if not model_paths:
+        parser.error("No models given and none found in ml/models")
+
+    if args.landmarks_dir:
+        windows = recorded_windows(config, args.landmarks_dir, args.num_windows)
+    else:
+        windows = synthetic_windows(config, args.num_windows)
+
+    results = compare_models(
+        model_paths, windows,
+        num_threads=args.threads,
+        runs=args.runs,
+        warmup_runs=args.warmup_runs,
+        batch_sizes=args.batch_sizes
+    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
@@ -0,0 +1,190 @@
+"""
+Lightweight stage timing for the ML pipeline
+Records wall time, CPU time, peak RSS and items/sec per named stage and writes a JSON report
+"""
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def latency_percentiles(samples_ms):
+    """Summarize latency samples in milliseconds"""
+    import numpy as np
+
+    samples = np.asarray(samples_ms)
+    return {
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p90_ms': float(np.percentile(samples, 90)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'max_ms': float(samples.max()),
+    }
+
+class StageRecord:
+    """Handle yielded by Profiler.stage; set or add to items to report throughput"""
+
+    def __init__(self, items=None):
+        self.items = items
+
+    def add(self, count=1):
+        self.items = (self.items or 0) + count
+
+class Profiler:
+    """Aggregates timings per stage name
+
+    Stages may nest and repeat (e.g. once per frame); repeated stages are
+    summed. CPU time is process-wide, so stages running alongside other
+    threads include those threads' CPU as well.
+
+    Args:
+        enabled: When False, stage() costs a single attribute check
+        cprofile: Also run cProfile for the whole session and add the top functions to the report
+    """
+
+    def __init__(self, enabled=True, cprofile=False):
+        self.enabled = enabled
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._cprofile = None
+        if enabled and cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """Time a block of code under a stage name"""
+        record = StageRecord(items)
+        if not self.enabled:
+            yield record
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            with self._lock:
+                stats = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0,
+                                                      'cpu_seconds': 0.0, 'items': 0})
+                stats['calls'] += 1
+                stats['wall_seconds'] += wall
+                stats['cpu_seconds'] += cpu
+                stats['items'] += record.items or 0
+                stats['peak_rss_mb'] = peak_rss_mb()
+
+    def _hotspots(self, limit=25):
+        """Top functions by cumulative time from the cProfile session"""
+        import pstats
+
+        self._cprofile.disable()
+        stats = pstats.Stats(self._cprofile)
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'total_seconds': total,
+                'cumulative_seconds': cumulative,
+            })
+        self._cprofile.enable()
+        return sorted(rows, key=lambda row: row['cumulative_seconds'], reverse=True)[:limit]
+
+    def report(self):
+        """Return the report as a dictionary"""
+        with self._lock:
+            stages = {}
+            for name, stats in self.stages.items():
+                wall = stats['wall_seconds']
+                stages[name] = {
+                    **stats,
+                    'mean_ms': wall / stats['calls'] * 1000,
+                    'cpu_utilization': stats['cpu_seconds'] / wall if wall > 0 else 0.0,
+                    'items_per_second': stats['items'] / wall if wall > 0 and stats['items'] else None,
+                }
+
+        report = {
+            'total_wall_seconds': time.perf_counter() - self._start,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+        if self._cprofile is not None:
+            report['hotspots'] = self._hotspots()
+        return report
+
+    def write_report(self, path):
+        """Write the JSON report (and a .prof file next to it in cProfile mode)"""
+        report = self.report()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(os.path.splitext(path)[0] + '.prof')
+        print(f"Profiling report saved to {path}")
+        return report
+
+# Process-wide profiler used by the pipeline modules; disabled until configure() is called
+_profiler = Profiler(enabled=False)
+
+def configure(enabled=True, cprofile=False):
+    """Replace the process-wide profiler (call once from a CLI entry point)"""
+    global _profiler
+    _profiler = Profiler(enabled=enabled, cprofile=cprofile)
+    return _profiler
+
+def get_profiler():
+    return _profiler
+
+def stage(name, items=None):
+    """Time a block under the process-wide profiler"""
+    return _profiler.stage(name, items)
+
+def profiled(name=None, items=None):
+    """Decorator timing a function under the process-wide profiler
+
+    The profiler is looked up at call time, so configure() may run after decoration.
+    """
+    def decorator(fn):
+        stage_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            count = items(*args, **kwargs) if callable(items) else items
+            with _profiler.stage(stage_name, count):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def add_profiling_args(parser):
+    """Add --profile-report and --cprofile options to an argparse parser"""
+    parser.add_argument('--profile-report', type=str, default=None,
+                        help='Write per-stage timing, CPU and memory statistics to this JSON file')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='Also run cProfile and include the hottest functions in the report')
+
+def configure_from_args(args):
+    """Enable profiling if requested on the command line; returns the report path or None"""
+    if args.profile_report:
+        configure(enabled=True, cprofile=args.cprofile)
+    return args.profile_report
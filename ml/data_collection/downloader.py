@@ -0,0 +1,213 @@
+"""
+Concurrent, resumable, rate-limited downloads for the video collector
+The network layer (HttpTransport) is swappable so the scheduler can run against a local server
+"""
+import os
+import time
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MB = 1024 * 1024
+
+class PartialDownloadError(Exception):
+    """A fetch failed part way; bytes_transferred were already written to the .part file"""
+
+    def __init__(self, bytes_transferred, cause):
+        super().__init__(f"{cause} (after {bytes_transferred} bytes)")
+        self.bytes_transferred = bytes_transferred
+
+def _complete_size(error):
+    """Total object size from a 416 response's Content-Range (bytes */N), else None"""
+    content_range = error.headers.get('Content-Range', '') if error.headers else ''
+    if content_range.startswith('bytes */'):
+        try:
+            return int(content_range[len('bytes */'):])
+        except ValueError:
+            return None
+    return None
+
+class HttpTransport:
+    """Streams a URL to disk with HTTP range requests so interrupted downloads resume
+
+    Partial data is kept in <dest>.part until the download completes.
+    """
+
+    def __init__(self, timeout=30, block_size=1 * MB, user_agent='Mozilla/5.0'):
+        self.timeout = timeout
+        self.block_size = block_size
+        self.user_agent = user_agent
+
+    def _remote_size(self, url):
+        """Content-Length of url from a HEAD request, or None"""
+        request = urllib.request.Request(url, method='HEAD', headers={'User-Agent': self.user_agent})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                length = response.headers.get('Content-Length')
+                return int(length) if length else None
+        except (urllib.error.URLError, ValueError):
+            return None
+
+    def fetch(self, url, dest_path):
+        """Download url to dest_path, resuming a previous partial download
+
+        Returns:
+            Number of bytes transferred by this call
+        """
+        part_path = f"{dest_path}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+        headers = {'User-Agent': self.user_agent}
+        if offset:
+            headers['Range'] = f"bytes={offset}-"
+        request = urllib.request.Request(url, headers=headers)
+
+        transferred = 0
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                # Servers that ignore the range send the whole file again
+                mode = 'ab' if offset and response.status == 206 else 'wb'
+                with open(part_path, mode) as f:
+                    for block in iter(lambda: response.read(self.block_size), b''):
+                        f.write(block)
+                        transferred += len(block)
+                # A dropped connection can end the stream early without an error
+                expected = response.headers.get('Content-Length')
+                if expected and transferred < int(expected):
+                    raise ConnectionError(f"Connection closed after {transferred} of {expected} bytes")
+        except urllib.error.HTTPError as e:
+            # 416 for a range starting at the end: the .part file already holds the whole object
+            if not (e.code == 416 and offset and (_complete_size(e) or self._remote_size(url)) == offset):
+                raise
+        except Exception as e:
+            if not transferred:
+                raise
+            raise PartialDownloadError(transferred, e) from e
+
+        os.replace(part_path, dest_path)
+        return transferred
+
+class HostRateLimiter:
+    """Spaces out request starts to each host
+
+    Args:
+        requests_per_second: Maximum request rate per host (None or 0 disables limiting)
+    """
+
+    def __init__(self, requests_per_second=2.0):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until a request to url's host may start"""
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class DownloadReport:
+    """Thread-safe summary of a batch of downloads"""
+
+    def __init__(self):
+        self.completed = []
+        self.skipped = []
+        self.failures = {}
+        self.bytes = 0
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, key, num_bytes=0, skipped=False, error=None):
+        with self._lock:
+            if error is not None:
+                self.failures[key] = str(error)
+            elif skipped:
+                self.skipped.append(key)
+            else:
+                self.completed.append(key)
+                self.bytes += num_bytes
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self._start
+        return {
+            'completed': len(self.completed),
+            'skipped': len(self.skipped),
+            'failed': len(self.failures),
+            'bytes': self.bytes,
+            'elapsed_seconds': elapsed,
+            'bytes_per_second': self.bytes / elapsed if elapsed > 0 else 0.0,
+            'failures': self.failures,
+        }
+
+    def summary(self):
+        report = self.to_dict()
+        return (f"Downloaded {report['completed']} videos ({report['bytes'] / MB:.1f} MB) in "
+                f"{report['elapsed_seconds']:.1f}s ({report['bytes_per_second'] / MB:.2f} MB/s), "
+                f"{report['skipped']} already present, {report['failed']} failed")
+
+class ConcurrentDownloader:
+    """Runs download jobs on a bounded worker pool
+
+    Each job is a dict with:
+        key: Identifier used in the report
+        dest: Final file path (jobs whose dest exists are skipped)
+        resolve: Callable returning the URL to fetch (called in the worker,
+            so slow lookups such as stream resolution also run concurrently)
+        resolve_url: Optional URL the resolve step itself requests, for rate limiting
+        on_success: Optional callable(job) run after the file is complete
+    """
+
+    def __init__(self, workers=4, transport=None, rate_limiter=None, retries=2, backoff=1.0):
+        self.workers = workers
+        self.transport = transport or HttpTransport()
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+
+    def _download(self, job, report):
+        if os.path.exists(job['dest']):
+            report.add(job['key'], skipped=True)
+            return
+
+        # Bytes from failed attempts count too; resumed attempts build on them
+        num_bytes = 0
+        for attempt in range(self.retries + 1):
+            try:
+                if job.get('resolve_url'):
+                    self.rate_limiter.wait(job['resolve_url'])
+                url = job['resolve']()
+                self.rate_limiter.wait(url)
+                num_bytes += self.transport.fetch(url, job['dest'])
+                break
+            except Exception as e:
+                num_bytes += getattr(e, 'bytes_transferred', 0)
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+
+        if job.get('on_success'):
+            job['on_success'](job)
+        report.add(job['key'], num_bytes)
+
+    def run(self, jobs):
+        """Download all jobs and return a DownloadReport"""
+        report = DownloadReport()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._download, job, report): job for job in jobs}
+            for i, future in enumerate(as_completed(futures)):
+                job = futures[future]
+                try:
+                    future.result()
+                    print(f"[{i+1}/{len(jobs)}] {job['key']} done")
+                except Exception as e:
+                    print(f"[{i+1}/{len(jobs)}] Failed to download {job['key']}: {e}")
+                    report.add(job['key'], error=e)
+        print(report.summary())
+        return report
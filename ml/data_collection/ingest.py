@@ -0,0 +1,85 @@
+"""
+Content-addressed ingest of local video files
+Videos are named by a hash of their contents and placed with hardlinks or
+reflinks where the filesystem allows, so re-ingesting an archive is cheap
+"""
+import os
+import sys
+import errno
+import shutil
+import hashlib
+
+MB = 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: share extents between two files (btrfs, XFS, ...)
+
+def content_hash(path, sample_size=1 * MB, full=False):
+    """Fast content hash of a file
+
+    By default only the file size and three samples (start, middle, end) are
+    hashed, which costs three reads regardless of file size. Files smaller
+    than the samples combined are hashed in full.
+
+    Args:
+        path: File to hash
+        sample_size: Bytes read per sample
+        full: Hash the whole file instead of samples
+
+    Returns:
+        Hex digest (32 characters)
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode('ascii'))
+
+    with open(path, 'rb') as f:
+        if full or size <= 3 * sample_size:
+            for block in iter(lambda: f.read(4 * MB), b''):
+                digest.update(block)
+        else:
+            for offset in (0, (size - sample_size) // 2, size - sample_size):
+                f.seek(offset)
+                digest.update(f.read(sample_size))
+
+    return digest.hexdigest()
+
+def _reflink(source_path, target_path):
+    """Clone source_path into target_path with FICLONE; raises OSError if unsupported"""
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are only attempted on Linux")
+    import fcntl
+
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target_path)
+            raise
+    shutil.copystat(source_path, target_path)
+
+def link_or_copy(source_path, target_path, allow_links=True):
+    """Place source_path at target_path as cheaply as possible
+
+    Tries a hardlink, then a reflink, and only copies the data when neither
+    is supported (e.g. across filesystems).
+
+    Returns:
+        'hardlink', 'reflink' or 'copy'
+    """
+    if allow_links:
+        try:
+            os.link(source_path, target_path)
+            return 'hardlink'
+        except OSError:
+            pass
+        try:
+            _reflink(source_path, target_path)
+            return 'reflink'
+        except OSError:
+            pass
+
+    # Copy to a temporary name so an interrupted copy never looks complete
+    tmp_path = f"{target_path}.part"
+    shutil.copy2(source_path, tmp_path)
+    os.replace(tmp_path, target_path)
+    return 'copy'
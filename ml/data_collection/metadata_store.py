@@ -0,0 +1,213 @@
+"""
+Indexed SQLite catalog of collected videos for PhysioFlow
+Replaces per-video JSON sidecars as the source of labels during training
+"""
+import os
+import glob
+import json
+import time
+import sqlite3
+import threading
+
+CATALOG_FILENAME = 'metadata.db'
+DEFAULT_CATALOG_PATH = os.path.join('ml/data', CATALOG_FILENAME)
+
+# Title keywords for each exercise class, checked in order
+EXERCISE_KEYWORDS = [
+    ('squat', ('squat',)),
+    ('leg_raise', ('leg raise', 'straight leg')),
+    ('step_up', ('step up', 'step-up')),
+]
+
+# Values used in the status column
+STATUS_COLLECTED = 'collected'
+STATUS_LANDMARKS_EXTRACTED = 'landmarks_extracted'
+
+COLUMNS = (
+    'video_id', 'source', 'title', 'duration', 'label', 'status',
+    'url', 'search_term', 'source_path', 'content_hash', 'updated_at',
+)
+
+def resolve_exercise_label(title, default=None):
+    """Map a video title to an exercise class using keyword matching"""
+    title = (title or '').lower()
+    for label, keywords in EXERCISE_KEYWORDS:
+        if any(keyword in title for keyword in keywords):
+            return label
+    return default
+
+def catalog_path_for(videos_dir):
+    """Catalog location for a videos directory
+
+    The catalog sits next to the directory rather than inside it, so it is not
+    uploaded or processed along with the videos.
+    """
+    return os.path.join(os.path.dirname(os.path.normpath(videos_dir)), CATALOG_FILENAME)
+
+def label_from_sidecar(meta_file):
+    """Resolve the exercise label from a legacy *_meta.json sidecar, if present"""
+    if not os.path.exists(meta_file):
+        return None
+    with open(meta_file, 'r') as f:
+        meta = json.load(f)
+    return resolve_exercise_label(meta.get('title'))
+
+class VideoMetadataStore:
+    """SQLite-backed catalog keyed by video id (the video file name without extension)"""
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Shared between collector worker threads, so serialize access ourselves
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id TEXT PRIMARY KEY,
+                    source TEXT,
+                    title TEXT,
+                    duration TEXT,
+                    label TEXT,
+                    status TEXT,
+                    url TEXT,
+                    search_term TEXT,
+                    source_path TEXT,
+                    content_hash TEXT,
+                    updated_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_label ON videos(label)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_status ON videos(status)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_hash ON videos(content_hash)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+
+    def upsert_many(self, records):
+        """Insert or update video records
+
+        Fields missing from a record (or set to None) keep their stored value.
+        The label is resolved from the title when not given explicitly.
+        """
+        rows = []
+        now = time.time()
+        for record in records:
+            record = dict(record)
+            if record.get('label') is None and record.get('title'):
+                record['label'] = resolve_exercise_label(record['title'])
+            if record.get('duration') is not None:
+                record['duration'] = str(record['duration'])
+            record['updated_at'] = now
+            rows.append(tuple(record.get(column) for column in COLUMNS))
+
+        updates = ", ".join(f"{c} = COALESCE(excluded.{c}, {c})" for c in COLUMNS[1:])
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO videos ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                f"ON CONFLICT(video_id) DO UPDATE SET {updates}",
+                rows
+            )
+
+    def upsert(self, video_id, **fields):
+        """Insert or update a single video record"""
+        self.upsert_many([{'video_id': video_id, **fields}])
+
+    def get(self, video_id):
+        """Return a video record as a dictionary, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, content_hash):
+        """Return the record for a content hash, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM videos WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def labels_for(self, video_ids, chunk_size=500):
+        """Bulk lookup of resolved labels
+
+        Returns:
+            Dictionary of video_id -> label for videos that have one
+        """
+        video_ids = list(video_ids)
+        labels = {}
+        with self._lock:
+            # Stay under SQLite's bound parameter limit
+            for i in range(0, len(video_ids), chunk_size):
+                chunk = video_ids[i:i + chunk_size]
+                rows = self._conn.execute(
+                    f"SELECT video_id, label FROM videos WHERE label IS NOT NULL "
+                    f"AND video_id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                labels.update({row['video_id']: row['label'] for row in rows})
+        return labels
+
+    def set_status(self, video_ids, status):
+        """Update the preprocessing status of several videos"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE videos SET status = ?, updated_at = ? WHERE video_id = ?",
+                [(status, now, video_id) for video_id in video_ids]
+            )
+
+    def videos_with_status(self, status):
+        """List video ids with the given status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT video_id FROM videos WHERE status = ?", (status,)).fetchall()
+        return [row['video_id'] for row in rows]
+
+    def import_json_sidecars(self, videos_dir):
+        """Import legacy *_meta.json sidecars written by older collectors
+
+        Returns:
+            Number of records imported
+        """
+        records = []
+        for meta_file in glob.glob(os.path.join(videos_dir, "*_meta.json")):
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            records.append({
+                'video_id': os.path.basename(meta_file)[:-len("_meta.json")],
+                'source': meta.get('data_type', 'youtube'),
+                'title': meta.get('title') or meta.get('original_filename'),
+                'duration': meta.get('duration'),
+                'url': meta.get('url'),
+                'search_term': meta.get('search_term'),
+                'source_path': meta.get('source_path'),
+                'status': STATUS_COLLECTED,
+            })
+
+        if records:
+            self.upsert_many(records)
+        print(f"Imported {len(records)} metadata sidecars from {videos_dir}")
+        return len(records)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the PhysioFlow video metadata catalog')
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH, help='Catalog database path')
+    parser.add_argument('--import-sidecars', default=None,
+                        help='Import legacy *_meta.json files from this directory')
+    args = parser.parse_args()
+
+    with VideoMetadataStore(args.catalog) as catalog:
+        if args.import_sidecars:
+            catalog.import_json_sidecars(args.import_sidecars)
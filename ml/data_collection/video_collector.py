@@ -2,52 +2,94 @@
 Video collector for PhysioFlow
 Fetches YouTube videos for training data
 """
-from pytube import YouTube
-from youtube_search import YoutubeSearch
 import json
 import os
 import argparse
-import shutil
+import sys
 
-def download_videos(search_term, max_results=10, output_dir='ml/data/videos'):
-    """Download videos based on search term"""
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_collection.metadata_store import VideoMetadataStore, STATUS_COLLECTED, catalog_path_for
+from data_collection.downloader import ConcurrentDownloader, HostRateLimiter
+from data_collection.ingest import content_hash, link_or_copy
+
+def resolve_stream_url(yt_url, resolution="360p"):
+    """Resolve a YouTube watch URL to a direct mp4 stream URL"""
+    from pytube import YouTube
+    
+    yt = YouTube(yt_url)
+    stream = yt.streams.filter(res=resolution, file_extension='mp4').first()
+    if stream is None:
+        raise ValueError(f"No {resolution} mp4 stream available")
+    return stream.url
+
+def search_videos(search_term, max_results=10):
+    """Search YouTube, returning result dicts (id, title, duration, ...)"""
+    from youtube_search import YoutubeSearch
+    
+    return YoutubeSearch(search_term, max_results=max_results).to_dict()
+
+def download_videos(search_term, max_results=10, output_dir='ml/data/videos', catalog_path=None,
+                    workers=4, rate_limit=2.0, transport=None, resolver=resolve_stream_url):
+    """Download videos based on search term and record them in the metadata catalog
+    
+    Args:
+        search_term: YouTube search query
+        max_results: Maximum number of videos to download
+        output_dir: Directory to save videos to
+        catalog_path: Metadata catalog (defaults to metadata.db next to output_dir);
+            download_report.json is written beside it
+        workers: Concurrent downloads
+        rate_limit: Maximum requests per second to each host
+        transport: Network layer with fetch(url, dest_path); defaults to resumable HttpTransport
+        resolver: Callable mapping a watch URL to a direct download URL
+    
+    Returns:
+        Path to the output directory with downloaded videos
+    """
     print(f"Searching for '{search_term}' videos...")
-    results = YoutubeSearch(search_term, max_results=max_results).to_dict()
+    results = search_videos(search_term, max_results)
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
     
-    print(f"Found {len(results)} videos, downloading...")
-    for idx, result in enumerate(results):
-        try:
-            video_id = result['id']
-            yt_url = f"https://youtube.com/watch?v={video_id}"
-            print(f"Downloading {idx+1}/{len(results)}: {result['title']}")
-            
-            yt = YouTube(yt_url)
-            stream = yt.streams.filter(res="360p", file_extension='mp4').first()
-            output_file = os.path.join(output_dir, f"video_{video_id}.mp4")
-            
-            # Skip if already downloaded
-            if os.path.exists(output_file):
-                print(f"Video already exists, skipping...")
-                continue
-                
-            stream.download(output_path=output_dir, filename=f"video_{video_id}.mp4")
-            
-            # Save metadata
-            metadata_file = os.path.join(output_dir, f"video_{video_id}_meta.json")
-            with open(metadata_file, 'w') as f:
-                json.dump({
-                    'title': result['title'],
-                    'duration': result['duration'],
-                    'views': result['views'],
-                    'url': yt_url,
-                    'search_term': search_term
-                }, f, indent=2)
-                
-        except Exception as e:
-            print(f"Failed to download {result['id']}: {str(e)}")
+    catalog_path = catalog_path or catalog_path_for(output_dir)
+    catalog = VideoMetadataStore(catalog_path)
+    
+    def record(job):
+        # Save metadata
+        result = job['result']
+        catalog.upsert(
+            job['key'],
+            source='youtube',
+            title=result['title'],
+            duration=result['duration'],
+            url=job['resolve_url'],
+            search_term=search_term,
+            status=STATUS_COLLECTED
+        )
+    
+    jobs = []
+    for result in results:
+        yt_url = f"https://youtube.com/watch?v={result['id']}"
+        jobs.append({
+            'key': f"video_{result['id']}",
+            'dest': os.path.join(output_dir, f"video_{result['id']}.mp4"),
+            'resolve': lambda yt_url=yt_url: resolver(yt_url),
+            'resolve_url': yt_url,
+            'on_success': record,
+            'result': result,
+        })
+    
+    print(f"Found {len(results)} videos, downloading with {workers} workers...")
+    downloader = ConcurrentDownloader(workers, transport, HostRateLimiter(rate_limit))
+    report = downloader.run(jobs)
+    catalog.close()
+    
+    # Kept next to the catalog so the videos directory only holds videos
+    with open(os.path.join(os.path.dirname(catalog_path) or '.', "download_report.json"), 'w') as f:
+        json.dump(report.to_dict(), f, indent=2)
+    
+    return output_dir
 
 def _download_videos_fallback(self, search_term, max_videos, output_dir):
     """Fallback implementation for video downloading"""
@@ -122,12 +164,19 @@ def _download_videos_fallback(self, search_term, max_videos, output_dir):
                 except Exception as e:
                     print(f"Failed to download sample video: {str(e)}")
 
-def use_local_videos(video_dir, output_dir='ml/data/videos'):
+def use_local_videos(video_dir, output_dir='ml/data/videos', catalog_path=None, full_hash=False, allow_links=True):
     """Use local video files instead of downloading from YouTube
     
+    Videos are named by content hash (local_<hash>.mp4), so duplicates are
+    skipped and names stay stable when the source folder changes. Files are
+    hardlinked or reflinked into output_dir when possible and copied otherwise.
+    
     Args:
         video_dir: Directory containing local video files
-        output_dir: Directory to copy/link videos to for processing
+        output_dir: Directory to link/copy videos to for processing
+        catalog_path: Metadata catalog to record videos in (defaults to metadata.db next to output_dir)
+        full_hash: Hash whole files instead of sampled chunks
+        allow_links: Set to False to always copy
         
     Returns:
         Path to the output directory with prepared videos
@@ -139,44 +188,58 @@ def use_local_videos(video_dir, output_dir='ml/data/videos'):
         os.makedirs(output_dir, exist_ok=True)
     
     # Get all video files from the source directory
-    video_files = [f for f in os.listdir(video_dir) 
-                   if f.lower().endswith(('.mp4', '.mov', '.avi', '.mkv'))]
+    video_files = sorted(f for f in os.listdir(video_dir) 
+                         if f.lower().endswith(('.mp4', '.mov', '.avi', '.mkv')))
     
     if not video_files:
         raise ValueError(f"No video files found in {video_dir}")
         
     print(f"Found {len(video_files)} video files, preparing for processing...")
+    catalog = VideoMetadataStore(catalog_path or catalog_path_for(output_dir))
     
-    # Copy or link each video to the output directory with proper naming
+    seen = set()
+    counts = {'hardlink': 0, 'reflink': 0, 'copy': 0, 'existing': 0, 'duplicate': 0}
     for idx, video_file in enumerate(video_files):
         source_path = os.path.join(video_dir, video_file)
-        # Use a consistent naming pattern for further processing
-        target_filename = f"local_video_{idx+1}.mp4"
+        digest = content_hash(source_path, full=full_hash)
+        video_id = f"local_{digest[:16]}"
+        target_filename = f"{video_id}.mp4"
         target_path = os.path.join(output_dir, target_filename)
         
-        # Skip if target already exists
+        # Same content under another name, in this run or an earlier one
+        known = catalog.find_by_hash(digest)
+        if digest in seen or (known and known['video_id'] != video_id):
+            print(f"{video_file} duplicates an already ingested video, skipping...")
+            counts['duplicate'] += 1
+            continue
+        seen.add(digest)
+        
         if os.path.exists(target_path):
             print(f"Video {target_filename} already exists, skipping...")
+            counts['existing'] += 1
+            if known is None:
+                catalog.upsert(video_id, source='local_video', title=video_file,
+                               source_path=source_path, content_hash=digest, status=STATUS_COLLECTED)
             continue
         
-        print(f"Preparing {idx+1}/{len(video_files)}: {video_file} → {target_filename}")
-        
-        # Option 1: Copy the file (uses more space but safer)
-        shutil.copy2(source_path, target_path)
-        
-        # Option 2: Create a symbolic link (saves space but less portable)
-        # os.symlink(source_path, target_path) # Uncomment to use symlinks instead
+        method = link_or_copy(source_path, target_path, allow_links=allow_links)
+        counts[method] += 1
+        print(f"Prepared {idx+1}/{len(video_files)}: {video_file} → {target_filename} ({method})")
         
         # Save basic metadata
-        metadata_file = os.path.join(output_dir, f"local_video_{idx+1}_meta.json")
-        with open(metadata_file, 'w') as f:
-            json.dump({
-                'original_filename': video_file,
-                'source_path': source_path,
-                'data_type': 'local_video'
-            }, f, indent=2)
-    
-    print(f"Prepared {len(video_files)} local videos for processing")
+        catalog.upsert(
+            video_id,
+            source='local_video',
+            title=video_file,
+            source_path=source_path,
+            content_hash=digest,
+            status=STATUS_COLLECTED
+        )
+    
+    catalog.close()
+    print(f"Scanned {len(video_files)} local videos: {counts['hardlink']} hardlinked, "
+          f"{counts['reflink']} reflinked, {counts['copy']} copied, "
+          f"{counts['existing']} already present, {counts['duplicate']} duplicates skipped")
     return output_dir
 
 if __name__ == "__main__":
@@ -185,7 +248,11 @@ if __name__ == "__main__":
                         help='Search term for YouTube videos')
     parser.add_argument('--max-videos', type=int, default=10, 
                         help='Maximum number of videos to download')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of concurrent downloads')
+    parser.add_argument('--rate-limit', type=float, default=2.0,
+                        help='Maximum requests per second to each host')
     args = parser.parse_args()
     
-    download_videos(args.search, args.max_videos)
+    download_videos(args.search, args.max_videos, workers=args.workers, rate_limit=args.rate_limit)
     print("Download completed!")
\ No newline at end of file
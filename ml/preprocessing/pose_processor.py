@@ -1,20 +1,74 @@
 """
 Processes video frames to extract pose landmarks
 """
-import cv2
-import mediapipe as mp
-import pandas as pd
 import numpy as np
 import os
 import glob
 from pathlib import Path
 import argparse
 import json
+import sys
 
-# Initialize MediaPipe Pose
-mp_pose = mp.solutions.pose
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_collection.metadata_store import VideoMetadataStore, STATUS_LANDMARKS_EXTRACTED
+from common.profiling import stage, profiled, get_profiler, add_profiling_args, configure_from_args
 
-def process_frames(folder_path, output_dir='ml/data/landmarks'):
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+
+def create_pose(model_complexity=2, static_image_mode=True):
+    """Create a MediaPipe Pose detector
+    
+    Args:
+        model_complexity: 0 (lite), 1 (full) or 2 (heavy)
+        static_image_mode: Detect the person in every frame instead of tracking between frames
+    """
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(static_image_mode=static_image_mode, model_complexity=model_complexity)
+
+def detect_landmarks(pose, img, resize_width=None):
+    """Run pose detection on a BGR image
+    
+    Args:
+        resize_width: Downscale wider images to this width first (landmarks are normalized,
+            so they do not depend on the input resolution)
+    
+    Returns:
+        List of 33 [x, y, z, visibility] rows, or None if no pose was found
+    """
+    import cv2
+    
+    if resize_width and img.shape[1] > resize_width:
+        height = round(img.shape[0] * resize_width / img.shape[1])
+        img = cv2.resize(img, (resize_width, height), interpolation=cv2.INTER_AREA)
+    
+    # Convert to RGB and process
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    with stage('pose.inference', 1):
+        results = pose.process(img_rgb)
+    
+    if not results.pose_landmarks:
+        return None
+    # Extract landmarks (x, y, z, visibility)
+    return [[lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark]
+
+def save_landmarks(all_data, output_file):
+    """Write per-frame landmark records to parquet; returns the path, or None if there are none"""
+    import pandas as pd
+    
+    if not all_data:
+        print("No landmarks detected in any frames")
+        return None
+    
+    print(f"Saving landmarks data for {len(all_data)} frames...")
+    with stage('pose.parquet_write', len(all_data)):
+        df = pd.DataFrame(all_data)
+        df.to_parquet(output_file)
+    print(f"Saved to {output_file}")
+    return output_file
+
+@profiled('pose.process_frames')
+def process_frames(folder_path, output_dir='ml/data/landmarks', model_complexity=2,
+                   static_image_mode=True, resize_width=None):
     """Process all frames in a folder and extract pose landmarks"""
     print(f"Processing frames in {folder_path}...")
     
@@ -28,10 +82,13 @@ def process_frames(folder_path, output_dir='ml/data/landmarks'):
     # Skip if already processed
     if os.path.exists(output_file):
         print(f"Output file {output_file} already exists. Skipping...")
-        return
+        return output_file
+    
+    # OpenCV and MediaPipe load only once there is work to do
+    import cv2
     
     # Initialize pose detector
-    pose = mp_pose.Pose(static_image_mode=True, model_complexity=2)
+    pose = create_pose(model_complexity, static_image_mode)
     all_data = []
     
     # Get all jpg files in the folder
@@ -43,21 +100,14 @@ def process_frames(folder_path, output_dir='ml/data/landmarks'):
             print(f"Processing frame {i+1}/{total_files}...")
             
         # Read image and process
-        img = cv2.imread(img_path)
+        with stage('pose.frame_read', 1):
+            img = cv2.imread(img_path)
         if img is None:
             print(f"Failed to read image: {img_path}")
             continue
-            
-        # Convert to RGB and process
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = pose.process(img_rgb)
         
-        if results.pose_landmarks:
-            # Extract landmarks (x, y, z, visibility)
-            landmarks = []
-            for lm in results.pose_landmarks.landmark:
-                landmarks.append([lm.x, lm.y, lm.z, lm.visibility])
-            
+        landmarks = detect_landmarks(pose, img, resize_width)
+        if landmarks:
             # Create entry with frame info and landmarks
             all_data.append({
                 'frame': os.path.basename(img_path),
@@ -65,29 +115,162 @@ def process_frames(folder_path, output_dir='ml/data/landmarks'):
                 'frame_index': i
             })
     
+    pose.close()
+    
     # Save as parquet if we have data
-    if all_data:
-        print(f"Saving landmarks data for {len(all_data)} frames...")
-        df = pd.DataFrame(all_data)
-        df.to_parquet(output_file)
-        print(f"Saved to {output_file}")
-    else:
-        print("No landmarks detected in any frames")
+    return save_landmarks(all_data, output_file)
 
-def process_all_videos(input_dir='ml/data/frames', output_dir='ml/data/landmarks'):
-    """Process all video folders"""
-    # Get all directories in the input folder
-    video_folders = [f for f in os.listdir(input_dir) if os.path.isdir(os.path.join(input_dir, f))]
-    print(f"Found {len(video_folders)} video folders")
-    
-    for folder in video_folders:
-        folder_path = os.path.join(input_dir, folder)
-        process_frames(folder_path, output_dir)
+def iter_video_frames(video_path, fps=None, start_sample=0, max_frames=None):
+    """Decode frames from a video with OpenCV, optionally sampled down to fps
+    
+    Args:
+        start_sample: Index of the first sampled frame to yield (the video is seeked to it)
+        max_frames: Maximum number of sampled frames to yield
+    
+    Yields:
+        (sample_index, timestamp_ms, BGR image)
+    """
+    import cv2
+    
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+    
+    native_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(native_fps / fps, 1.0) if fps else 1.0
+    # Sample n is the first native frame at or after n * step, as in a full pass
+    next_sample = start_sample * step
+    position = int(np.ceil(next_sample - 1e-6))
+    if position:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+    
+    sample_index = start_sample
+    end_sample = None if max_frames is None else start_sample + max_frames
+    try:
+        while end_sample is None or sample_index < end_sample:
+            # grab() skips the colour conversion for frames that are not sampled
+            if not capture.grab():
+                break
+            if position >= next_sample - 1e-6:
+                ok, img = capture.retrieve()
+                if not ok:
+                    break
+                yield sample_index, int(position * 1000 / native_fps), img
+                sample_index += 1
+                next_sample += step
+            position += 1
+    finally:
+        capture.release()
+
+@profiled('pose.process_video')
+def process_video(video_path, output_dir='ml/data/landmarks', fps=2, model_complexity=2,
+                  static_image_mode=False, resize_width=None):
+    """Extract pose landmarks straight from a video file, without writing JPEG frames
+    
+    Output matches process_frames for a frames folder named after the video.
+    Tracking mode (static_image_mode=False) is the default here because the
+    frames are consecutive.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    output_file = os.path.join(output_dir, f"{video_name}_landmarks.parquet")
+    
+    if os.path.exists(output_file):
+        print(f"Output file {output_file} already exists. Skipping...")
+        return output_file
+    
+    print(f"Processing video {video_path}...")
+    pose = create_pose(model_complexity, static_image_mode)
+    all_data = []
+    
+    frames = iter_video_frames(video_path, fps)
+    while True:
+        with stage('pose.frame_read', 1):
+            frame = next(frames, None)
+        if frame is None:
+            break
+        i, timestamp_ms, img = frame
+        
+        landmarks = detect_landmarks(pose, img, resize_width)
+        if landmarks:
+            all_data.append({
+                'frame': f"{video_name}_frame_{timestamp_ms}",
+                'landmarks': landmarks,
+                'frame_index': i
+            })
+    
+    pose.close()
+    return save_landmarks(all_data, output_file)
+
+@profiled('pose.extract_frames')
+def extract_frames(video_path, output_dir, fps=2):
+    """Extract JPEG frames from a video with ffmpeg into output_dir/%04d.jpg"""
+    import subprocess
+    
+    os.makedirs(output_dir, exist_ok=True)
+    subprocess.run([
+        "ffmpeg", 
+        "-i", video_path,
+        "-vf", f"fps={fps}",
+        f"{output_dir}/%04d.jpg",
+        "-hide_banner",
+        "-loglevel", "error"
+    ], check=True)
+    return output_dir
+
+def process_all_videos(input_dir='ml/data/frames', output_dir='ml/data/landmarks', catalog_path=None,
+                       stream=False, fps=2, **pose_options):
+    """Process all video folders, marking them as extracted in the metadata catalog if given
+    
+    With stream=True, input_dir holds video files that are decoded directly at
+    fps with process_video, so no JPEG frames are written.
+    
+    pose_options (model_complexity, static_image_mode, resize_width) are passed to
+    process_frames or process_video.
+    """
+    if stream:
+        videos = sorted(f for f in os.listdir(input_dir) if f.lower().endswith(VIDEO_EXTENSIONS))
+        print(f"Found {len(videos)} videos")
+        processed = []
+        for video_file in videos:
+            if process_video(os.path.join(input_dir, video_file), output_dir, fps, **pose_options):
+                processed.append(os.path.splitext(video_file)[0])
+    else:
+        # Get all directories in the input folder
+        video_folders = [f for f in os.listdir(input_dir) if os.path.isdir(os.path.join(input_dir, f))]
+        print(f"Found {len(video_folders)} video folders")
+        
+        processed = []
+        for folder in video_folders:
+            folder_path = os.path.join(input_dir, folder)
+            if process_frames(folder_path, output_dir, **pose_options):
+                processed.append(folder)
+    
+    # Frame folders and video files are named after the catalog video id
+    if catalog_path and processed:
+        with VideoMetadataStore(catalog_path) as catalog:
+            catalog.set_status(processed, STATUS_LANDMARKS_EXTRACTED)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process video frames with MediaPipe Pose')
-    parser.add_argument('--input-dir', required=True, help='Input directory with frames')
+    parser.add_argument('--input-dir', required=True,
+                        help='Input directory with frame folders (or video files with --stream)')
     parser.add_argument('--output-dir', required=True, help='Output directory for landmarks')
+    parser.add_argument('--catalog', default=None, help='Video metadata catalog to update')
+    parser.add_argument('--stream', action='store_true',
+                        help='Decode videos directly instead of reading extracted JPEG frames')
+    parser.add_argument('--fps', type=float, default=2,
+                        help='Frame sampling rate when decoding videos with --stream')
+    parser.add_argument('--model-complexity', type=int, choices=[0, 1, 2], default=2,
+                        help='MediaPipe Pose model: 0 lite, 1 full, 2 heavy')
+    parser.add_argument('--resize-width', type=int, default=None,
+                        help='Downscale frames wider than this before detection')
+    add_profiling_args(parser)
     args = parser.parse_args()
+    profile_report = configure_from_args(args)
+    
+    process_all_videos(args.input_dir, args.output_dir, args.catalog, args.stream, args.fps,
+                       model_complexity=args.model_complexity, resize_width=args.resize_width)
     
-    process_all_videos(args.input_dir, args.output_dir)
\ No newline at end of file
+    if profile_report:
+        get_profiler().write_report(profile_report)
\ No newline at end of file
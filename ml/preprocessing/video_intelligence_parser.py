@@ -0,0 +1,154 @@
+"""
+Converts Video Intelligence person detection results into landmark parquet files
+Output matches pose_processor (frame, landmarks, frame_index) so both sources train the same way
+"""
+import os
+import numpy as np
+
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4  # x, y, z, visibility
+
+def gather_track_landmarks(result):
+    """Collect every pose landmark in a result into flat arrays in a single pass
+
+    When several person tracks cover the same timestamp only one frame is
+    kept, from the track with the most pose frames (ties go to the higher
+    track confidence), so each instant appears once in the series.
+
+    Returns:
+        (frame_times, frame_ids, landmark_ids, values) where frame_times has one
+        entry per frame and the other arrays one entry per landmark
+    """
+    frame_times = []
+    frame_tracks = []
+    track_scores = []
+    frame_ids = []
+    landmark_ids = []
+    values = []
+
+    for annotation in result.annotation_results:
+        for person_detection in annotation.person_detection_annotations:
+            for track in person_detection.tracks:
+                track_id = len(track_scores)
+                track_frames = 0
+                for timestamp in track.timestamps:
+                    if not timestamp.pose_landmarks:
+                        continue
+                    frame = len(frame_times)
+                    frame_times.append(timestamp.time_offset.seconds + timestamp.time_offset.nanos / 1e9)
+                    frame_tracks.append(track_id)
+                    track_frames += 1
+                    for i, landmark in enumerate(timestamp.pose_landmarks):
+                        frame_ids.append(frame)
+                        landmark_ids.append(i)
+                        values.append((
+                            landmark.x,
+                            landmark.y,
+                            landmark.z if hasattr(landmark, 'z') else 0.0,
+                            landmark.visibility,
+                        ))
+                track_scores.append((track_frames, getattr(track, 'confidence', 0.0) or 0.0))
+
+    frame_times = np.asarray(frame_times, dtype=np.float64)
+    frame_ids = np.asarray(frame_ids, dtype=np.int64)
+    landmark_ids = np.asarray(landmark_ids, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32).reshape(-1, LANDMARK_DIMS)
+
+    # One frame per timestamp: order by time, then best track first, and keep the first of each time
+    if len(frame_times):
+        scores = np.asarray(track_scores, dtype=np.float64)[np.asarray(frame_tracks)]
+        order = np.lexsort((-scores[:, 1], -scores[:, 0], frame_times))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = frame_times[order][1:] != frame_times[order][:-1]
+        kept = np.sort(order[first])
+        if len(kept) < len(frame_times):
+            new_ids = np.full(len(frame_times), -1, dtype=np.int64)
+            new_ids[kept] = np.arange(len(kept))
+            frame_ids = new_ids[frame_ids]
+            keep_landmarks = frame_ids >= 0
+            frame_times = frame_times[kept]
+            frame_ids = frame_ids[keep_landmarks]
+            landmark_ids = landmark_ids[keep_landmarks]
+            values = values[keep_landmarks]
+
+    return frame_times, frame_ids, landmark_ids, values
+
+def knee_normalize(landmarks, present, knee_mask):
+    """Normalize knee landmark x/y to the per-frame knee bounding box
+
+    Args:
+        landmarks: Array of shape (frames, NUM_LANDMARKS, LANDMARK_DIMS)
+        present: Boolean array (frames, NUM_LANDMARKS) of detected landmarks
+        knee_mask: Boolean array (NUM_LANDMARKS,) marking knee-region landmarks
+
+    Returns:
+        Array of shape (frames, NUM_LANDMARKS, 2); non-knee landmarks and frames
+        with a degenerate knee box keep their original coordinates
+    """
+    xy = landmarks[..., :2]
+    in_box = (present & knee_mask)[..., None]
+    box_min = np.where(in_box, xy, np.inf).min(axis=1)
+    box_max = np.where(in_box, xy, -np.inf).max(axis=1)
+    extent = box_max - box_min
+
+    valid = np.all(extent > 0, axis=1)
+    safe_extent = np.where(extent > 0, extent, 1.0)
+    normalized = (xy - box_min[:, None, :]) / safe_extent[:, None, :]
+
+    use_normalized = (valid[:, None] & knee_mask[None, :])[..., None]
+    return np.where(use_normalized, normalized, xy)
+
+def parse_annotation_result(result, video_name, knee_landmarks, target_landmarks=None):
+    """Build a pose_processor-style DataFrame from a Video Intelligence result
+
+    Args:
+        result: AnnotateVideoResponse (or an object with the same attributes)
+        video_name: Video file name without extension, used for frame names
+        knee_landmarks: Landmark indices that make up the knee region
+        target_landmarks: If given, landmarks outside this set are zeroed
+
+    Returns:
+        DataFrame with frame, landmarks, frame_index, frame_time and
+        knee_normalized columns, or None if no landmarks were found
+    """
+    import pandas as pd
+
+    frame_times, frame_ids, landmark_ids, values = gather_track_landmarks(result)
+    if len(frame_times) == 0:
+        return None
+
+    # Scatter into a dense (frames, 33, 4) array; extra landmarks are dropped
+    keep = landmark_ids < NUM_LANDMARKS
+    landmarks = np.zeros((len(frame_times), NUM_LANDMARKS, LANDMARK_DIMS), dtype=np.float32)
+    present = np.zeros((len(frame_times), NUM_LANDMARKS), dtype=bool)
+    landmarks[frame_ids[keep], landmark_ids[keep]] = values[keep]
+    present[frame_ids[keep], landmark_ids[keep]] = True
+
+    if target_landmarks is not None:
+        target_mask = np.zeros(NUM_LANDMARKS, dtype=bool)
+        target_mask[[i for i in target_landmarks if i < NUM_LANDMARKS]] = True
+        present &= target_mask
+        landmarks[~present] = 0.0
+
+    knee_mask = np.zeros(NUM_LANDMARKS, dtype=bool)
+    knee_mask[[i for i in knee_landmarks if i < NUM_LANDMARKS]] = True
+    normalized = knee_normalize(landmarks, present, knee_mask)
+
+    # Order frames by time
+    order = np.argsort(frame_times, kind='stable')
+    frame_ms = (frame_times[order] * 1000).astype(np.int64)
+
+    return pd.DataFrame({
+        'frame': [f"{video_name}_frame_{ms}" for ms in frame_ms],
+        'landmarks': list(landmarks[order].tolist()),
+        'frame_index': np.arange(len(order)),
+        'frame_time': frame_times[order],
+        'knee_normalized': list(normalized[order].tolist()),
+    })
+
+def save_landmarks_parquet(df, output_dir, video_name):
+    """Write one landmarks parquet file per video, named like pose_processor output"""
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f"{video_name}_landmarks.parquet")
+    df.to_parquet(output_file)
+    return output_file
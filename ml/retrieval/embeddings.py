@@ -0,0 +1,117 @@
+"""
+Fixed-length embeddings of landmark windows for similarity search
+Windows have shape (windows, sequence_length, num_landmarks * landmark_dims), as built by training.windows
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4
+
+# (a, b, c) MediaPipe landmark triples; the angle is measured at b
+JOINT_ANGLES = {
+    'left_knee': (23, 25, 27),
+    'right_knee': (24, 26, 28),
+    'left_hip': (11, 23, 25),
+    'right_hip': (12, 24, 26),
+    'left_ankle': (25, 27, 31),
+    'right_ankle': (26, 28, 32),
+    'left_shoulder': (13, 11, 23),
+    'right_shoulder': (14, 12, 24),
+    'left_elbow': (11, 13, 15),
+    'right_elbow': (12, 14, 16),
+}
+
+def joint_angles(windows, joints=JOINT_ANGLES):
+    """Compute joint angles for every frame of every window
+
+    Args:
+        windows: Array of shape (windows, frames, 132) or (windows, frames, 33, 4)
+        joints: Mapping of joint name -> (a, b, c) landmark indices
+
+    Returns:
+        Array of shape (windows, frames, len(joints)) with angles in radians
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    landmarks = windows.reshape(windows.shape[0], windows.shape[1], NUM_LANDMARKS, LANDMARK_DIMS)
+    triples = np.array(list(joints.values()))
+
+    # Image-plane x/y only; MediaPipe's z is too noisy for angle estimates
+    a = landmarks[:, :, triples[:, 0], :2]
+    b = landmarks[:, :, triples[:, 1], :2]
+    c = landmarks[:, :, triples[:, 2], :2]
+    ba = a - b
+    bc = c - b
+
+    norms = np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1)
+    cosine = np.sum(ba * bc, axis=-1) / np.maximum(norms, 1e-6)
+    return np.arccos(np.clip(cosine, -1.0, 1.0))
+
+class AngleEmbedder:
+    """Embeds windows as resampled joint-angle trajectories plus per-joint range
+
+    Angles are invariant to where the patient stands and how far they are
+    from the camera, so windows from different videos compare directly.
+
+    Args:
+        num_samples: Time steps each trajectory is average-pooled down to
+    """
+
+    def __init__(self, num_samples=8):
+        self.num_samples = num_samples
+
+    def spec(self):
+        return {'type': 'angles', 'num_samples': self.num_samples}
+
+    def __call__(self, windows):
+        angles = joint_angles(windows) / np.pi  # scale to [0, 1]
+        num_windows, frames, num_joints = angles.shape
+
+        # Average-pool the trajectory into num_samples segments
+        if frames >= self.num_samples:
+            edges = np.linspace(0, frames, self.num_samples + 1).astype(int)
+            trajectory = np.add.reduceat(angles, edges[:-1], axis=1) / np.diff(edges)[None, :, None]
+        else:
+            trajectory = angles[:, np.linspace(0, frames - 1, self.num_samples).round().astype(int)]
+
+        features = [
+            trajectory.reshape(num_windows, -1),
+            angles.min(axis=1),
+            angles.max(axis=1),
+        ]
+        return np.concatenate(features, axis=1).astype(np.float32)
+
+class ModelEmbedder:
+    """Embeds windows with the activations feeding the classifier's output layer
+
+    Uses the last non-dropout layer before the softmax of a model from
+    train_local.build_model. Embeddings are L2-normalized.
+    """
+
+    def __init__(self, model_path, batch_size=256):
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.batch_size = batch_size
+        model = tf.keras.models.load_model(model_path, compile=False)
+        feature_layer = next(
+            layer for layer in reversed(model.layers[:-1])
+            if not isinstance(layer, tf.keras.layers.Dropout)
+        )
+        self._model = tf.keras.Model(model.inputs, feature_layer.output)
+
+    def spec(self):
+        return {'type': 'model', 'model_path': self.model_path}
+
+    def __call__(self, windows):
+        features = self._model.predict(np.asarray(windows, dtype=np.float32),
+                                       batch_size=self.batch_size, verbose=0)
+        features = features.reshape(len(features), -1).astype(np.float32)
+        return features / np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12)
+
+def make_embedder(spec):
+    """Recreate an embedder from its spec() dictionary"""
+    if spec['type'] == 'angles':
+        return AngleEmbedder(spec.get('num_samples', 8))
+    if spec['type'] == 'model':
+        return ModelEmbedder(spec['model_path'])
+    raise ValueError(f"Unknown embedding type: {spec['type']}")
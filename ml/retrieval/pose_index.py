@@ -0,0 +1,340 @@
+"""
+Approximate nearest-neighbor index over landmark windows
+Finds sessions that move like a given window without scanning every parquet file
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from training.windows import read_landmarks, create_sequences, video_id_from_path
+from retrieval.embeddings import AngleEmbedder, ModelEmbedder, make_embedder
+
+DEFAULT_INDEX_DIR = 'ml/data/pose_index'
+
+def kmeans(vectors, k, iterations=20, seed=42):
+    """Plain Lloyd's k-means with k-means++ seeding
+
+    Returns:
+        Centroid array of shape (k, dim)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = [vectors[rng.integers(len(vectors))]]
+    closest = np.sum((vectors - centroids[0]) ** 2, axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        probs = closest / total if total > 0 else None
+        centroids.append(vectors[rng.choice(len(vectors), p=probs)])
+        closest = np.minimum(closest, np.sum((vectors - centroids[-1]) ** 2, axis=1))
+    centroids = np.stack(centroids)
+
+    for _ in range(iterations):
+        assignment = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=k)
+        # Empty clusters keep their previous centroid
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+def _squared_distances(queries, vectors):
+    """Pairwise squared L2 distances, shape (len(queries), len(vectors))"""
+    distances = (np.sum(queries ** 2, axis=1)[:, None]
+                 - 2 * queries @ vectors.T
+                 + np.sum(vectors ** 2, axis=1)[None, :])
+    return np.maximum(distances, 0.0)
+
+def _nearest(vectors, centroids, chunk_size=8192):
+    """Index of the nearest centroid for every vector"""
+    return np.concatenate([
+        np.argmin(_squared_distances(vectors[i:i + chunk_size], centroids), axis=1)
+        for i in range(0, len(vectors), chunk_size)
+    ])
+
+class PoseIndex:
+    """Inverted-file (IVF) index of window embeddings
+
+    Vectors are bucketed by their nearest k-means centroid; a query only
+    scans the nprobe closest buckets. Until train_size vectors have been
+    added, queries fall back to an exact scan and the centroids are fitted
+    automatically once enough data exists. Inserts after that are
+    incremental and only assign new vectors to existing buckets.
+
+    Args:
+        dim: Embedding dimension
+        n_lists: Number of buckets (centroids)
+        nprobe: Buckets scanned per query
+        train_size: Vectors to collect before fitting centroids
+        embedder_spec: Embedder description saved alongside the index
+    """
+
+    def __init__(self, dim, n_lists=64, nprobe=8, train_size=None, embedder_spec=None):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.train_size = train_size or 32 * n_lists
+        self.embedder_spec = embedder_spec
+        self.centroids = None
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._video_ids = np.empty(0, dtype=object)
+        self._start_frames = np.empty(0, dtype=np.int64)
+        self._list_ids = np.empty(0, dtype=np.int64)
+        self._lists = None
+        # (vectors, video_ids, start_frames, list_ids) chunks added since the last merge
+        self._pending = []
+        self._num_pending = 0
+
+    def __len__(self):
+        return len(self._vectors) + self._num_pending
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    @property
+    def vectors(self):
+        self._merge()
+        return self._vectors
+
+    @property
+    def video_ids(self):
+        self._merge()
+        return self._video_ids
+
+    @property
+    def start_frames(self):
+        self._merge()
+        return self._start_frames
+
+    @property
+    def list_ids(self):
+        self._merge()
+        return self._list_ids
+
+    def indexed_videos(self):
+        """Set of video ids with at least one indexed window"""
+        return set(self.video_ids.tolist())
+
+    def _merge(self):
+        """Append pending chunks to the arrays and buckets in one concatenation
+
+        Inserts only queue their chunk, so indexing many videos stays linear
+        instead of copying every array on each insert.
+        """
+        if not self._pending:
+            return
+        first_row = len(self._vectors)
+        vectors, video_ids, start_frames, list_ids = zip(*self._pending)
+        self._vectors = np.concatenate([self._vectors, *vectors])
+        self._video_ids = np.concatenate([self._video_ids, *video_ids])
+        self._start_frames = np.concatenate([self._start_frames, *start_frames])
+        self._list_ids = np.concatenate([self._list_ids, *list_ids])
+        self._pending = []
+        self._num_pending = 0
+
+        if self.trained:
+            new_ids = self._list_ids[first_row:]
+            rows = np.arange(first_row, len(self._vectors))
+            for list_id in np.unique(new_ids):
+                self._lists[list_id] = np.concatenate([self._lists[list_id], rows[new_ids == list_id]])
+
+    def train(self):
+        """Fit centroids on the stored vectors and rebuild the buckets"""
+        self._merge()
+        k = min(self.n_lists, len(self._vectors))
+        self.centroids = kmeans(self._vectors, k).astype(np.float32)
+        self._list_ids = _nearest(self._vectors, self.centroids)
+        self._build_lists()
+        print(f"Trained index with {k} lists on {len(self._vectors)} vectors")
+
+    def _build_lists(self):
+        order = np.argsort(self._list_ids, kind='stable')
+        bounds = np.searchsorted(self._list_ids[order], np.arange(len(self.centroids) + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def add(self, vectors, video_id, start_frames):
+        """Insert the embeddings of one video's windows"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.trained:
+            list_ids = _nearest(vectors, self.centroids)
+        else:
+            list_ids = np.full(len(vectors), -1, dtype=np.int64)
+        self._pending.append((
+            vectors,
+            np.array([video_id] * len(vectors), dtype=object),
+            np.asarray(start_frames, dtype=np.int64),
+            list_ids,
+        ))
+        self._num_pending += len(vectors)
+
+        if not self.trained and len(self) >= self.train_size:
+            self.train()
+
+    def _candidates(self, query, nprobe):
+        """Rows to scan for a query: its nprobe nearest buckets, or everything before training"""
+        if not self.trained:
+            return np.arange(len(self._vectors))
+        nearest_lists = np.argsort(_squared_distances(query[None, :], self.centroids)[0])[:nprobe]
+        return np.concatenate([self._lists[i] for i in nearest_lists])
+
+    def search(self, queries, k=10, nprobe=None, exclude_video=None):
+        """Find the k nearest indexed windows for each query embedding
+
+        Args:
+            queries: Array of shape (queries, dim)
+            k: Results per query
+            nprobe: Buckets to scan (defaults to self.nprobe)
+            exclude_video: Video id whose windows are left out of the results
+
+        Returns:
+            One list per query of dictionaries with video_id, start_frame and distance
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        nprobe = nprobe or self.nprobe
+        self._merge()
+        results = []
+        for query in queries:
+            rows = self._candidates(query, nprobe)
+            if exclude_video is not None:
+                rows = rows[self._video_ids[rows] != exclude_video]
+            distances = _squared_distances(query[None, :], self._vectors[rows])[0]
+            top = np.argsort(distances)[:k] if len(distances) > k else np.argsort(distances)
+            results.append([
+                {
+                    'video_id': self._video_ids[rows[i]],
+                    'start_frame': int(self._start_frames[rows[i]]),
+                    'distance': float(np.sqrt(distances[i])),
+                }
+                for i in top
+            ])
+        return results
+
+    def save(self, index_dir):
+        """Write the index to index_dir (vectors.npz + index.json)"""
+        os.makedirs(index_dir, exist_ok=True)
+        vectors_path = os.path.join(index_dir, 'vectors.npz')
+        tmp_path = os.path.join(index_dir, 'vectors.tmp.npz')
+        np.savez(
+            tmp_path,
+            vectors=self.vectors,
+            video_ids=self.video_ids.astype(str),
+            start_frames=self.start_frames,
+            list_ids=self.list_ids,
+            centroids=self.centroids if self.trained else np.empty((0, self.dim), dtype=np.float32),
+        )
+        os.replace(tmp_path, vectors_path)
+
+        with open(os.path.join(index_dir, 'index.json'), 'w') as f:
+            json.dump({
+                'dim': self.dim,
+                'n_lists': self.n_lists,
+                'nprobe': self.nprobe,
+                'train_size': self.train_size,
+                'embedder': self.embedder_spec,
+                'num_vectors': len(self),
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, index_dir):
+        """Load an index written by save()"""
+        with open(os.path.join(index_dir, 'index.json'), 'r') as f:
+            meta = json.load(f)
+        index = cls(meta['dim'], meta['n_lists'], meta['nprobe'], meta['train_size'], meta['embedder'])
+
+        data = np.load(os.path.join(index_dir, 'vectors.npz'))
+        index._vectors = data['vectors']
+        index._video_ids = data['video_ids'].astype(object)
+        index._start_frames = data['start_frames']
+        index._list_ids = data['list_ids']
+        if len(data['centroids']):
+            index.centroids = data['centroids']
+            index._build_lists()
+        return index
+
+def index_landmarks(index, embedder, landmarks_dir, seq_length=30, stride=None):
+    """Embed and insert windows from parquet files not yet in the index
+
+    Returns:
+        Number of videos added
+    """
+    if stride is None:
+        stride = max(seq_length // 2, 1)
+
+    already_indexed = index.indexed_videos()
+    added = 0
+    for file in sorted(os.listdir(landmarks_dir)):
+        if not file.endswith('.parquet'):
+            continue
+        video_id = video_id_from_path(file)
+        if video_id in already_indexed:
+            continue
+
+        windows = create_sequences(read_landmarks(os.path.join(landmarks_dir, file)), seq_length, stride)
+        if len(windows) == 0:
+            continue
+        index.add(embedder(windows), video_id, np.arange(len(windows)) * stride)
+        added += 1
+        print(f"Indexed {len(windows)} windows from {video_id}")
+    return added
+
+def query_parquet(index, parquet_file, start_frame=0, seq_length=30, k=10, nprobe=None):
+    """Find windows similar to the window starting at start_frame of a landmarks file"""
+    landmarks = read_landmarks(parquet_file)
+    window = landmarks[start_frame:start_frame + seq_length]
+    if len(window) < seq_length:
+        raise ValueError(f"{parquet_file} has fewer than {seq_length} frames after frame {start_frame}")
+
+    embedder = make_embedder(index.embedder_spec)
+    query = embedder(window.reshape(1, seq_length, -1))
+    return index.search(query, k=k, nprobe=nprobe, exclude_video=video_id_from_path(parquet_file))[0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build or query the pose similarity index')
+    parser.add_argument('--index-dir', type=str, default=DEFAULT_INDEX_DIR,
+                        help='Directory the index is stored in')
+    parser.add_argument('--landmarks-dir', type=str, default='ml/data/landmarks',
+                        help='Add windows from new parquet files in this directory to the index')
+    parser.add_argument('--embedding', choices=['angles', 'model'], default='angles',
+                        help='Joint-angle features or the trained model\'s penultimate layer (new indexes only)')
+    parser.add_argument('--model-path', type=str,
+                        help='Keras .h5 model for --embedding model')
+    parser.add_argument('--sequence-length', type=int, default=30,
+                        help='Frames per window')
+    parser.add_argument('--stride', type=int,
+                        help='Frames between indexed windows (defaults to 50%% overlap)')
+    parser.add_argument('--n-lists', type=int, default=64,
+                        help='Number of IVF buckets')
+    parser.add_argument('--query', type=str,
+                        help='Landmarks parquet file to query with instead of building')
+    parser.add_argument('--start-frame', type=int, default=0,
+                        help='First frame of the query window')
+    parser.add_argument('--k', type=int, default=10,
+                        help='Number of results')
+    parser.add_argument('--nprobe', type=int,
+                        help='Buckets scanned per query')
+    args = parser.parse_args()
+
+    if args.query:
+        index = PoseIndex.load(args.index_dir)
+        results = query_parquet(index, args.query, args.start_frame, args.sequence_length, args.k, args.nprobe)
+        print(json.dumps(results, indent=2))
+    else:
+        if os.path.exists(os.path.join(args.index_dir, 'index.json')):
+            index = PoseIndex.load(args.index_dir)
+            embedder = make_embedder(index.embedder_spec)
+        else:
+            if args.embedding == 'model':
+                if not args.model_path:
+                    parser.error('--model-path is required with --embedding model')
+                embedder = ModelEmbedder(args.model_path)
+            else:
+                embedder = AngleEmbedder()
+            probe = embedder(np.zeros((1, args.sequence_length, 33 * 4), dtype=np.float32))
+            index = PoseIndex(probe.shape[1], n_lists=args.n_lists, embedder_spec=embedder.spec())
+
+        added = index_landmarks(index, embedder, args.landmarks_dir, args.sequence_length, args.stride)
+        index.save(args.index_dir)
+        print(f"Added {added} videos; index holds {len(index)} windows")
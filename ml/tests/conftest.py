@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import pipeline modules the same way the scripts do, relative to ml/
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
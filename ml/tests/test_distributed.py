@@ -0,0 +1,97 @@
+"""Tests for TF_CONFIG handling and local worker launching (no TensorFlow needed)"""
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+from training import distributed
+from training.distributed import (is_chief, launch_local_workers, make_tf_config, read_tf_config,
+                                  worker_output_dir)
+
+WORKERS = ['localhost:2222', 'localhost:2223']
+
+def test_make_tf_config():
+    assert make_tf_config(WORKERS, 1) == {
+        'cluster': {'worker': WORKERS},
+        'task': {'type': 'worker', 'index': 1},
+    }
+
+def test_read_tf_config(monkeypatch):
+    monkeypatch.delenv('TF_CONFIG', raising=False)
+    assert read_tf_config() == {}
+    monkeypatch.setenv('TF_CONFIG', '')
+    assert read_tf_config() == {}
+    monkeypatch.setenv('TF_CONFIG', json.dumps(make_tf_config(WORKERS, 0)))
+    assert read_tf_config() == make_tf_config(WORKERS, 0)
+
+def test_is_chief():
+    assert is_chief({})
+    assert is_chief(make_tf_config(WORKERS, 0))
+    assert not is_chief(make_tf_config(WORKERS, 1))
+
+    # Vertex AI style cluster: the first worker pool is the chief, workers count from 0
+    cluster = {'chief': ['host0:2222'], 'worker': ['host1:2222', 'host2:2222']}
+    assert is_chief({'cluster': cluster, 'task': {'type': 'chief', 'index': 0}})
+    assert not is_chief({'cluster': cluster, 'task': {'type': 'worker', 'index': 0}})
+    assert not is_chief({'cluster': cluster, 'task': {'type': 'worker', 'index': 1}})
+
+def test_is_chief_reads_environment(monkeypatch):
+    monkeypatch.setenv('TF_CONFIG', json.dumps(make_tf_config(WORKERS, 1)))
+    assert not is_chief()
+    monkeypatch.delenv('TF_CONFIG')
+    assert is_chief()
+
+def test_worker_output_dir(tmp_path):
+    output_dir = str(tmp_path / 'models')
+    assert worker_output_dir(output_dir, make_tf_config(WORKERS, 0)) == (output_dir, False)
+    assert worker_output_dir(output_dir, {}) == (output_dir, False)
+
+    directory, temporary = worker_output_dir(output_dir, make_tf_config(WORKERS, 1))
+    try:
+        assert temporary
+        assert directory != output_dir
+        assert os.path.isdir(directory)
+        assert os.path.basename(directory).startswith('physioflow_worker1_')
+    finally:
+        shutil.rmtree(directory)
+
+def test_create_strategy_rejects_unknown_mode():
+    pytest.importorskip('tensorflow')
+    with pytest.raises(ValueError):
+        distributed.create_strategy('parameter_server')
+
+def write_script(tmp_path, body):
+    path = tmp_path / 'worker.py'
+    path.write_text(body)
+    return str(path)
+
+def test_launch_local_workers_sets_tf_config(tmp_path):
+    script = write_script(tmp_path, (
+        "import json, os, sys\n"
+        "config = json.loads(os.environ['TF_CONFIG'])\n"
+        "index = config['task']['index']\n"
+        "with open(os.path.join(sys.argv[1], f'worker{index}.json'), 'w') as f:\n"
+        "    json.dump({'config': config, 'cuda': os.environ['CUDA_VISIBLE_DEVICES']}, f)\n"
+    ))
+    assert launch_local_workers(2, [script, str(tmp_path)], poll_interval=0.05) == 0
+
+    reports = [json.loads((tmp_path / f'worker{i}.json').read_text()) for i in range(2)]
+    workers = reports[0]['config']['cluster']['worker']
+    assert len(workers) == 2 and len(set(workers)) == 2
+    for index, report in enumerate(reports):
+        assert report['config'] == make_tf_config(workers, index)
+        assert report['cuda'] == ''
+
+def test_launch_local_workers_stops_others_on_failure(tmp_path):
+    # Worker 1 fails at once; worker 0 would otherwise hang like a blocked collective op
+    script = write_script(tmp_path, (
+        "import json, os, sys, time\n"
+        "if json.loads(os.environ['TF_CONFIG'])['task']['index'] == 1:\n"
+        "    sys.exit(3)\n"
+        "time.sleep(60)\n"
+    ))
+    start = time.monotonic()
+    assert launch_local_workers(2, [script], poll_interval=0.05) == 3
+    assert time.monotonic() - start < 30
@@ -0,0 +1,121 @@
+"""Tests for resumable downloads against a local HTTP server"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from data_collection.downloader import ConcurrentDownloader, HostRateLimiter, HttpTransport
+
+PAYLOAD = bytes(range(256)) * 400  # 102400 bytes
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support; the server object carries test knobs"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        server.ranges.append(self.headers.get('Range'))
+        start = 0
+        if self.headers.get('Range') and server.honor_ranges:
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            if start >= len(PAYLOAD):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(PAYLOAD)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        body = PAYLOAD[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        # Drop the connection part way through to simulate a network failure
+        if server.truncate_after:
+            body, server.truncate_after = body[:server.truncate_after], None
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    httpd.ranges = []
+    httpd.honor_ranges = True
+    httpd.truncate_after = None
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def url_for(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/video.mp4"
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_fresh_download(server, tmp_path):
+    dest = str(tmp_path / 'video.mp4')
+    transferred = HttpTransport(timeout=5, block_size=4096).fetch(url_for(server), dest)
+    assert transferred == len(PAYLOAD)
+    assert read(dest) == PAYLOAD
+    assert not os.path.exists(dest + '.part')
+    assert server.ranges == [None]
+
+def test_resumes_partial_file(server, tmp_path):
+    dest = str(tmp_path / 'video.mp4')
+    with open(dest + '.part', 'wb') as f:
+        f.write(PAYLOAD[:30000])
+
+    transferred = HttpTransport(timeout=5, block_size=4096).fetch(url_for(server), dest)
+    assert transferred == len(PAYLOAD) - 30000
+    assert read(dest) == PAYLOAD
+    assert server.ranges == ['bytes=30000-']
+
+def test_complete_part_file_is_finalized_on_416(server, tmp_path):
+    dest = str(tmp_path / 'video.mp4')
+    with open(dest + '.part', 'wb') as f:
+        f.write(PAYLOAD)
+
+    transferred = HttpTransport(timeout=5).fetch(url_for(server), dest)
+    assert transferred == 0
+    assert read(dest) == PAYLOAD
+    assert not os.path.exists(dest + '.part')
+
+def test_server_ignoring_ranges_restarts_the_file(server, tmp_path):
+    server.honor_ranges = False
+    dest = str(tmp_path / 'video.mp4')
+    with open(dest + '.part', 'wb') as f:
+        f.write(b'stale data')
+
+    HttpTransport(timeout=5).fetch(url_for(server), dest)
+    assert read(dest) == PAYLOAD
+
+def test_downloader_resumes_after_dropped_connection(server, tmp_path):
+    server.truncate_after = 40000
+    dest = str(tmp_path / 'video.mp4')
+    completed = []
+    jobs = [{'key': 'video', 'dest': dest, 'resolve': lambda: url_for(server),
+             'on_success': completed.append}]
+    downloader = ConcurrentDownloader(workers=1, transport=HttpTransport(timeout=5, block_size=4096),
+                                      rate_limiter=HostRateLimiter(None), retries=2, backoff=0)
+
+    report = downloader.run(jobs).to_dict()
+
+    assert read(dest) == PAYLOAD
+    assert server.ranges == [None, 'bytes=40000-']
+    assert (report['completed'], report['failed']) == (1, 0)
+    assert report['bytes'] == len(PAYLOAD)
+    assert len(completed) == 1
+
+    # A finished file is skipped on the next run
+    assert downloader.run(jobs).to_dict()['skipped'] == 1
@@ -0,0 +1,144 @@
+"""Tests for the transfer engine against LocalBucket"""
+import os
+
+import numpy as np
+import pytest
+
+from training import gcs_transfer
+from training.gcs_transfer import LocalBucket, LocalBlob, TransferEngine, file_md5, matches_remote
+
+KB = 1024
+
+def write_random(path, size, seed=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = np.random.default_rng(seed).integers(0, 256, size, dtype=np.uint8).tobytes()
+    with open(path, 'wb') as f:
+        f.write(data)
+    return data
+
+def small_engine(bucket):
+    """Engine that chunks anything of 4 KB or more into 1 KB parts"""
+    return TransferEngine(bucket, max_workers=4, chunk_size=KB, chunked_threshold=4 * KB,
+                          retries=1, backoff=0)
+
+@pytest.fixture
+def bucket(tmp_path):
+    return LocalBucket(str(tmp_path / 'bucket'), name='test-bucket')
+
+def test_chunked_upload_composes_parts(tmp_path, bucket, monkeypatch):
+    data = write_random(str(tmp_path / 'src' / 'big.bin'), 10 * KB + 17)
+    write_random(str(tmp_path / 'src' / 'nested' / 'small.bin'), 100, seed=1)
+
+    composed = []
+    original_compose = LocalBlob.compose
+
+    def spy_compose(self, sources):
+        composed.append((self.name, [source.name for source in sources]))
+        return original_compose(self, sources)
+
+    monkeypatch.setattr(LocalBlob, 'compose', spy_compose)
+    stats = small_engine(bucket).upload_directory(str(tmp_path / 'src'), 'data')
+
+    assert stats.files == 2 and not stats.failures
+    assert len(composed) == 1
+    name, parts = composed[0]
+    assert name == 'data/big.bin'
+    assert parts == [f"data/big.bin.__part_{i:02d}" for i in range(11)]
+    assert bucket.blob('data/big.bin').download_as_bytes() == data
+
+    # Temporary parts are deleted once composed
+    assert sorted(blob.name for blob in bucket.list_blobs('data')) == ['data/big.bin', 'data/nested/small.bin']
+
+def test_chunk_ranges_respect_compose_limit(bucket):
+    engine = small_engine(bucket)
+    size = 100 * KB
+    ranges = engine._chunk_ranges(size)
+    assert len(ranges) <= gcs_transfer.MAX_COMPOSE_COMPONENTS
+    assert ranges[0][0] == 0 and ranges[-1][1] == size
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+def test_upload_skips_unchanged_files(tmp_path, bucket):
+    src = str(tmp_path / 'src')
+    write_random(os.path.join(src, 'a.bin'), 2 * KB, seed=1)
+    write_random(os.path.join(src, 'b.bin'), 2 * KB, seed=2)
+    engine = small_engine(bucket)
+
+    first = engine.upload_directory(src, 'data')
+    assert (first.files, first.skipped) == (2, 0)
+
+    second = engine.upload_directory(src, 'data')
+    assert (second.files, second.skipped) == (0, 2)
+
+    # Same size, different content: the md5 check catches it
+    write_random(os.path.join(src, 'b.bin'), 2 * KB, seed=3)
+    third = engine.upload_directory(src, 'data')
+    assert (third.files, third.skipped) == (1, 1)
+
+class RemoteObject:
+    def __init__(self, size, md5_hash=None, crc32c=None):
+        self.size = size
+        self.md5_hash = md5_hash
+        self.crc32c = crc32c
+
+def test_matches_remote_by_md5(tmp_path):
+    path = str(tmp_path / 'file.bin')
+    write_random(path, KB)
+    assert matches_remote(path, RemoteObject(KB, md5_hash=file_md5(path)))
+    assert not matches_remote(path, RemoteObject(KB, md5_hash='not-the-md5'))
+    assert not matches_remote(path, RemoteObject(KB + 1, md5_hash=file_md5(path)))
+    assert not matches_remote(path, None)
+
+def test_matches_remote_by_crc32c_for_composite_objects(tmp_path, monkeypatch):
+    path = str(tmp_path / 'file.bin')
+    write_random(path, KB)
+
+    monkeypatch.setattr(gcs_transfer, 'file_crc32c', lambda p: 'crc-of-file')
+    assert matches_remote(path, RemoteObject(KB, crc32c='crc-of-file'))
+    assert not matches_remote(path, RemoteObject(KB, crc32c='other-crc'))
+
+    # Without google-crc32c the match is unknown, so the object is transferred again
+    monkeypatch.setattr(gcs_transfer, 'file_crc32c', lambda p: None)
+    assert not matches_remote(path, RemoteObject(KB, crc32c='crc-of-file'))
+
+def test_local_blob_ranged_read_is_inclusive(bucket):
+    blob = bucket.blob('data/range.bin')
+    blob.upload_from_string(bytes(range(100)))
+    assert blob.download_as_bytes(start=10, end=19) == bytes(range(10, 20))
+    assert blob.download_as_bytes(start=95) == bytes(range(95, 100))
+    assert blob.download_as_bytes() == bytes(range(100))
+
+def test_chunked_download_uses_ranged_reads(tmp_path, bucket, monkeypatch):
+    data = write_random(str(tmp_path / 'src' / 'big.bin'), 10 * KB + 17)
+    engine = small_engine(bucket)
+    engine.upload_directory(str(tmp_path / 'src'), 'data')
+
+    ranges = []
+    original_download = LocalBlob.download_as_bytes
+
+    def spy_download(self, *, start=None, end=None):
+        ranges.append((start, end))
+        return original_download(self, start=start, end=end)
+
+    monkeypatch.setattr(LocalBlob, 'download_as_bytes', spy_download)
+    dest = str(tmp_path / 'dest')
+    stats = engine.download_prefix('data', dest)
+
+    assert stats.files == 1 and not stats.failures
+    with open(os.path.join(dest, 'big.bin'), 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(os.path.join(dest, 'big.bin.part'))
+
+    # Inclusive ranges that tile the object exactly
+    ranges.sort()
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data) - 1
+    assert all(a[1] + 1 == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    # A second download finds the file unchanged
+    assert engine.download_prefix('data', dest).skipped == 1
+
+def test_download_ignores_leftover_parts(tmp_path, bucket):
+    bucket.blob('data/video.mp4').upload_from_string(b'video')
+    bucket.blob('data/video.mp4.__part_00').upload_from_string(b'vid')
+    dest = str(tmp_path / 'dest')
+    small_engine(bucket).download_prefix('data', dest)
+    assert os.listdir(dest) == ['video.mp4']
@@ -0,0 +1,117 @@
+"""Tests for parsing Video Intelligence person detection results with fake responses"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from preprocessing.video_intelligence_parser import (
+    NUM_LANDMARKS, knee_normalize, parse_annotation_result, save_landmarks_parquet,
+)
+from training.windows import read_landmarks, video_id_from_path
+
+KNEE_LANDMARKS = {23, 24, 25, 26, 27, 28}
+
+def fake_landmark(x, y, visibility=1.0):
+    return SimpleNamespace(x=x, y=y, visibility=visibility)
+
+def fake_timestamp(seconds, landmarks):
+    whole = int(seconds)
+    return SimpleNamespace(
+        time_offset=SimpleNamespace(seconds=whole, nanos=int(round((seconds - whole) * 1e9))),
+        pose_landmarks=landmarks,
+    )
+
+def fake_track(times, value, confidence=0.5, num_landmarks=NUM_LANDMARKS):
+    """A track whose landmarks all sit at (value, value), so frames reveal their track"""
+    return SimpleNamespace(
+        confidence=confidence,
+        timestamps=[fake_timestamp(t, [fake_landmark(value, value)] * num_landmarks) for t in times],
+    )
+
+def fake_result(*tracks):
+    detection = SimpleNamespace(tracks=list(tracks))
+    annotation = SimpleNamespace(person_detection_annotations=[detection])
+    return SimpleNamespace(annotation_results=[annotation])
+
+def frame_values(df):
+    return [frame[0][0] for frame in df['landmarks']]
+
+def test_keeps_the_track_with_most_frames_per_timestamp():
+    long_track = fake_track([0.0, 0.5, 1.0, 1.5], value=0.1, confidence=0.2)
+    short_track = fake_track([0.5, 1.0, 2.0], value=0.9, confidence=0.9)
+    df = parse_annotation_result(fake_result(short_track, long_track), 'video_a', KNEE_LANDMARKS)
+
+    assert list(df['frame_time']) == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert frame_values(df) == pytest.approx([0.1, 0.1, 0.1, 0.1, 0.9])
+    assert list(df['frame_index']) == [0, 1, 2, 3, 4]
+    assert list(df['frame']) == [f"video_a_frame_{ms}" for ms in (0, 500, 1000, 1500, 2000)]
+
+def test_confidence_breaks_ties_between_equal_tracks():
+    weak = fake_track([0.0, 1.0], value=0.2, confidence=0.3)
+    strong = fake_track([0.0, 1.0], value=0.7, confidence=0.8)
+    df = parse_annotation_result(fake_result(weak, strong), 'video_b', KNEE_LANDMARKS)
+    assert frame_values(df) == pytest.approx([0.7, 0.7])
+
+def test_skips_timestamps_without_landmarks_and_empty_results():
+    track = fake_track([0.0, 1.0], value=0.4)
+    track.timestamps.append(fake_timestamp(2.0, []))
+    df = parse_annotation_result(fake_result(track), 'video_c', KNEE_LANDMARKS)
+    assert list(df['frame_time']) == [0.0, 1.0]
+
+    assert parse_annotation_result(fake_result(), 'video_d', KNEE_LANDMARKS) is None
+
+def test_target_landmarks_zero_the_rest():
+    df = parse_annotation_result(fake_result(fake_track([0.0], value=0.5)), 'video_e',
+                                 KNEE_LANDMARKS, target_landmarks=KNEE_LANDMARKS)
+    landmarks = np.asarray(df['landmarks'][0])
+    assert landmarks.shape == (NUM_LANDMARKS, 4)
+    assert np.all(landmarks[sorted(KNEE_LANDMARKS)][:, [0, 1, 3]] != 0)
+    others = [i for i in range(NUM_LANDMARKS) if i not in KNEE_LANDMARKS]
+    assert np.all(landmarks[others] == 0)
+
+def test_knee_normalize_scales_knee_box_to_unit_square():
+    knee_mask = np.zeros(NUM_LANDMARKS, dtype=bool)
+    knee_mask[[25, 26]] = True
+    landmarks = np.zeros((2, NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:, 0, :2] = (0.3, 0.3)            # not a knee landmark
+    landmarks[0, 25, :2] = (0.2, 0.4)
+    landmarks[0, 26, :2] = (0.6, 0.8)
+    landmarks[1, 25, :2] = (0.5, 0.5)           # degenerate box: both knees at one point
+    landmarks[1, 26, :2] = (0.5, 0.5)
+    present = np.ones((2, NUM_LANDMARKS), dtype=bool)
+
+    normalized = knee_normalize(landmarks, present, knee_mask)
+
+    assert normalized.shape == (2, NUM_LANDMARKS, 2)
+    np.testing.assert_allclose(normalized[0, 25], (0.0, 0.0))
+    np.testing.assert_allclose(normalized[0, 26], (1.0, 1.0))
+    np.testing.assert_allclose(normalized[:, 0], landmarks[:, 0, :2])
+    np.testing.assert_allclose(normalized[1, 25], (0.5, 0.5))
+
+def test_knee_normalize_ignores_missing_landmarks():
+    knee_mask = np.zeros(NUM_LANDMARKS, dtype=bool)
+    knee_mask[[25, 26, 27]] = True
+    landmarks = np.zeros((1, NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[0, 25, :2] = (0.2, 0.2)
+    landmarks[0, 26, :2] = (0.4, 0.6)
+    landmarks[0, 27, :2] = (0.9, 0.9)
+    present = np.ones((1, NUM_LANDMARKS), dtype=bool)
+    present[0, 27] = False
+
+    normalized = knee_normalize(landmarks, present, knee_mask)
+    np.testing.assert_allclose(normalized[0, 26], (1.0, 1.0))
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip('pyarrow')
+    track = fake_track([1.0, 0.0, 0.5], value=0.25)
+    track.timestamps[0].pose_landmarks = [fake_landmark(0.75, 0.75)] * NUM_LANDMARKS
+    df = parse_annotation_result(fake_result(track), 'video_f', KNEE_LANDMARKS)
+
+    path = save_landmarks_parquet(df, str(tmp_path), 'video_f')
+    assert video_id_from_path(path) == 'video_f'
+
+    landmarks = read_landmarks(path)
+    assert landmarks.shape == (3, NUM_LANDMARKS, 4)
+    assert landmarks.dtype == np.float32
+    np.testing.assert_allclose(landmarks[:, 0, 0], [0.25, 0.25, 0.75])
+    np.testing.assert_allclose(landmarks[:, 0, 3], [1.0, 1.0, 1.0])
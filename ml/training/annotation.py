@@ -0,0 +1,98 @@
+"""
+Concurrent fan-out of long-running video annotation jobs
+Submits up to a concurrency limit, polls all pending operations together and
+hands each result to a pluggable handler as soon as it completes
+"""
+import time
+from collections import deque
+
+def cancel_operation(operation):
+    """Try to cancel an operation; returns False if it may still be running"""
+    try:
+        return bool(operation.cancel())
+    except Exception:
+        return False
+
+def wait_quietly(operation):
+    """Block until an operation finishes, ignoring its outcome"""
+    try:
+        operation.result()
+    except Exception:
+        pass
+
+class AnnotationFanOut:
+    """Runs annotation operations concurrently
+
+    Args:
+        submit: Callable taking a video URI and returning an operation with
+            done() and result() methods (e.g. from annotate_video)
+        handle_result: Callable taking (video_uri, result), called as each
+            operation completes; its return value is collected per video
+        max_concurrent: Maximum operations in flight at once
+        poll_interval: Seconds between polls when nothing has completed
+        timeout: Seconds after submission before an operation is abandoned;
+            operations that cannot be cancelled are waited for before run() returns
+    """
+
+    def __init__(self, submit, handle_result, max_concurrent=8, poll_interval=5.0, timeout=300):
+        self.submit = submit
+        self.handle_result = handle_result
+        self.max_concurrent = max_concurrent
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def run(self, video_uris):
+        """Annotate all videos
+
+        Returns:
+            (outputs, failures) where outputs maps video URI to the handler's
+            return value and failures maps video URI to the error message
+        """
+        queued = deque(video_uris)
+        running = {}
+        outputs = {}
+        failures = {}
+        uncancelled = []
+        start = time.monotonic()
+
+        while queued or running:
+            # Keep the pipeline full
+            while queued and len(running) < self.max_concurrent:
+                uri = queued.popleft()
+                try:
+                    running[uri] = (self.submit(uri), time.monotonic())
+                    print(f"Submitted annotation for {uri} ({len(running)} in flight)")
+                except Exception as e:
+                    print(f"Failed to submit {uri}: {e}")
+                    failures[uri] = str(e)
+
+            completed = False
+            for uri, (operation, submitted_at) in list(running.items()):
+                if operation.done():
+                    del running[uri]
+                    completed = True
+                    try:
+                        outputs[uri] = self.handle_result(uri, operation.result())
+                        print(f"Annotation finished for {uri} ({len(outputs)} done)")
+                    except Exception as e:
+                        print(f"Annotation failed for {uri}: {e}")
+                        failures[uri] = str(e)
+                elif time.monotonic() - submitted_at > self.timeout:
+                    del running[uri]
+                    completed = True
+                    print(f"Annotation timed out for {uri}")
+                    failures[uri] = f"Timed out after {self.timeout}s"
+                    if not cancel_operation(operation):
+                        uncancelled.append(operation)
+
+            if running and not completed:
+                time.sleep(self.poll_interval)
+
+        # Jobs that were already running may still be writing output the next stage reads
+        if uncancelled:
+            print(f"Waiting for {len(uncancelled)} timed out annotations that could not be cancelled")
+            for operation in uncancelled:
+                wait_quietly(operation)
+
+        print(f"Annotated {len(outputs)} videos in {time.monotonic() - start:.1f}s, {len(failures)} failed")
+        return outputs, failures
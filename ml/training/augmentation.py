@@ -0,0 +1,132 @@
+"""
+On-the-fly augmentation of landmark windows
+All transforms work on whole batches of shape (batch, frames, 33, 4) with NumPy, no per-sample loops
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4
+
+# MediaPipe pose left/right landmark pairs (the nose, 0, maps to itself)
+MIRROR_PAIRS = [(1, 4), (2, 5), (3, 6), (7, 8), (9, 10), (11, 12), (13, 14), (15, 16),
+                (17, 18), (19, 20), (21, 22), (23, 24), (25, 26), (27, 28), (29, 30), (31, 32)]
+MIRROR_INDEX = np.arange(NUM_LANDMARKS)
+for _left, _right in MIRROR_PAIRS:
+    MIRROR_INDEX[_left], MIRROR_INDEX[_right] = _right, _left
+
+def mirror(batch, selected):
+    """Flip selected samples horizontally, swapping left and right landmarks
+
+    Args:
+        batch: Array of shape (batch, frames, 33, 4) with x, y normalized to [0, 1]
+        selected: Boolean array (batch,) of samples to mirror
+    """
+    flipped = batch[:, :, MIRROR_INDEX].copy()
+    flipped[..., 0] = 1.0 - flipped[..., 0]
+    return np.where(selected[:, None, None, None], flipped, batch)
+
+def rotate_scale(batch, angles, scales):
+    """Rotate x/y about each sample's pose center and scale x/y/z
+
+    Args:
+        angles: Rotation per sample in radians, shape (batch,)
+        scales: Scale factor per sample, shape (batch,)
+    """
+    out = batch.copy()
+    center = batch[..., :2].mean(axis=(1, 2), keepdims=True)
+    xy = batch[..., :2] - center
+    cos = np.cos(angles)[:, None, None]
+    sin = np.sin(angles)[:, None, None]
+    s = scales[:, None, None]
+    out[..., 0] = (xy[..., 0] * cos - xy[..., 1] * sin) * s + center[..., 0]
+    out[..., 1] = (xy[..., 0] * sin + xy[..., 1] * cos) * s + center[..., 1]
+    out[..., 2] = batch[..., 2] * s
+    return out
+
+def time_warp(batch, speeds, shifts):
+    """Resample each window in time around its middle frame
+
+    Args:
+        speeds: Playback speed per sample (>1 is faster), shape (batch,)
+        shifts: Offset in frames per sample (temporal jitter), shape (batch,)
+
+    Frames are linearly interpolated; positions past either end repeat the edge frame.
+    """
+    num_samples, frames = batch.shape[:2]
+    middle = (frames - 1) / 2.0
+    t = np.arange(frames)[None, :]
+    source = np.clip(middle + (t - middle) * speeds[:, None] + shifts[:, None], 0, frames - 1)
+
+    lower = np.floor(source).astype(int)
+    upper = np.minimum(lower + 1, frames - 1)
+    weight = (source - lower)[..., None, None].astype(batch.dtype)
+    rows = np.arange(num_samples)[:, None]
+    return batch[rows, lower] * (1 - weight) + batch[rows, upper] * weight
+
+def visibility_dropout(batch, dropped):
+    """Zero out dropped landmarks, as if the detector had missed them
+
+    Args:
+        dropped: Boolean array (batch, frames, 33)
+    """
+    return np.where(dropped[..., None], 0.0, batch).astype(batch.dtype)
+
+class LandmarkAugmenter:
+    """Random mirror, rotation/scale, time warp and visibility dropout for landmark windows
+
+    Accepts windows shaped (batch, frames, 33 * 4) as used for training or
+    (batch, frames, 33, 4) and returns the same shape.
+
+    Args:
+        mirror_prob: Probability of mirroring a sample
+        max_rotation_deg: Rotations are drawn from +/- this many degrees
+        scale_range: (min, max) scale factor
+        max_shift_frames: Temporal jitter is drawn from +/- this many frames
+        speed_range: (min, max) playback speed
+        dropout_rate: Probability of dropping each landmark in each frame
+        seed: Random seed
+    """
+
+    def __init__(self, mirror_prob=0.5, max_rotation_deg=10.0, scale_range=(0.9, 1.1),
+                 max_shift_frames=2.0, speed_range=(0.8, 1.2), dropout_rate=0.05, seed=None):
+        self.mirror_prob = mirror_prob
+        self.max_rotation = np.deg2rad(max_rotation_deg)
+        self.scale_range = tuple(scale_range)
+        self.max_shift_frames = max_shift_frames
+        self.speed_range = tuple(speed_range)
+        self.dropout_rate = dropout_rate
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_config(cls, config, seed=None):
+        """Create an augmenter from the training config, or None if augmentation is disabled"""
+        options = dict(config.get('augmentation') or {})
+        if not options.pop('enabled', False):
+            return None
+        return cls(seed=seed, **options)
+
+    def __call__(self, windows):
+        windows = np.asarray(windows, dtype=np.float32)
+        shape = windows.shape
+        batch = windows.reshape(shape[0], shape[1], NUM_LANDMARKS, LANDMARK_DIMS)
+        n = len(batch)
+        rng = self.rng
+
+        if self.mirror_prob:
+            batch = mirror(batch, rng.random(n) < self.mirror_prob)
+        if self.max_rotation or self.scale_range != (1.0, 1.0):
+            batch = rotate_scale(
+                batch,
+                rng.uniform(-self.max_rotation, self.max_rotation, n),
+                rng.uniform(*self.scale_range, n)
+            )
+        if self.max_shift_frames or self.speed_range != (1.0, 1.0):
+            batch = time_warp(
+                batch,
+                rng.uniform(*self.speed_range, n),
+                rng.uniform(-self.max_shift_frames, self.max_shift_frames, n)
+            )
+        if self.dropout_rate:
+            batch = visibility_dropout(batch, rng.random(batch.shape[:3]) < self.dropout_rate)
+
+        return batch.reshape(shape).astype(np.float32)
@@ -0,0 +1,246 @@
+"""
+Pluggable backends for storage, annotation and training in PhysioFlowMLPipeline
+GCPBackend uses Cloud Storage, Video Intelligence and Vertex AI; LocalBackend runs
+the same pipeline offline on one machine
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from training.gcs_transfer import LocalBucket
+
+class PipelineBackend(ABC):
+    """Services the pipeline needs from its environment
+
+    Object URIs always take the form gs://<bucket>/<name>, whichever backend
+    stores them, so pipeline code and the stage cache are backend agnostic.
+    """
+
+    # Seconds to wait for one annotation, and the most worth having in flight (None for no limit)
+    annotation_timeout = 300
+    max_concurrent_annotations = None
+
+    @abstractmethod
+    def get_bucket(self, bucket_name):
+        """Return a bucket object (google.cloud.storage.Bucket API subset)"""
+
+    @abstractmethod
+    def submit_annotation(self, video_uri, output_dir):
+        """Start pose annotation of a video; return an operation with done() and result()"""
+
+    @abstractmethod
+    def handle_annotation_result(self, pipeline, video_uri, result, target_specific_landmarks=True):
+        """Turn a finished annotation into a landmarks file; return its path"""
+
+    @abstractmethod
+    def run_training_job(self, pipeline, landmarks_uri, config_uri):
+        """Train a model; return the URI of the model directory"""
+
+    def close(self):
+        """Release backend resources"""
+
+class GCPBackend(PipelineBackend):
+    """Cloud Storage + Video Intelligence API + Vertex AI custom jobs"""
+
+    def __init__(self, project_id, region, staging_bucket=None, video_client=None):
+        from google.cloud import aiplatform, storage
+
+        self.project_id = project_id
+        self.region = region
+        self.storage_client = storage.Client(project=project_id)
+        self.video_client = video_client  # Created on first use; may be replaced with a fake in tests
+
+        # Initialize Vertex AI
+        aiplatform.init(
+            project=project_id,
+            location=region,
+            staging_bucket=staging_bucket
+        )
+
+    def get_bucket(self, bucket_name):
+        # Create bucket if it doesn't exist
+        try:
+            bucket = self.storage_client.get_bucket(bucket_name)
+        except Exception:
+            print(f"Creating new bucket: {bucket_name}")
+            bucket = self.storage_client.create_bucket(
+                bucket_name,
+                location=self.region
+            )
+        return bucket
+
+    def submit_annotation(self, video_uri, output_dir):
+        from google.cloud import videointelligence_v1 as videointelligence
+
+        if self.video_client is None:
+            self.video_client = videointelligence.VideoIntelligenceServiceClient()
+
+        # Configure the request
+        features = [videointelligence.Feature.PERSON_DETECTION]
+
+        # Set up processing - adjust based on your needs
+        person_config = videointelligence.PersonDetectionConfig(
+            include_pose_landmarks=True,
+            include_bounding_boxes=False
+        )
+
+        config = videointelligence.VideoContext(
+            person_detection_config=person_config
+        )
+
+        # Launch the asynchronous request
+        return self.video_client.annotate_video(
+            request={
+                "features": features,
+                "input_uri": video_uri,
+                "video_context": config,
+            }
+        )
+
+    def handle_annotation_result(self, pipeline, video_uri, result, target_specific_landmarks=True):
+        return pipeline._parse_annotation_result(video_uri, result, target_specific_landmarks)
+
+    def run_training_job(self, pipeline, landmarks_uri, config_uri):
+        from google.cloud import aiplatform
+        from training.train_local import load_config
+
+        bucket_name = pipeline.bucket_name
+
+        # Create a unique job name
+        job_name = f"physioflow_training_{int(time.time())}"
+
+        # Define container args
+        container_args = [
+            f"--config={config_uri}",
+            f"--data-dir={landmarks_uri}",
+            f"--output-dir=gs://{bucket_name}/models"
+        ]
+
+        # More than one replica trains data-parallel; Vertex AI sets TF_CONFIG on each
+        replica_count = int(load_config(pipeline.config_path).get('distributed', {}).get('replica_count', 1))
+        if replica_count > 1:
+            container_args.append("--distribute=multi_worker")
+
+        # Use correct Vertex AI container image
+        custom_container_image = "us-docker.pkg.dev/vertex-ai/training/tf-gpu.2-12:latest"
+
+        # Create Python package
+        package_path = pipeline._package_training_code()
+
+        # Upload package to GCS
+        package_gcs_path = pipeline.upload_to_gcs(
+            package_path,
+            f"code/physioflow_training_{int(time.time())}"
+        )
+
+        # Create and run the custom training job
+        worker_pool_spec = {
+            "machine_spec": {
+                "machine_type": "n1-standard-8",
+                "accelerator_type": "NVIDIA_TESLA_T4",
+                "accelerator_count": 1,
+            },
+            "replica_count": 1,
+            "python_package_spec": {
+                "executor_image_uri": custom_container_image,
+                "package_uris": [package_gcs_path],
+                "python_module": "trainer.task",
+                "args": container_args,
+            },
+        }
+        # The first pool is the chief; identical workers make up the rest of the cluster
+        worker_pool_specs = [worker_pool_spec]
+        if replica_count > 1:
+            worker_pool_specs.append({**worker_pool_spec, "replica_count": replica_count - 1})
+
+        job = aiplatform.CustomJob(
+            display_name=job_name,
+            worker_pool_specs=worker_pool_specs,
+            staging_bucket=f"gs://{bucket_name}"
+        )
+
+        print(f"Starting Vertex AI training job: {job_name}")
+        job.run()
+        print("Training job completed successfully")
+
+        return f"gs://{bucket_name}/models"
+
+class _FutureOperation:
+    """Adapts a concurrent.futures.Future to the long-running operation interface"""
+
+    def __init__(self, future):
+        self._future = future
+
+    def done(self):
+        return self._future.done()
+
+    def result(self, timeout=None):
+        return self._future.result(timeout)
+
+    def cancel(self):
+        return self._future.cancel()
+
+class LocalBackend(PipelineBackend):
+    """Offline backend: a directory as the bucket, MediaPipe for landmarks, in-process training
+
+    Args:
+        root_dir: Directory holding one subdirectory per bucket
+        max_workers: Videos annotated concurrently
+        fps: Frame sampling rate for MediaPipe annotation
+        annotation_timeout: Seconds to wait for one video; MediaPipe on CPU is much
+            slower than the Video Intelligence API
+    """
+
+    def __init__(self, root_dir='ml/data/local_bucket', max_workers=None, fps=2, annotation_timeout=3600):
+        self.root_dir = os.path.abspath(root_dir)
+        self.fps = fps
+        self._bucket = None
+        # Submitting more than the executor runs would start timeouts while jobs are still queued
+        self.max_concurrent_annotations = max_workers or max((os.cpu_count() or 2) // 2, 1)
+        self.annotation_timeout = annotation_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_annotations)
+
+    def get_bucket(self, bucket_name):
+        self._bucket = LocalBucket(os.path.join(self.root_dir, bucket_name), name=bucket_name)
+        return self._bucket
+
+    def local_path(self, uri):
+        """Map a gs://<bucket>/<name> URI to its path inside the local bucket"""
+        name = uri.split('/', 3)[3] if uri.startswith('gs://') else uri
+        return os.path.join(self._bucket.root, *name.split('/'))
+
+    def _annotate(self, video_uri, output_dir):
+        """Extract frames with ffmpeg and landmarks with MediaPipe via pose_processor"""
+        from preprocessing.pose_processor import extract_frames, process_frames
+
+        video_name = os.path.splitext(os.path.basename(video_uri))[0]
+        frames_dir = os.path.join(os.path.dirname(output_dir), "frames", video_name)
+        extract_frames(self.local_path(video_uri), frames_dir, fps=self.fps)
+        return process_frames(frames_dir, output_dir)
+
+    def submit_annotation(self, video_uri, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        return _FutureOperation(self._executor.submit(self._annotate, video_uri, output_dir))
+
+    def handle_annotation_result(self, pipeline, video_uri, result, target_specific_landmarks=True):
+        # pose_processor already wrote the parquet file; MediaPipe keeps all 33 landmarks
+        return result
+
+    def run_training_job(self, pipeline, landmarks_uri, config_uri):
+        from training.train_local import load_config, train_model
+        from data_collection.metadata_store import CATALOG_FILENAME
+
+        models_uri = f"gs://{pipeline.bucket_name}/models"
+        config = load_config(self.local_path(config_uri))
+        tflite_path = train_model(
+            config,
+            output_dir=self.local_path(models_uri),
+            landmarks_dir=self.local_path(landmarks_uri),
+            catalog_path=self.local_path(f"gs://{pipeline.bucket_name}/data/{CATALOG_FILENAME}")
+        )
+        print(f"Local training wrote {tflite_path}")
+        return models_uri
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,81 @@
+"""
+Video-level (grouped) train/validation splits with fold assignments cached on disk
+Keeps overlapping windows from the same video on one side of the split
+"""
+import os
+import json
+import hashlib
+from collections import Counter
+import numpy as np
+
+DEFAULT_SPLITS_DIR = 'ml/data/splits'
+
+def assign_folds(groups, n_folds, seed=42):
+    """Assign each group to a fold, balancing the number of windows per fold
+
+    Args:
+        groups: Group id (source video) for every window
+        n_folds: Number of folds
+        seed: Random seed for ordering groups of equal size
+
+    Returns:
+        Dictionary of group id -> fold index
+    """
+    counts = Counter(groups)
+    if len(counts) < n_folds:
+        raise ValueError(f"Need at least {n_folds} videos for {n_folds} folds, found {len(counts)}")
+
+    # Shuffle, then place the largest groups first into the emptiest fold
+    rng = np.random.default_rng(seed)
+    ordered = sorted(counts)
+    rng.shuffle(ordered)
+    ordered.sort(key=lambda g: counts[g], reverse=True)
+
+    fold_sizes = [0] * n_folds
+    assignment = {}
+    for group in ordered:
+        fold = int(np.argmin(fold_sizes))
+        assignment[group] = fold
+        fold_sizes[fold] += counts[group]
+
+    return assignment
+
+def cached_fold_assignments(groups, n_folds, seed=42, cache_dir=DEFAULT_SPLITS_DIR):
+    """Load fold assignments for this exact set of videos from disk, computing them once
+
+    The cache key covers the video ids, their window counts, the number of
+    folds and the seed, so any change to the dataset produces a new file.
+    """
+    counts = Counter(groups)
+    key_source = json.dumps({'groups': sorted(counts.items()), 'n_folds': n_folds, 'seed': seed})
+    key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"folds_{n_folds}_{key}.json")
+
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            return json.load(f)['assignment']
+
+    assignment = assign_folds(groups, n_folds, seed)
+
+    # Write atomically so parallel fold workers never read a partial file
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'n_folds': n_folds, 'seed': seed, 'assignment': assignment}, f, indent=2)
+    os.replace(tmp_path, cache_path)
+    print(f"Saved fold assignments to {cache_path}")
+
+    return assignment
+
+def kfold_indices(groups, n_folds, seed=42, cache_dir=DEFAULT_SPLITS_DIR):
+    """Build grouped k-fold splits
+
+    Returns:
+        List of (train_indices, val_indices) tuples, one per fold
+    """
+    assignment = cached_fold_assignments(groups, n_folds, seed, cache_dir)
+    window_folds = np.array([assignment[g] for g in groups])
+    return [
+        (np.flatnonzero(window_folds != fold), np.flatnonzero(window_folds == fold))
+        for fold in range(n_folds)
+    ]
@@ -0,0 +1,128 @@
+"""
+Data-parallel training with tf.distribute
+MirroredStrategy replicates the model across the devices of one process;
+MultiWorkerMirroredStrategy spans processes or hosts described by TF_CONFIG,
+as set by Vertex AI for multi-replica jobs or by launch_local_workers
+"""
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import subprocess
+
+STRATEGIES = ('none', 'mirrored', 'multi_worker')
+
+def make_tf_config(workers, index):
+    """TF_CONFIG for worker index of a cluster of host:port addresses"""
+    return {'cluster': {'worker': list(workers)}, 'task': {'type': 'worker', 'index': index}}
+
+def read_tf_config():
+    """Parsed TF_CONFIG environment variable, or {} when not running in a cluster"""
+    return json.loads(os.environ.get('TF_CONFIG') or '{}')
+
+def is_chief(tf_config=None):
+    """Whether this process should write checkpoints, exports and reports
+
+    The chief is the 'chief' task when the cluster has one (Vertex AI's first
+    worker pool), otherwise worker 0. A process outside a cluster is its own chief.
+    """
+    tf_config = read_tf_config() if tf_config is None else tf_config
+    task = tf_config.get('task')
+    if not task:
+        return True
+    if task['type'] == 'chief':
+        return True
+    return task['type'] == 'worker' and task['index'] == 0 and 'chief' not in tf_config.get('cluster', {})
+
+def create_strategy(mode='none'):
+    """Create the distribution strategy for mode (none, mirrored or multi_worker)"""
+    import tensorflow as tf
+
+    if mode not in STRATEGIES:
+        raise ValueError(f"Unknown distribution strategy {mode!r}, expected one of {STRATEGIES}")
+    if mode == 'mirrored':
+        strategy = tf.distribute.MirroredStrategy()
+    elif mode == 'multi_worker':
+        # Must be created before any other TensorFlow op in the process
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    else:
+        return tf.distribute.get_strategy()
+    print(f"Distributed training with {type(strategy).__name__} over {strategy.num_replicas_in_sync} replicas")
+    return strategy
+
+def worker_output_dir(output_dir, tf_config=None):
+    """Directory this process should save into
+
+    Every worker has to run the same saving code, but only the chief's files
+    are kept; other workers write to a temporary directory.
+
+    Returns:
+        (directory, is_temporary)
+    """
+    tf_config = read_tf_config() if tf_config is None else tf_config
+    if is_chief(tf_config):
+        return output_dir, False
+    task = tf_config['task']
+    return tempfile.mkdtemp(prefix=f"physioflow_{task['type']}{task['index']}_"), True
+
+def find_free_ports(count):
+    """Reserve count free localhost ports (released just before the workers bind them)"""
+    sockets = []
+    try:
+        for _ in range(count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind(('localhost', 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+def launch_local_workers(num_workers, argv, poll_interval=0.5):
+    """Run a training command as num_workers CPU worker processes on this host
+
+    Each worker gets its own TF_CONFIG, GPUs hidden and an equal share of the
+    cores. If one worker fails the others are stopped, since the survivors
+    would block forever in collective ops.
+
+    Args:
+        argv: Command line to run under the current interpreter (script and arguments)
+
+    Returns:
+        0 if every worker succeeded, else the first non-zero exit code
+    """
+    workers = [f"localhost:{port}" for port in find_free_ports(num_workers)]
+    threads = max((os.cpu_count() or 1) // num_workers, 1)
+    print(f"Launching {num_workers} local workers ({threads} threads each): {', '.join(workers)}")
+
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env['TF_CONFIG'] = json.dumps(make_tf_config(workers, index))
+        env['CUDA_VISIBLE_DEVICES'] = ''
+        env['TF_NUM_INTRAOP_THREADS'] = str(threads)
+        env['TF_NUM_INTEROP_THREADS'] = '1'
+        processes.append(subprocess.Popen([sys.executable] + list(argv), env=env))
+
+    exit_code = 0
+    try:
+        while True:
+            # Poll every worker each round so a failure is seen while others still run
+            statuses = [p.poll() for p in processes]
+            failed = [status for status in statuses if status]
+            if failed:
+                exit_code = failed[0]
+                print(f"A worker exited with code {exit_code}, stopping the others")
+                break
+            if all(status is not None for status in statuses):
+                break
+            time.sleep(poll_interval)
+    finally:
+        for p in processes:
+            if p.poll() is None:
+                p.terminate()
+        for p in processes:
+            p.wait()
+    return exit_code or next((p.returncode for p in processes if p.returncode), 0)
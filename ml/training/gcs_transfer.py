@@ -0,0 +1,363 @@
+"""
+Concurrent transfer engine for moving pipeline data to and from a GCS bucket
+Also provides LocalBucket, a filesystem stand-in with the subset of the bucket API we use
+"""
+import os
+import re
+import math
+import time
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import google_crc32c
+except ImportError:
+    google_crc32c = None
+
+MB = 1024 * 1024
+HASH_BLOCK_SIZE = 8 * MB
+MAX_COMPOSE_COMPONENTS = 32  # GCS limit per compose request
+PART_SUFFIX = re.compile(r'\.__part_\d+$')  # temporary parts of a composite upload
+
+def file_md5(path):
+    """Base64 MD5 of a file, in the format GCS reports as blob.md5_hash"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode('ascii')
+
+def file_crc32c(path):
+    """Base64 CRC32C of a file as GCS reports it (None if google-crc32c is unavailable)"""
+    if google_crc32c is None:
+        return None
+    checksum = google_crc32c.Checksum()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode('ascii')
+
+def matches_remote(local_path, remote):
+    """Check whether a local file has the same size and checksum as a remote object"""
+    if remote is None or not os.path.exists(local_path):
+        return False
+    if os.path.getsize(local_path) != remote.size:
+        return False
+
+    # Composite objects have no MD5, only CRC32C; without google-crc32c the
+    # match is unknown, so the object is transferred rather than trusted on size
+    if getattr(remote, 'md5_hash', None):
+        return file_md5(local_path) == remote.md5_hash
+    if getattr(remote, 'crc32c', None):
+        local_crc = file_crc32c(local_path)
+        return local_crc is not None and local_crc == remote.crc32c
+    return True
+
+class LocalBlob:
+    """Filesystem-backed object mirroring the google.cloud.storage.Blob methods we use"""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.size = None
+        self.crc32c = None
+        self._md5_hash = None
+
+    @property
+    def path(self):
+        return os.path.join(self.bucket.root, *self.name.split('/'))
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    @property
+    def md5_hash(self):
+        # Computed lazily so listing a large local bucket stays cheap
+        if self._md5_hash is None and self.exists():
+            self._md5_hash = file_md5(self.path)
+        return self._md5_hash
+
+    def reload(self):
+        self.size = os.path.getsize(self.path)
+        self._md5_hash = None
+        return self
+
+    def _write(self, write_fn):
+        """Write through a temporary file so readers never see partial objects"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            write_fn(f)
+        os.replace(tmp_path, self.path)
+
+    def upload_from_filename(self, filename):
+        def copy(f):
+            with open(filename, 'rb') as src:
+                for block in iter(lambda: src.read(HASH_BLOCK_SIZE), b''):
+                    f.write(block)
+        self._write(copy)
+
+    def upload_from_string(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._write(lambda f: f.write(data))
+
+    def download_to_filename(self, filename):
+        with open(self.path, 'rb') as src, open(filename, 'wb') as dst:
+            for block in iter(lambda: src.read(HASH_BLOCK_SIZE), b''):
+                dst.write(block)
+
+    def download_as_bytes(self, *, start=None, end=None):
+        """Read the object, or the inclusive byte range [start, end] like GCS
+
+        Keyword-only, since Blob.download_as_bytes takes client as its first argument.
+        """
+        with open(self.path, 'rb') as f:
+            if start is None:
+                return f.read()
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+    def compose(self, sources):
+        def concat(f):
+            for source in sources:
+                with open(source.path, 'rb') as src:
+                    for block in iter(lambda: src.read(HASH_BLOCK_SIZE), b''):
+                        f.write(block)
+        self._write(concat)
+
+    def delete(self):
+        os.remove(self.path)
+
+class LocalBucket:
+    """A directory that behaves like a GCS bucket for the transfer engine and pipeline"""
+
+    def __init__(self, root, name=None):
+        self.root = os.path.abspath(root)
+        self.name = name or os.path.basename(self.root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def blob(self, name):
+        return LocalBlob(self, name)
+
+    def get_blob(self, name):
+        blob = LocalBlob(self, name)
+        return blob.reload() if blob.exists() else None
+
+    def list_blobs(self, prefix=None):
+        prefix = prefix or ''
+        for dirpath, _, files in os.walk(self.root):
+            for file in files:
+                if file.endswith('.tmp'):
+                    continue
+                name = os.path.relpath(os.path.join(dirpath, file), self.root).replace(os.sep, '/')
+                if name.startswith(prefix):
+                    yield LocalBlob(self, name).reload()
+
+class TransferStats:
+    """Thread-safe counters for a batch of transfers"""
+
+    def __init__(self, direction):
+        self.direction = direction
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.failures = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, num_bytes=0, skipped=False):
+        with self._lock:
+            if skipped:
+                self.skipped += 1
+            else:
+                self.files += 1
+                self.bytes += num_bytes
+
+    def fail(self, name, error):
+        with self._lock:
+            self.failures.append((name, str(error)))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def summary(self):
+        elapsed = self.elapsed
+        rate = self.bytes / MB / elapsed if elapsed > 0 else 0.0
+        return (f"{self.direction}: {self.files} files ({self.bytes / MB:.1f} MB) in {elapsed:.1f}s "
+                f"({rate:.1f} MB/s), {self.skipped} unchanged skipped, {len(self.failures)} failed")
+
+class TransferEngine:
+    """Uploads and downloads files concurrently with checksum skipping and retries
+
+    Large files are split into chunks: uploads become parallel part uploads
+    composed into the final object, downloads become parallel ranged reads.
+
+    Args:
+        bucket: google.cloud.storage.Bucket or LocalBucket
+        max_workers: Concurrent file transfers
+        chunk_size: Chunk size in bytes for large files
+        chunked_threshold: Files at least this large are transferred in chunks
+        retries: Attempts per file or chunk before giving up
+        backoff: Initial retry delay in seconds, doubled on each attempt
+    """
+
+    def __init__(self, bucket, max_workers=16, chunk_size=32 * MB, chunked_threshold=64 * MB,
+                 retries=3, backoff=1.0):
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.chunked_threshold = chunked_threshold
+        self.retries = retries
+        self.backoff = backoff
+
+    def _retry(self, fn, *args, **kwargs):
+        """Call fn, retrying with exponential backoff"""
+        for attempt in range(self.retries):
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def _chunk_ranges(self, size):
+        """Split a size into at most MAX_COMPOSE_COMPONENTS (start, end) ranges"""
+        chunk_size = max(self.chunk_size, math.ceil(size / MAX_COMPOSE_COMPONENTS))
+        return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    def _remote_index(self, prefix):
+        """Fetch metadata for every object under a prefix in one listing"""
+        return {blob.name: blob for blob in self.bucket.list_blobs(prefix=prefix)}
+
+    def _upload_chunked(self, local_path, name, size, chunk_pool):
+        """Upload parts in parallel and compose them into the final object"""
+        def upload_part(index, start, end):
+            with open(local_path, 'rb') as f:
+                f.seek(start)
+                data = f.read(end - start)
+            part = self.bucket.blob(f"{name}.__part_{index:02d}")
+            self._retry(part.upload_from_string, data)
+            return part
+
+        futures = [chunk_pool.submit(upload_part, i, start, end)
+                   for i, (start, end) in enumerate(self._chunk_ranges(size))]
+        parts = [future.result() for future in futures]
+        try:
+            self._retry(self.bucket.blob(name).compose, parts)
+        finally:
+            for part in parts:
+                try:
+                    part.delete()
+                except Exception as e:
+                    print(f"Failed to delete temporary part {part.name}: {e}")
+
+    def _download_chunked(self, blob, local_path, chunk_pool):
+        """Download byte ranges in parallel into a preallocated file"""
+        tmp_path = f"{local_path}.part"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(blob.size)
+
+        def download_range(start, end):
+            data = self._retry(blob.download_as_bytes, start=start, end=end - 1)
+            with open(tmp_path, 'r+b') as f:
+                f.seek(start)
+                f.write(data)
+
+        futures = [chunk_pool.submit(download_range, start, end)
+                   for start, end in self._chunk_ranges(blob.size)]
+        for future in futures:
+            future.result()
+        os.replace(tmp_path, local_path)
+
+    def upload_directory(self, local_dir, prefix):
+        """Upload every file under local_dir to prefix/<relative path>
+
+        Returns:
+            TransferStats for the batch
+        """
+        jobs = []
+        for root, _, files in os.walk(local_dir):
+            for file in files:
+                local_path = os.path.join(root, file)
+                rel_path = os.path.relpath(local_path, local_dir).replace(os.sep, '/')
+                jobs.append((local_path, f"{prefix}/{rel_path}"))
+        return self.upload_files(jobs, prefix)
+
+    def upload_files(self, jobs, prefix):
+        """Upload (local path, object name) pairs
+
+        Args:
+            prefix: Prefix shared by the object names, listed once to find unchanged objects
+
+        Returns:
+            TransferStats for the batch
+        """
+        stats = TransferStats("Upload")
+        remote = self._remote_index(prefix)
+
+        def upload(local_path, name, chunk_pool):
+            if matches_remote(local_path, remote.get(name)):
+                stats.record(skipped=True)
+                return
+            size = os.path.getsize(local_path)
+            if size >= self.chunked_threshold:
+                self._upload_chunked(local_path, name, size, chunk_pool)
+            else:
+                self._retry(self.bucket.blob(name).upload_from_filename, local_path)
+            stats.record(size)
+
+        self._run(jobs, upload, stats)
+        print(stats.summary())
+        return stats
+
+    def download_prefix(self, prefix, local_dir, predicate=None):
+        """Download every object under prefix into local_dir, keeping relative paths
+
+        Args:
+            predicate: Optional callable taking an object name, to filter downloads
+
+        Returns:
+            TransferStats for the batch
+        """
+        stats = TransferStats("Download")
+        jobs = []
+        for name, blob in self._remote_index(prefix).items():
+            rel_path = name[len(prefix):].lstrip('/')
+            if not rel_path or PART_SUFFIX.search(name) or (predicate and not predicate(name)):
+                continue
+            jobs.append((blob, os.path.join(local_dir, *rel_path.split('/'))))
+
+        def download(blob, local_path, chunk_pool):
+            if matches_remote(local_path, blob):
+                stats.record(skipped=True)
+                return
+            os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+            if blob.size >= self.chunked_threshold:
+                self._download_chunked(blob, local_path, chunk_pool)
+            else:
+                self._retry(blob.download_to_filename, local_path)
+            stats.record(blob.size)
+
+        self._run(jobs, download, stats)
+        print(stats.summary())
+        return stats
+
+    def _run(self, jobs, transfer, stats):
+        """Run transfers in a bounded pool, recording failures instead of aborting the batch"""
+        # Chunks get their own pool so file tasks waiting on chunks cannot starve it
+        with ThreadPoolExecutor(max_workers=self.max_workers) as file_pool, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as chunk_pool:
+            futures = {file_pool.submit(transfer, source, target, chunk_pool): (source, target)
+                       for source, target in jobs}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    source, target = futures[future]
+                    name = getattr(source, 'name', source)
+                    print(f"Failed to transfer {name}: {e}")
+                    stats.fail(name, e)
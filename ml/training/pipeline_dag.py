@@ -0,0 +1,206 @@
+"""
+Minimal DAG runner with a persistent, content-hashed stage cache
+Used by PhysioFlowMLPipeline so reruns only execute stages whose inputs changed
+"""
+import os
+import re
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def hash_file(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_file_stat(path):
+    """Cheap fingerprint of one file from its size and modification time"""
+    stat = os.stat(path)
+    return hashlib.sha256(json.dumps([stat.st_size, int(stat.st_mtime)]).encode('utf-8')).hexdigest()
+
+def hash_directory_listing(path):
+    """Cheap fingerprint of a directory from file names, sizes and modification times"""
+    entries = []
+    for root, _, files in os.walk(path):
+        for file in sorted(files):
+            stat = os.stat(os.path.join(root, file))
+            entries.append((os.path.relpath(os.path.join(root, file), path), stat.st_size, int(stat.st_mtime)))
+    return hashlib.sha256(json.dumps(sorted(entries)).encode('utf-8')).hexdigest()
+
+def local_output_exists(output):
+    """Default cache validation: local paths must still exist, other outputs are trusted"""
+    if isinstance(output, str) and not output.startswith('gs://') and os.path.isabs(output):
+        return os.path.exists(output)
+    return output is not None
+
+class Stage:
+    """A pipeline step
+
+    Args:
+        name: Unique stage name; 'group:item' names (e.g. one stage per video)
+            can be forced as a group by passing just 'group'
+        fn: Callable receiving each input stage's output as a keyword argument
+            named after that stage; must return a JSON-serializable value
+        inputs: Names of stages this stage depends on
+        params: JSON-serializable values that affect the output
+        fingerprint: Optional callable returning a content hash of external
+            inputs (e.g. a config file), evaluated before the stage runs
+        validate: Callable deciding whether a cached output is still usable
+        cache: Set to False for stages that must always run
+    """
+
+    def __init__(self, name, fn, inputs=(), params=None, fingerprint=None,
+                 validate=local_output_exists, cache=True):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.params = params or {}
+        self.fingerprint = fingerprint
+        self.validate = validate
+        self.cache = cache
+
+class PipelineDAG:
+    """Runs stages in dependency order, reusing cached outputs and running independent stages concurrently
+
+    A stage's key hashes its name, params, fingerprint and the keys of its
+    inputs, so keys are known before anything runs. Stages whose cached
+    output is still valid are reused, and their upstream stages are skipped
+    entirely unless another stage needs them.
+    """
+
+    def __init__(self, cache_dir=None, max_workers=4):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, stage):
+        """Add a stage; its inputs must already have been added"""
+        missing = [name for name in stage.inputs if name not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def _keys(self):
+        """Compute every stage key in insertion (topological) order"""
+        keys = {}
+        for name, stage in self.stages.items():
+            payload = {
+                'name': name,
+                'params': stage.params,
+                'fingerprint': stage.fingerprint() if stage.fingerprint else None,
+                'inputs': [keys[dep] for dep in stage.inputs],
+            }
+            keys[name] = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return keys
+
+    def select(self, names):
+        """Stage names matching names, where a bare group name matches all of its 'group:item' stages"""
+        return [name for name in self.stages if name in names or name.split(':', 1)[0] in names]
+
+    def _descendants(self, names):
+        """The named stages plus every stage downstream of them"""
+        result = set(names)
+        for name, stage in self.stages.items():  # insertion order is topological
+            if any(dep in result for dep in stage.inputs):
+                result.add(name)
+        return result
+
+    def _cache_path(self, name, key):
+        safe_name = re.sub(r'[^\w.-]', '_', name)
+        return os.path.join(self.cache_dir, f"{safe_name}-{key[:16]}.json")
+
+    def _load_cached(self, stage, key):
+        """Return (True, output) for a valid cached output, else (False, None)"""
+        if not self.cache_dir or not stage.cache:
+            return False, None
+        path = self._cache_path(stage.name, key)
+        if not os.path.exists(path):
+            return False, None
+        with open(path, 'r') as f:
+            output = json.load(f)['output']
+        if not stage.validate(output):
+            print(f"Cached output of {stage.name} is no longer valid, rerunning")
+            return False, None
+        return True, output
+
+    def _store(self, stage, key, output, elapsed):
+        if not self.cache_dir or not stage.cache:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(stage.name, key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'stage': stage.name, 'key': key, 'output': output,
+                       'elapsed_seconds': elapsed, 'completed_at': time.time()}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def run(self, force=()):
+        """Run the DAG
+
+        Args:
+            force: Stage or group names to rerun even if cached; stages downstream
+                of them rerun too, since their cached outputs were built from the old ones
+
+        Returns:
+            Dictionary of stage name -> output for every stage that was run or reused
+        """
+        unknown = [name for name in force if not self.select([name])]
+        if unknown:
+            raise ValueError(f"Cannot force unknown stages: {unknown}")
+        force = self._descendants(self.select(force))
+        keys = self._keys()
+        outputs = {}
+
+        # Walk back from the sinks: a valid cached stage cuts off its upstream
+        needed = set()
+        consumers = {name for stage in self.stages.values() for name in stage.inputs}
+        frontier = [name for name in self.stages if name not in consumers]
+        while frontier:
+            name = frontier.pop()
+            if name in needed or name in outputs:
+                continue
+            stage = self.stages[name]
+            hit, output = (False, None) if name in force else self._load_cached(stage, keys[name])
+            if hit:
+                print(f"Stage {name}: reusing cached output")
+                outputs[name] = output
+            else:
+                needed.add(name)
+                frontier.extend(stage.inputs)
+
+        # Run needed stages as soon as their inputs are available
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while needed or running:
+                ready = [name for name in self.stages if name in needed
+                         and all(dep in outputs for dep in self.stages[name].inputs)]
+                for name in ready:
+                    stage = self.stages[name]
+                    needed.discard(name)
+                    print(f"Stage {name}: running")
+                    kwargs = {dep: outputs[dep] for dep in stage.inputs}
+                    running[pool.submit(self._timed, stage.fn, kwargs)] = name
+
+                if not running:
+                    raise RuntimeError(f"Stages can never run: {sorted(needed)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    output, elapsed = future.result()
+                    print(f"Stage {name}: finished in {elapsed:.1f}s")
+                    outputs[name] = output
+                    self._store(self.stages[name], keys[name], output, elapsed)
+
+        return outputs
+
+    @staticmethod
+    def _timed(fn, kwargs):
+        start = time.perf_counter()
+        output = fn(**kwargs)
+        return output, time.perf_counter() - start
@@ -1,18 +1,30 @@
 """
 Trains a model on the preprocessed landmark data
+TensorFlow, matplotlib and scikit-learn are imported inside the functions that
+use them, so the CLI and modules importing this one start quickly
 """
-import tensorflow as tf
-from tensorflow.keras import layers, models
 import numpy as np
-import pandas as pd
 import os
 import glob
 import yaml
 import json
-import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import argparse
+import math
+import shutil
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from training.windows import read_landmarks, create_sequences, video_id_from_path
+from training.data_splits import kfold_indices, DEFAULT_SPLITS_DIR
+from training.augmentation import LandmarkAugmenter
+from training.distributed import (STRATEGIES, create_strategy, is_chief, worker_output_dir,
+                                  launch_local_workers)
+from common.profiling import stage, get_profiler, add_profiling_args, configure_from_args
+from data_collection.metadata_store import VideoMetadataStore, DEFAULT_CATALOG_PATH, label_from_sidecar
 
 def load_config(config_path='ml/training/config.yaml'):
     """Load training configuration"""
@@ -20,8 +32,70 @@ def load_config(config_path='ml/training/config.yaml'):
         config = yaml.safe_load(f)
     return config['training']
 
+def configure_precision(config):
+    """Enable mixed precision for fast training when the hardware supports it
+
+    Returns:
+        True if the mixed_float16 policy was enabled
+    """
+    import tensorflow as tf
+    
+    fast = config.get('fast_training', {})
+    mode = fast.get('mixed_precision', 'auto')
+    if not fast.get('enabled') or not mode:
+        return False
+    
+    # float16 compute only pays off on GPUs; keep float32 on CPU
+    if mode == 'auto' and not tf.config.list_physical_devices('GPU'):
+        print("No GPU found, keeping float32 precision")
+        return False
+    
+    tf.keras.mixed_precision.set_global_policy('mixed_float16')
+    print("Mixed precision enabled (mixed_float16)")
+    return True
+
+def throughput_callback(num_samples, batch_size):
+    """Create a Keras callback that logs samples/sec and mean step time for each epoch"""
+    import tensorflow as tf
+    
+    class ThroughputCallback(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.num_samples = num_samples
+            self.steps = math.ceil(num_samples / batch_size)
+            self._train_start = None
+            self._train_end = None
+        
+        def on_epoch_begin(self, epoch, logs=None):
+            self._train_start = None
+        
+        # Timed from the first to the last training batch, so the validation pass is excluded
+        def on_train_batch_begin(self, batch, logs=None):
+            if self._train_start is None:
+                self._train_start = time.perf_counter()
+        
+        def on_train_batch_end(self, batch, logs=None):
+            self._train_end = time.perf_counter()
+        
+        def on_epoch_end(self, epoch, logs=None):
+            if self._train_start is None:
+                return
+            elapsed = self._train_end - self._train_start
+            samples_per_sec = self.num_samples / elapsed
+            step_time_ms = elapsed / self.steps * 1000
+            print(f"Epoch {epoch+1}: {samples_per_sec:.1f} samples/sec, {step_time_ms:.1f} ms/step")
+            # Added to logs so later callbacks (TensorBoard) record them too
+            if logs is not None:
+                logs['samples_per_sec'] = samples_per_sec
+                logs['step_time_ms'] = step_time_ms
+    
+    return ThroughputCallback()
+
 def build_model(config):
     """Build the LSTM model for pose sequence classification"""
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+    
     input_shape = (config['sequence_length'], config['num_landmarks'] * config['landmark_dims'])
     num_classes = len(config['classes'])
     
@@ -38,96 +112,273 @@ def build_model(config):
         model.add(layers.Dense(units, activation='relu'))
         model.add(layers.Dropout(0.2))
     
-    # Output layer
-    model.add(layers.Dense(num_classes, activation='softmax'))
+    # Output layer (kept in float32 for numerically stable softmax under mixed precision)
+    model.add(layers.Dense(num_classes, activation='softmax', dtype='float32'))
+    
+    # XLA compilation and fewer Python round trips per step in fast training mode
+    compile_options = {}
+    fast = config.get('fast_training', {})
+    if fast.get('enabled'):
+        compile_options['jit_compile'] = fast.get('jit_compile', True)
+        compile_options['steps_per_execution'] = fast.get('steps_per_execution', 1)
     
     # Compile model
     model.compile(
         optimizer=tf.keras.optimizers.Adam(config['learning_rate']),
         loss='categorical_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        **compile_options
     )
     
     return model
 
-def load_and_prepare_data(config, landmarks_dir='ml/data/landmarks'):
-    """Load landmark data and prepare for training"""
+def make_dataset(X, y, batch_size, augmenter=None, shuffle=True, seed=42, shard=None, repeat=False):
+    """Build a tf.data pipeline over in-memory windows, augmenting each batch on the fly
+    
+    Args:
+        augmenter: Callable applied to every (batch, frames, features) batch, e.g. LandmarkAugmenter
+        shard: Optional (num_shards, index) to keep only this input pipeline's windows
+        repeat: Repeat indefinitely and batch across epoch boundaries (full batches only)
+    """
+    import tensorflow as tf
+    
+    dataset = tf.data.Dataset.from_tensor_slices((X.astype(np.float32), y))
+    if shard is not None:
+        dataset = dataset.shard(*shard)
+    if shuffle:
+        dataset = dataset.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    if repeat:
+        dataset = dataset.repeat()
+    dataset = dataset.batch(batch_size, drop_remainder=repeat)
+    
+    if augmenter is not None:
+        def augment(windows, labels):
+            augmented = tf.numpy_function(augmenter, [windows], tf.float32)
+            augmented.set_shape(windows.shape)
+            return augmented, labels
+        # Sequential map: the augmenter's random generator is not thread-safe
+        dataset = dataset.map(augment)
+    
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def training_inputs(config, X_train, y_train, seed=42):
+    """Keyword arguments for model.fit: an augmented dataset when enabled, else the arrays"""
+    augmenter = LandmarkAugmenter.from_config(config, seed=seed)
+    if augmenter is None:
+        return {'x': X_train, 'y': y_train, 'batch_size': config['batch_size']}
+    print("Augmenting training windows on the fly")
+    return {'x': make_dataset(X_train, y_train, config['batch_size'], augmenter, seed=seed)}
+
+def distributed_inputs(config, strategy, X_train, y_train, X_val, y_val, seed=42):
+    """Keyword arguments for model.fit under a distribution strategy
+    
+    Each input pipeline keeps only its shard of the windows before batching
+    by the per-replica batch size and augmenting, so augmentation work is
+    split between workers. Datasets repeat with a fixed number of steps, so
+    every worker runs the same number of steps per epoch.
+    """
+    global_batch_size = config['batch_size'] * strategy.num_replicas_in_sync
+    
+    def dataset_fn(X, y, training):
+        def make(input_context):
+            shard = (input_context.num_input_pipelines, input_context.input_pipeline_id)
+            augmenter = None
+            if training:
+                augmenter = LandmarkAugmenter.from_config(config, seed=seed + input_context.input_pipeline_id)
+            return make_dataset(X, y, input_context.get_per_replica_batch_size(global_batch_size),
+                                augmenter, shuffle=training, seed=seed, shard=shard, repeat=True)
+        return strategy.distribute_datasets_from_function(make)
+    
+    return {
+        'x': dataset_fn(X_train, y_train, True),
+        'steps_per_epoch': max(len(X_train) // global_batch_size, 1),
+        'validation_data': dataset_fn(X_val, y_val, False),
+        'validation_steps': max(math.ceil(len(X_val) / global_batch_size), 1),
+    }
+
+def load_windows(config, landmarks_dir='ml/data/landmarks', catalog_path=DEFAULT_CATALOG_PATH,
+                 parquet_files=None, label_dict=None, videos_dir='ml/data/videos'):
+    """Load labeled landmark windows
+    
+    Args:
+        parquet_files: Landmark files to load (default: every file in landmarks_dir)
+        label_dict: Mapping of label -> class index (default: from config['classes'])
+        videos_dir: Directory searched for legacy *_meta.json sidecars
+    
+    Returns:
+        (X, y, groups, label_dict) where groups holds the source video id of each window
+    """
     print("Loading landmark data...")
     
     # Get all parquet files
-    parquet_files = glob.glob(os.path.join(landmarks_dir, "*.parquet"))
+    if parquet_files is None:
+        parquet_files = glob.glob(os.path.join(landmarks_dir, "*.parquet"))
     
     if not parquet_files:
         raise ValueError(f"No parquet files found in {landmarks_dir}")
     
+    # Look up exercise labels for all videos in one catalog query
+    video_ids = [video_id_from_path(f) for f in parquet_files]
+    video_labels = {}
+    if os.path.exists(catalog_path):
+        with VideoMetadataStore(catalog_path) as catalog:
+            video_labels = catalog.labels_for(video_ids)
+    
     # Load and process all files
     sequences = []
     labels = []
+    groups = []
     
-    for parquet_file in parquet_files:
-        df = pd.read_parquet(parquet_file)
+    for parquet_file, video_id in zip(parquet_files, video_ids):
+        exercise_type = video_labels.get(video_id)
         
-        # Get video metadata to determine class
-        video_id = os.path.basename(parquet_file).split('_landmarks')[0]
-        meta_file = os.path.join('ml/data/videos', f"video_{video_id}_meta.json")
+        # Fall back to legacy JSON sidecars for videos not in the catalog
+        if exercise_type is None:
+            exercise_type = label_from_sidecar(os.path.join(videos_dir, f"{video_id}_meta.json"))
         
         # Default to squat if metadata not found
-        exercise_type = "squat"
-        
-        if os.path.exists(meta_file):
-            with open(meta_file, 'r') as f:
-                meta = json.load(f)
-                # Analyze title to determine class
-                title = meta['title'].lower()
-                
-                if 'squat' in title:
-                    exercise_type = "squat"
-                elif 'leg raise' in title or 'straight leg' in title:
-                    exercise_type = "leg_raise"
-                elif 'step up' in title or 'step-up' in title:
-                    exercise_type = "step_up"
+        if exercise_type is None:
+            exercise_type = "squat"
         
-        # Create sequences from the landmarks
-        frames = df.sort_values('frame_index')
-        landmark_data = np.array([np.array(x) for x in frames['landmarks']])
-        
-        # Create sequences with sliding window
-        seq_length = config['sequence_length']
-        for i in range(0, len(landmark_data) - seq_length + 1, seq_length // 2):  # 50% overlap
-            seq = landmark_data[i:i+seq_length]
-            if len(seq) == seq_length:
-                # Flatten landmarks for each frame in sequence
-                flattened_seq = seq.reshape(seq_length, -1)
-                sequences.append(flattened_seq)
-                labels.append(exercise_type)
+        # Create sequences with sliding window (50% overlap)
+        with stage('train.parquet_read', 1):
+            landmark_data = read_landmarks(parquet_file)
+        with stage('train.window_building') as record:
+            windows = create_sequences(landmark_data, config['sequence_length'])
+            record.add(len(windows))
+        for seq in windows:
+            sequences.append(seq)
+            labels.append(exercise_type)
+            groups.append(video_id)
     
     # Convert to numpy arrays
     X = np.array(sequences)
     
     # Convert string labels to one-hot
-    label_dict = {label: i for i, label in enumerate(config['classes'])}
+    if label_dict is None:
+        label_dict = {label: i for i, label in enumerate(config['classes'])}
     y_indices = [label_dict.get(label, 0) for label in labels]
-    y = tf.keras.utils.to_categorical(y_indices, num_classes=len(config['classes']))
+    y = np.eye(len(label_dict), dtype=np.float32)[y_indices]
     
-    print(f"Loaded {len(X)} sequences with shape {X.shape}")
+    print(f"Loaded {len(X)} sequences with shape {X.shape} from {len(set(groups))} videos")
     
-    # Split data
-    X_train, X_val, y_train, y_val = train_test_split(
-        X, y, test_size=config['validation_split'], random_state=42
-    )
+    return X, y, groups, label_dict
+
+def split_indices(config, groups):
+    """Indices of the training and validation windows
+    
+    Returns:
+        (train_indices, val_indices)
+    """
+    # Split data by source video so overlapping windows never straddle train and validation
+    split = config.get('split', 'grouped')
+    if split == 'grouped':
+        n_videos = len(set(groups))
+        if n_videos < 2:
+            raise ValueError(f"A grouped split needs at least 2 videos, found {n_videos}")
+        n_folds = max(int(round(1 / config['validation_split'])), 2)
+        if n_videos < n_folds:
+            print(f"Only {n_videos} videos available, validating on 1 of {n_videos} folds")
+            n_folds = n_videos
+        return kfold_indices(groups, n_folds, seed=42,
+                             cache_dir=config.get('splits_dir', DEFAULT_SPLITS_DIR))[0]
+    from sklearn.model_selection import train_test_split
+    return train_test_split(np.arange(len(groups)), test_size=config['validation_split'], random_state=42)
+
+def split_windows(config, X, y, groups):
+    """Split windows into training and validation sets
     
+    Returns:
+        (X_train, X_val, y_train, y_val)
+    """
+    train_idx, val_idx = split_indices(config, groups)
+    return X[train_idx], X[val_idx], y[train_idx], y[val_idx]
+
+def load_and_prepare_data(config, landmarks_dir='ml/data/landmarks', catalog_path=DEFAULT_CATALOG_PATH):
+    """Load landmark data and prepare for training"""
+    X, y, groups, label_dict = load_windows(config, landmarks_dir, catalog_path)
+    X_train, X_val, y_train, y_val = split_windows(config, X, y, groups)
     return X_train, X_val, y_train, y_val, label_dict
 
-def train_model(config, output_dir='ml/models'):
-    """Train the model and save it"""
-    # Create output directory
+def save_model_artifacts(model, config, label_dict, output_dir, timestamp, mixed_precision=False,
+                         manifest=None):
+    """Save the Keras model, label map and TFLite model under one timestamp
+    
+    Args:
+        manifest: Optional {'train_videos': [...], 'val_videos': [...]} the model
+            was trained and validated on, saved for incremental training
+    
+    Returns:
+        (model_path, tflite_path)
+    """
+    import tensorflow as tf
+    
+    # Save final model
+    model_path = os.path.join(output_dir, f"knee_exercise_model_{timestamp}.h5")
+    model.save(model_path)
+    
+    # Save label mapping
+    label_map = {i: label for label, i in label_dict.items()}
+    with open(os.path.join(output_dir, f"label_map_{timestamp}.json"), 'w') as f:
+        json.dump(label_map, f, indent=2)
+    
+    # Save the videos behind this model so incremental training can tell new data apart
+    if manifest is not None:
+        with open(os.path.join(output_dir, f"training_manifest_{timestamp}.json"), 'w') as f:
+            json.dump(manifest, f, indent=2)
+    
+    # Convert to TFLite for Flutter, from a float32 copy if trained in mixed precision
+    export_model = model
+    if mixed_precision:
+        tf.keras.mixed_precision.set_global_policy('float32')
+        export_model = build_model({**config, 'fast_training': {}})
+        export_model.set_weights(model.get_weights())
+    converter = tf.lite.TFLiteConverter.from_keras_model(export_model)
+    with stage('train.tflite_convert'):
+        tflite_model = converter.convert()
+    
+    # Save TFLite model
+    tflite_path = os.path.join(output_dir, f"knee_exercise_model_{timestamp}.tflite")
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
+    
+    print(f"Model saved to {model_path}")
+    print(f"TFLite model saved to {tflite_path}")
+    return model_path, tflite_path
+
+def train_model(config, output_dir='ml/models', landmarks_dir='ml/data/landmarks',
+                catalog_path=DEFAULT_CATALOG_PATH):
+    """Train the model and save it
+    
+    With distributed.strategy set, config['batch_size'] is the batch size
+    per replica. Returns the TFLite path, or None on non-chief workers.
+    """
+    import tensorflow as tf
+    import matplotlib.pyplot as plt
+    
+    # The strategy must exist before any other TensorFlow op runs
+    distribute = config.get('distributed', {}).get('strategy') or 'none'
+    strategy = create_strategy(distribute)
+    global_batch_size = config['batch_size'] * strategy.num_replicas_in_sync
+    
+    # Create output directory (a temporary one on non-chief workers)
+    output_dir, is_temp_dir = worker_output_dir(output_dir)
     os.makedirs(output_dir, exist_ok=True)
     
     # Load and prepare data
-    X_train, X_val, y_train, y_val, label_dict = load_and_prepare_data(config)
+    X, y, groups, label_dict = load_windows(config, landmarks_dir, catalog_path)
+    train_idx, val_idx = split_indices(config, groups)
+    X_train, X_val, y_train, y_val = X[train_idx], X[val_idx], y[train_idx], y[val_idx]
+    groups = np.array(groups)
+    manifest = {
+        'train_videos': sorted(set(groups[train_idx])),
+        'val_videos': sorted(set(groups[val_idx])),
+    }
     
     # Build model
-    model = build_model(config)
+    mixed_precision = configure_precision(config)
+    with strategy.scope():
+        model = build_model(config)
     model.summary()
     
     # Create timestamp for model versioning
@@ -135,6 +386,7 @@ def train_model(config, output_dir='ml/models'):
     
     # Create callbacks
     callbacks = [
+        throughput_callback(len(X_train), global_batch_size),
         tf.keras.callbacks.ModelCheckpoint(
             filepath=os.path.join(output_dir, f"knee_exercise_model_{timestamp}.h5"),
             save_best_only=True,
@@ -149,35 +401,24 @@ def train_model(config, output_dir='ml/models'):
         )
     ]
     
-    # Train model
-    history = model.fit(
-        X_train, y_train,
-        validation_data=(X_val, y_val),
-        epochs=config['epochs'],
-        batch_size=config['batch_size'],
-        callbacks=callbacks
-    )
+    if distribute == 'none':
+        inputs = {**training_inputs(config, X_train, y_train), 'validation_data': (X_val, y_val)}
+    else:
+        print(f"Global batch size {global_batch_size} ({config['batch_size']} per replica)")
+        inputs = distributed_inputs(config, strategy, X_train, y_train, X_val, y_val)
     
-    # Save final model
-    model_path = os.path.join(output_dir, f"knee_exercise_model_{timestamp}.h5")
-    model.save(model_path)
-    
-    # Save label mapping
-    label_map = {i: label for label, i in label_dict.items()}
-    with open(os.path.join(output_dir, f"label_map_{timestamp}.json"), 'w') as f:
-        json.dump(label_map, f, indent=2)
-    
-    # Convert to TFLite for Flutter
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    tflite_model = converter.convert()
-    
-    # Save TFLite model
-    tflite_path = os.path.join(output_dir, f"knee_exercise_model_{timestamp}.tflite")
-    with open(tflite_path, 'wb') as f:
-        f.write(tflite_model)
+    # Train model
+    with stage('train.fit') as record:
+        history = model.fit(
+            **inputs,
+            epochs=config['epochs'],
+            callbacks=callbacks
+        )
+        record.add(len(X_train) * len(history.history['loss']))
     
-    print(f"Model saved to {model_path}")
-    print(f"TFLite model saved to {tflite_path}")
+    model_path, tflite_path = save_model_artifacts(
+        model, config, label_dict, output_dir, timestamp, mixed_precision, manifest
+    )
     
     # Plot training history
     plt.figure(figsize=(12, 4))
@@ -203,18 +444,316 @@ def train_model(config, output_dir='ml/models'):
     plt.close()
     
     print(f"Training plot saved to {plot_path}")
+    
+    if is_temp_dir:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        return None
     return tflite_path
 
+def latest_checkpoint(models_dir='ml/models'):
+    """Find the newest knee_exercise_model_*.h5 checkpoint and its label map
+    
+    Returns:
+        (model_path, label_map_path, manifest_path), or None if there is no
+        checkpoint with a label map; manifest_path is None for checkpoints
+        saved without a training manifest
+    """
+    for model_path in sorted(glob.glob(os.path.join(models_dir, "knee_exercise_model_*.h5")), reverse=True):
+        timestamp = os.path.basename(model_path)[len("knee_exercise_model_"):-len(".h5")]
+        label_map_path = os.path.join(models_dir, f"label_map_{timestamp}.json")
+        manifest_path = os.path.join(models_dir, f"training_manifest_{timestamp}.json")
+        if os.path.exists(label_map_path):
+            return model_path, label_map_path, manifest_path if os.path.exists(manifest_path) else None
+    return None
+
+def expand_model(base_model, config, labels):
+    """Rebuild the model for labels and copy the trained weights across
+    
+    labels must start with the classes base_model was trained on; output
+    units for appended classes start from fresh initial weights.
+    """
+    model = build_model({**config, 'classes': labels})
+    for old_layer, new_layer in zip(base_model.layers[:-1], model.layers[:-1]):
+        new_layer.set_weights(old_layer.get_weights())
+    
+    old_kernel, old_bias = base_model.layers[-1].get_weights()
+    kernel, bias = model.layers[-1].get_weights()
+    kernel[:, :old_kernel.shape[1]] = old_kernel
+    bias[:old_bias.shape[0]] = old_bias
+    model.layers[-1].set_weights([kernel, bias])
+    return model
+
+def _accuracy(model, X, y):
+    if len(X) == 0:
+        return None
+    predictions = model.predict(X, batch_size=256, verbose=0)
+    return float(np.mean(np.argmax(predictions, axis=1) == np.argmax(y, axis=1)))
+
+def fine_tune_model(config, output_dir='ml/models', landmarks_dir='ml/data/landmarks',
+                    catalog_path=DEFAULT_CATALOG_PATH):
+    """Warm-start the latest checkpoint on videos it has not seen
+    
+    New videos are those missing from the checkpoint's training manifest.
+    They are split into training and validation videos; training adds a
+    random replay sample of the checkpoint's own training windows. Both
+    models are scored on windows the checkpoint never trained on (its
+    validation videos plus the new validation videos), and a new model,
+    label map, manifest and TFLite model are exported only if accuracy on
+    the previously known classes has not dropped by more than
+    incremental.max_accuracy_drop. Classes in the config that the
+    checkpoint does not know are appended to its output layer.
+    
+    Returns:
+        Path of the new TFLite model, or None if nothing was exported
+    """
+    import tensorflow as tf
+    
+    incremental = config.get('incremental', {})
+    checkpoint = latest_checkpoint(output_dir)
+    if checkpoint is None:
+        print(f"No checkpoint with a label map in {output_dir}, training from scratch")
+        return train_model(config, output_dir, landmarks_dir, catalog_path)
+    model_path, label_map_path, manifest_path = checkpoint
+    
+    # Keep the checkpoint's class order and append any new classes from the config
+    with open(label_map_path, 'r') as f:
+        label_map = json.load(f)
+    labels = [label_map[str(i)] for i in range(len(label_map))]
+    new_classes = [label for label in config['classes'] if label not in labels]
+    labels = labels + new_classes
+    label_dict = {label: i for i, label in enumerate(labels)}
+    
+    # Sort landmark files into new videos, the checkpoint's training videos and its validation videos
+    parquet_files = sorted(glob.glob(os.path.join(landmarks_dir, "*.parquet")))
+    if manifest_path is not None:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    else:
+        # Checkpoints from before manifests were saved: fall back to file modification times
+        print(f"No training manifest for {model_path}, treating files newer than it as new")
+        checkpoint_time = os.path.getmtime(model_path)
+        manifest = {
+            'train_videos': [video_id_from_path(f) for f in parquet_files
+                             if os.path.getmtime(f) <= checkpoint_time],
+            'val_videos': [],
+        }
+    trained = set(manifest['train_videos'])
+    validated = set(manifest['val_videos'])
+    new_files = [f for f in parquet_files if video_id_from_path(f) not in trained | validated]
+    old_train_files = [f for f in parquet_files if video_id_from_path(f) in trained]
+    old_val_files = [f for f in parquet_files if video_id_from_path(f) in validated]
+    if not new_files:
+        print(f"No videos missing from the manifest of {model_path}, nothing to fine-tune")
+        return None
+    print(f"Fine-tuning {model_path} on {len(new_files)} new videos")
+    
+    X_new, y_new, groups_new, _ = load_windows(config, landmarks_dir, catalog_path, new_files, label_dict)
+    if len(set(groups_new)) < 2 and old_val_files:
+        # A single new video can't be split by video; validate on the held-out videos only
+        train_idx, val_idx = np.arange(len(groups_new)), np.arange(0)
+    else:
+        train_idx, val_idx = split_indices(config, groups_new)
+    groups_new = np.array(groups_new)
+    X_train, y_train = X_new[train_idx], y_new[train_idx]
+    X_val, y_val = X_new[val_idx], y_new[val_idx]
+    
+    # Replay a random sample of the checkpoint's training windows so earlier data is not forgotten
+    replay_ratio = incremental.get('replay_ratio', 1.0)
+    rng = np.random.default_rng(42)
+    if old_train_files and replay_ratio > 0:
+        n_files = min(len(old_train_files), max(1, math.ceil(replay_ratio * len(new_files))))
+        replay_files = [old_train_files[i] for i in rng.permutation(len(old_train_files))[:n_files]]
+        X_old, y_old, _, _ = load_windows(config, landmarks_dir, catalog_path, replay_files, label_dict)
+        keep = rng.permutation(len(X_old))[:int(replay_ratio * len(train_idx))]
+        X_train = np.concatenate([X_train, X_old[keep]])
+        y_train = np.concatenate([y_train, y_old[keep]])
+        print(f"Replaying {len(keep)} windows from {n_files} previously trained videos")
+    
+    # The checkpoint's validation videos stay held out
+    if old_val_files:
+        X_held, y_held, _, _ = load_windows(config, landmarks_dir, catalog_path, old_val_files, label_dict)
+        X_val = np.concatenate([X_val, X_held])
+        y_val = np.concatenate([y_val, y_held])
+    
+    # Baseline: the checkpoint's accuracy on held-out windows of the classes it knows
+    base_model = tf.keras.models.load_model(model_path, compile=False)
+    n_known = base_model.layers[-1].get_weights()[1].shape[0]
+    known = np.argmax(y_val, axis=1) < n_known
+    baseline = _accuracy(base_model, X_val[known], y_val[known])
+    
+    # Fine-tune with a lower learning rate and a short schedule
+    fine_tune_config = {
+        **config,
+        'classes': labels,
+        'learning_rate': config['learning_rate'] * incremental.get('learning_rate_scale', 0.1),
+        'epochs': incremental.get('epochs', 5),
+    }
+    mixed_precision = configure_precision(fine_tune_config)
+    model = expand_model(base_model, fine_tune_config, labels)
+    if new_classes:
+        print(f"Expanded output layer for new classes: {', '.join(new_classes)}")
+    
+    with stage('train.fit') as record:
+        history = model.fit(
+            **training_inputs(fine_tune_config, X_train, y_train),
+            validation_data=(X_val, y_val),
+            epochs=fine_tune_config['epochs'],
+            callbacks=[
+                throughput_callback(len(X_train), config['batch_size']),
+                tf.keras.callbacks.EarlyStopping(
+                    patience=2,
+                    monitor='val_accuracy',
+                    restore_best_weights=True
+                )
+            ]
+        )
+        record.add(len(X_train) * len(history.history['loss']))
+    
+    # Only replace the deployed model if the known classes are still recognised as well
+    if baseline is not None:
+        accuracy = _accuracy(model, X_val[known], y_val[known])
+        print(f"Held-out accuracy on known classes: {baseline:.4f} before, {accuracy:.4f} after")
+        if accuracy < baseline - incremental.get('max_accuracy_drop', 0.02):
+            print("Validation accuracy dropped, keeping the existing model")
+            return None
+    else:
+        print("No held-out windows of previously known classes to compare on")
+    print(f"Held-out accuracy on all classes: {_accuracy(model, X_val, y_val):.4f}")
+    
+    manifest = {
+        'train_videos': sorted(trained | set(groups_new[train_idx])),
+        'val_videos': sorted(validated | set(groups_new[val_idx])),
+    }
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    _, tflite_path = save_model_artifacts(
+        model, fine_tune_config, label_dict, output_dir, timestamp, mixed_precision, manifest
+    )
+    return tflite_path
+
+def _train_fold(config, fold, X_train, y_train, X_val, y_val, threads=None):
+    """Train and evaluate one cross-validation fold (runs in a worker process)"""
+    import tensorflow as tf
+    
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    
+    model = build_model(config)
+    history = model.fit(
+        **training_inputs(config, X_train, y_train, seed=42 + fold),
+        validation_data=(X_val, y_val),
+        epochs=config['epochs'],
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(
+                patience=10,
+                monitor='val_accuracy',
+                restore_best_weights=True
+            )
+        ],
+        verbose=2
+    )
+    
+    best_epoch = int(np.argmax(history.history['val_accuracy']))
+    return {
+        'fold': fold,
+        'train_windows': len(X_train),
+        'val_windows': len(X_val),
+        'epochs_run': len(history.history['val_accuracy']),
+        'best_epoch': best_epoch + 1,
+        'val_accuracy': float(history.history['val_accuracy'][best_epoch]),
+        'val_loss': float(history.history['val_loss'][best_epoch]),
+    }
+
+def cross_validate(config, n_folds=5, jobs=1, output_dir='ml/models', landmarks_dir='ml/data/landmarks'):
+    """Run grouped k-fold cross-validation, optionally training folds in parallel processes"""
+    os.makedirs(output_dir, exist_ok=True)
+    X, y, groups, _ = load_windows(config, landmarks_dir)
+    folds = kfold_indices(groups, n_folds, seed=42, cache_dir=config.get('splits_dir', DEFAULT_SPLITS_DIR))
+    
+    fold_args = [
+        (config, fold, X[train_idx], y[train_idx], X[val_idx], y[val_idx])
+        for fold, (train_idx, val_idx) in enumerate(folds)
+    ]
+    
+    if jobs > 1:
+        # Share the cores between workers; spawn gives each a clean TensorFlow runtime
+        threads = max((os.cpu_count() or 1) // jobs, 1)
+        print(f"Training {n_folds} folds with {jobs} parallel workers ({threads} threads each)")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_train_fold, *args, threads=threads) for args in fold_args]
+            results = [future.result() for future in futures]
+    else:
+        results = [_train_fold(*args) for args in fold_args]
+    
+    accuracies = [r['val_accuracy'] for r in results]
+    summary = {
+        'n_folds': n_folds,
+        'folds': results,
+        'mean_val_accuracy': float(np.mean(accuracies)),
+        'std_val_accuracy': float(np.std(accuracies)),
+    }
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_path = os.path.join(output_dir, f"cv_results_{timestamp}.json")
+    with open(results_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"Cross-validation accuracy: {summary['mean_val_accuracy']:.4f} "
+          f"(+/- {summary['std_val_accuracy']:.4f}) over {n_folds} folds")
+    print(f"Results saved to {results_path}")
+    return summary
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Train knee exercise model')
     parser.add_argument('--config', type=str, default='ml/training/config.yaml',
                         help='Path to configuration YAML file')
     parser.add_argument('--output-dir', type=str, default='ml/models',
                         help='Directory to save trained model')
+    parser.add_argument('--folds', type=int, default=0,
+                        help='Run grouped k-fold cross-validation with this many folds instead of training')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of folds to train in parallel with --folds')
+    parser.add_argument('--fast', action='store_true',
+                        help='Enable XLA, steps_per_execution and mixed precision (where supported)')
+    parser.add_argument('--augment', action='store_true',
+                        help='Augment training windows on the fly (mirror, rotation/scale, time warp, dropout)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Fine-tune the latest checkpoint on landmark files added since it was saved')
+    parser.add_argument('--distribute', choices=STRATEGIES, default=None,
+                        help='Data-parallel training: mirrored across local devices, or multi_worker '
+                             'across the processes in TF_CONFIG (overrides distributed.strategy)')
+    parser.add_argument('--num-workers', type=int, default=1,
+                        help='Launch this many local CPU worker processes for multi_worker training')
+    add_profiling_args(parser)
     args = parser.parse_args()
+    distributed = (args.distribute or 'none') != 'none' or args.num_workers > 1
+    if distributed and (args.folds or args.incremental):
+        parser.error("--distribute and --num-workers apply to full training only, not --folds or --incremental")
+    if args.num_workers > 1 and args.distribute not in (None, 'multi_worker'):
+        parser.error("--num-workers launches multi_worker training")
+    
+    # Relaunch this command as a local cluster; each worker sees TF_CONFIG and runs below
+    if args.num_workers > 1 and not os.environ.get('TF_CONFIG'):
+        sys.exit(launch_local_workers(args.num_workers, sys.argv))
+    
+    profile_report = configure_from_args(args)
     
     # Load config
     config = load_config(args.config)
+    if args.fast:
+        config.setdefault('fast_training', {})['enabled'] = True
+    if args.augment:
+        config.setdefault('augmentation', {})['enabled'] = True
+    if distributed:
+        config.setdefault('distributed', {})['strategy'] = args.distribute or 'multi_worker'
     
-    # Train model
-    train_model(config, args.output_dir)
\ No newline at end of file
+    if args.folds:
+        cross_validate(config, args.folds, args.jobs, args.output_dir)
+    elif args.incremental:
+        fine_tune_model(config, args.output_dir)
+    else:
+        # Train model
+        train_model(config, args.output_dir)
+    
+    if profile_report and is_chief():
+        get_profiler().write_report(profile_report)
\ No newline at end of file
@@ -9,32 +9,68 @@ import subprocess
 import shutil
 import time
 import json
+import hashlib
+import threading
 from pathlib import Path
-from google.cloud import storage, aiplatform
-from google.cloud.storage import Blob
-from google.cloud import videointelligence_v1 as videointelligence 
 
 # Import from local modules
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from data_collection.video_collector import download_videos, use_local_videos
-from preprocessing.pose_processor import process_frames, process_all_videos
+from data_collection.video_collector import download_videos, use_local_videos, search_videos
+from data_collection.metadata_store import CATALOG_FILENAME, catalog_path_for
+from training.gcs_transfer import TransferEngine
+from training.annotation import AnnotationFanOut, cancel_operation, wait_quietly
+from training.backends import GCPBackend, LocalBackend
+from training.pipeline_dag import PipelineDAG, Stage, hash_file, hash_file_stat, hash_directory_listing, local_output_exists
+from preprocessing.pose_processor import process_frames, process_all_videos, extract_frames
+from preprocessing.video_intelligence_parser import parse_annotation_result, save_landmarks_parquet
+from common.profiling import stage, get_profiler, add_profiling_args, configure_from_args
 try:
     from training.train_local import load_config, build_model, load_and_prepare_data, train_model
 except ImportError:
     print("Warning: train_local.py not fully imported. Make sure it exists with required functions.")
 
+# Stage names accepted by --force-stage; per-video stages are forced as a group
+PIPELINE_STAGES = ('collect', 'upload_video', 'annotate', 'upload_landmarks', 'upload_catalog',
+                   'upload_config', 'train', 'download_model')
+
+# Helper modules (relative to ml/) that the training task imports at runtime
+TRAINING_SUPPORT_MODULES = [
+    'training/windows.py',
+    'training/data_splits.py',
+    'training/augmentation.py',
+    'training/distributed.py',
+    'data_collection/metadata_store.py',
+    'common/profiling.py',
+]
+
 class PhysioFlowMLPipeline:
     """End-to-end ML pipeline for PhysioFlow knee exercise analysis"""
     
-    def __init__(self, project_id, region, bucket_name, config_path='ml/training/config.yaml'):
-        """Initialize the pipeline"""
+    def __init__(self, project_id, region, bucket_name, config_path='ml/training/config.yaml',
+                 transfer_workers=16, work_dir=None, cache_dir=None, backend=None):
+        """Initialize the pipeline
+        
+        Args:
+            backend: PipelineBackend for storage, annotation and training (defaults to GCPBackend)
+            work_dir: Persistent working directory; a temporary one is used (and deleted) if None
+            cache_dir: Stage cache directory; defaults to <work_dir>/stage_cache when work_dir is set
+        """
         self.project_id = project_id
         self.region = region
         self.bucket_name = bucket_name
         self.config_path = config_path
-        self.local_data_dir = tempfile.mkdtemp(prefix="physioflow_")
-        self.storage_client = storage.Client(project=project_id)
+        self._owns_work_dir = work_dir is None
+        if work_dir:
+            os.makedirs(work_dir, exist_ok=True)
+            self.local_data_dir = os.path.abspath(work_dir)
+        else:
+            self.local_data_dir = tempfile.mkdtemp(prefix="physioflow_")
+        if cache_dir is None and work_dir:
+            cache_dir = os.path.join(self.local_data_dir, "stage_cache")
+        self.cache_dir = cache_dir
+        self.backend = backend or GCPBackend(project_id, region, staging_bucket=f"gs://{bucket_name}")
+        self._annotation_slots = threading.BoundedSemaphore(self._annotation_concurrency(8))  # Replaced by build_dag
         
         # Landmark indices for knee and torso targeting
         # These indices correspond to MediaPipe pose landmarks
@@ -55,22 +91,11 @@ class PhysioFlowMLPipeline:
         # Combined set for knee-focused physiotherapy
         self.target_landmarks = self.knee_landmarks.union(self.torso_landmarks)
         
-        # Create bucket if it doesn't exist
-        try:
-            self.bucket = self.storage_client.get_bucket(bucket_name)
-        except Exception:
-            print(f"Creating new bucket: {bucket_name}")
-            self.bucket = self.storage_client.create_bucket(
-                bucket_name, 
-                location=region
-            )
+        # Get (or create) the bucket from the backend
+        self.bucket = self.backend.get_bucket(bucket_name)
         
-        # Initialize Vertex AI
-        aiplatform.init(
-            project=project_id, 
-            location=region,
-            staging_bucket=f"gs://{self.bucket_name}"  # Add staging bucket
-)
+        # Concurrent uploads/downloads for pipeline data
+        self.transfer = TransferEngine(self.bucket, max_workers=transfer_workers)
     
     def collect_videos(self, search_term=None, max_videos=10, local_video_dir=None):
         """Collect videos for training - either from YouTube or local directory"""
@@ -114,7 +139,7 @@ class PhysioFlowMLPipeline:
         
         # Process frames to extract landmarks
         try:
-            process_all_videos(frames_dir, landmarks_dir)
+            process_all_videos(frames_dir, landmarks_dir, catalog_path_for(video_dir))
         except Exception as e:
             print(f"Error processing videos: {str(e)}")
             # If import fails, try using the subprocess approach
@@ -146,17 +171,17 @@ class PhysioFlowMLPipeline:
             video_path = os.path.join(video_dir, video_file)
             video_name = os.path.splitext(video_file)[0]
             frames_output_dir = os.path.join(frames_dir, video_name)
-            os.makedirs(frames_output_dir, exist_ok=True)
             
             print(f"Extracting frames from {video_file}")
-            subprocess.run([
-                "ffmpeg", 
-                "-i", video_path,
-                "-vf", "fps=2",
-                f"{frames_output_dir}/%04d.jpg",
-                "-hide_banner",
-                "-loglevel", "error"
-            ])
+            try:
+                extract_frames(video_path, frames_output_dir, fps=2)
+            except subprocess.CalledProcessError as e:
+                print(f"Failed to extract frames from {video_file}: {e}")
+    
+    def _submit_annotation(self, video_gcs_path):
+        """Start annotation of one video through the backend and return the operation"""
+        landmarks_dir = os.path.join(self.local_data_dir, "landmarks")
+        return self.backend.submit_annotation(video_gcs_path, landmarks_dir)
     
     def process_video_landmarks(self, video_gcs_path, target_specific_landmarks=True):
         """Process videos with Video Intelligence API focusing on knee and torso landmarks"""
@@ -164,110 +189,72 @@ class PhysioFlowMLPipeline:
         if target_specific_landmarks:
             print("Targeting knee and torso landmarks for physiotherapy analysis")
         
-        # Create Video Intelligence client
-        video_client = videointelligence.VideoIntelligenceServiceClient()
-        
-        # Configure the request
-        features = [videointelligence.Feature.PERSON_DETECTION]
-        
-        # Set up processing - adjust based on your needs
-        person_config = videointelligence.PersonDetectionConfig(
-            include_pose_landmarks=True,
-            include_bounding_boxes=False
-        )
-        
-        config = videointelligence.VideoContext(
-            person_detection_config=person_config
-        )
-        
-        # Launch the asynchronous request
-        operation = video_client.annotate_video(
-            request={
-                "features": features,
-                "input_uri": video_gcs_path,
-                "video_context": config,
-            }
-        )
+        operation = self._submit_annotation(video_gcs_path)
         
         print("Processing video. This may take some time.")
-        result = operation.result(timeout=300)
+        result = operation.result(timeout=self.backend.annotation_timeout)
         
-        # Process and save the landmarks
+        self._parse_annotation_result(video_gcs_path, result, target_specific_landmarks)
+        return os.path.join(self.local_data_dir, "landmarks")
+    
+    def annotate_video(self, video_gcs_path, target_specific_landmarks=True):
+        """Annotate one video through the backend and save its landmarks
+        
+        Waits up to the backend's annotation_timeout. A timed out job that cannot
+        be cancelled is waited for, so nothing is still writing when this returns.
+        
+        Returns:
+            Local path of the landmarks parquet file, or None if annotation failed
+            or found no pose (so a cached None is retried on the next run)
+        """
+        with self._annotation_slots:
+            operation = None
+            try:
+                operation = self._submit_annotation(video_gcs_path)
+                result = operation.result(timeout=self.backend.annotation_timeout)
+                return self.backend.handle_annotation_result(self, video_gcs_path, result,
+                                                             target_specific_landmarks)
+            except Exception as e:
+                print(f"Annotation failed for {video_gcs_path}: {e}")
+                if operation is not None and not operation.done() and not cancel_operation(operation):
+                    wait_quietly(operation)
+                return None
+    
+    def _parse_annotation_result(self, video_gcs_path, result, target_specific_landmarks=True):
+        """Save landmarks from a Video Intelligence annotation result as one parquet file per video"""
         landmarks_dir = os.path.join(self.local_data_dir, "landmarks")
-        os.makedirs(landmarks_dir, exist_ok=True)
         
-        # Get video filename for naming the output files
+        # Get video filename for naming the output file
         video_filename = video_gcs_path.split('/')[-1].split('.')[0]
         
-        # Extract landmarks from the response
-        for annotation in result.annotation_results:
-            for person_detection in annotation.person_detection_annotations:
-                for track in person_detection.tracks:
-                    # Process each frame that has pose landmarks
-                    for timestamp in track.timestamps:
-                        if timestamp.pose_landmarks:
-                            frame_time = timestamp.time_offset.seconds + timestamp.time_offset.nanos / 1e9
-                            frame_id = f"{video_filename}_frame_{int(frame_time * 1000)}"
-                            
-                            # Save landmarks to file
-                            landmarks_data = {}
-                            
-                            # For knee emphasis, we track the bounding box of knee area
-                            knee_min_x, knee_min_y = float('inf'), float('inf')
-                            knee_max_x, knee_max_y = float('-inf'), float('-inf')
-                            
-                            # First pass: find knee bounding box if targeting specific landmarks
-                            if target_specific_landmarks:
-                                for i, landmark in enumerate(timestamp.pose_landmarks):
-                                    if i in self.knee_landmarks:
-                                        knee_min_x = min(knee_min_x, landmark.x)
-                                        knee_min_y = min(knee_min_y, landmark.y)
-                                        knee_max_x = max(knee_max_x, landmark.x)
-                                        knee_max_y = max(knee_max_y, landmark.y)
-                            
-                            # Second pass: save landmarks
-                            for i, landmark in enumerate(timestamp.pose_landmarks):
-                                # If targeting specific landmarks, only save those in our target set
-                                if not target_specific_landmarks or i in self.target_landmarks:
-                                    # Additional metadata for knee landmarks to emphasize their importance
-                                    is_knee_landmark = i in self.knee_landmarks
-                                    
-                                    # For knee landmarks, calculate normalized position within knee region
-                                    if is_knee_landmark and knee_max_x > knee_min_x and knee_max_y > knee_min_y:
-                                        norm_x = (landmark.x - knee_min_x) / (knee_max_x - knee_min_x)
-                                        norm_y = (landmark.y - knee_min_y) / (knee_max_y - knee_min_y)
-                                    else:
-                                        norm_x = landmark.x
-                                        norm_y = landmark.y
-                                    
-                                    # Store more detailed data for knee landmarks
-                                    landmarks_data[str(i)] = {
-                                        "x": landmark.x,
-                                        "y": landmark.y,
-                                        "z": landmark.z if hasattr(landmark, 'z') else 0.0,
-                                        "visibility": landmark.visibility,
-                                        "normalized_x": norm_x,
-                                        "normalized_y": norm_y,
-                                        "landmark_type": "knee" if is_knee_landmark else "torso" if i in self.torso_landmarks else "other"
-                                    }
-                            
-                            # Add metadata
-                            landmarks_data["metadata"] = {
-                                "target_area": "knee_and_torso" if target_specific_landmarks else "full_body",
-                                "emphasis": "knee",
-                                "frame_time": frame_time,
-                                "video_path": video_gcs_path
-                            }
-                            
-                            # Save to file
-                            output_path = os.path.join(landmarks_dir, f"{frame_id}.json")
-                            with open(output_path, 'w') as f:
-                                json.dump(landmarks_data, f)
+        # Knee-region normalization only applies when targeting specific landmarks
+        df = parse_annotation_result(
+            result,
+            video_filename,
+            knee_landmarks=self.knee_landmarks if target_specific_landmarks else (),
+            target_landmarks=self.target_landmarks if target_specific_landmarks else None
+        )
+        if df is None:
+            print(f"No pose landmarks found in {video_gcs_path}")
+            return None
         
-        return landmarks_dir
+        output_file = save_landmarks_parquet(df, landmarks_dir, video_filename)
+        print(f"Saved {len(df)} frames of landmarks to {output_file}")
+        return output_file
 
-    def process_video_from_gcs(self, videos_gcs_path, target_specific_landmarks=True):
-        """Process all videos from GCS using Video Intelligence API"""
+    def process_video_from_gcs(self, videos_gcs_path, target_specific_landmarks=True,
+                               max_concurrent=8, result_handler=None):
+        """Process all videos from GCS using Video Intelligence API
+        
+        Annotation jobs are submitted up front (up to max_concurrent at a time)
+        and each result is parsed as soon as its job completes.
+        
+        Args:
+            videos_gcs_path: gs:// path containing the videos
+            target_specific_landmarks: Keep only knee and torso landmarks
+            max_concurrent: Maximum annotation jobs in flight
+            result_handler: Optional callable (video_gcs_path, result) replacing the default parser
+        """
         print(f"Processing videos from {videos_gcs_path}")
         if target_specific_landmarks:
             print("Focusing on knee and torso landmarks for physiotherapy analysis")
@@ -276,43 +263,60 @@ class PhysioFlowMLPipeline:
         gcs_prefix = videos_gcs_path.replace(f"gs://{self.bucket_name}/", "")
         
         # List all video files in the GCS path
-        blobs = self.storage_client.list_blobs(
-            self.bucket_name, 
-            prefix=gcs_prefix
-        )
+        blobs = self.bucket.list_blobs(prefix=gcs_prefix)
+        video_uris = [f"gs://{self.bucket_name}/{blob.name}" for blob in blobs if blob.name.endswith('.mp4')]
         
         # Initialize empty landmarks directory
         landmarks_dir = os.path.join(self.local_data_dir, "landmarks")
         os.makedirs(landmarks_dir, exist_ok=True)
         
-        # Process each video file
-        for blob in blobs:
-            if blob.name.endswith('.mp4'):
-                video_gcs_path = f"gs://{self.bucket_name}/{blob.name}"
-                print(f"Processing video: {video_gcs_path}")
-                
-                # Use Video Intelligence API to process this video with landmark targeting
-                self.process_video_landmarks(video_gcs_path, target_specific_landmarks)
+        if result_handler is None:
+            result_handler = lambda uri, result: self.backend.handle_annotation_result(
+                self, uri, result, target_specific_landmarks
+            )
+        
+        # Annotate all videos concurrently (Video Intelligence API or local MediaPipe)
+        fan_out = AnnotationFanOut(
+            self._submit_annotation,
+            result_handler,
+            max_concurrent=self._annotation_concurrency(max_concurrent),
+            timeout=self.backend.annotation_timeout
+        )
+        with stage('vertex.annotate', len(video_uris)):
+            _, failures = fan_out.run(video_uris)
+        if failures:
+            print(f"Warning: {len(failures)} videos failed annotation")
         
         return landmarks_dir
 
+    def _annotation_concurrency(self, requested):
+        """Annotations to keep in flight, capped at what the backend can actually run"""
+        limit = self.backend.max_concurrent_annotations
+        return min(requested, limit) if limit else requested
+    
     def upload_to_gcs(self, local_dir, gcs_prefix):
         """Upload local directory to GCS bucket"""
         print(f"Uploading {local_dir} to gs://{self.bucket_name}/{gcs_prefix}")
         
-        for root, _, files in os.walk(local_dir):
-            for file in files:
-                local_path = os.path.join(root, file)
-                # Get the relative path from the local_dir
-                rel_path = os.path.relpath(local_path, local_dir)
-                gcs_path = f"{gcs_prefix}/{rel_path}"
-                
-                blob = self.bucket.blob(gcs_path)
-                blob.upload_from_filename(local_path)
+        with stage('vertex.upload') as record:
+            stats = self.transfer.upload_directory(local_dir, gcs_prefix)
+            record.add(stats.files)
+        if stats.failures:
+            raise RuntimeError(f"{len(stats.failures)} files failed to upload to gs://{self.bucket_name}/{gcs_prefix}")
         
         print(f"Upload to gs://{self.bucket_name}/{gcs_prefix} complete")
         return f"gs://{self.bucket_name}/{gcs_prefix}"
     
+    def upload_file(self, local_path, gcs_name):
+        """Upload one file to GCS, skipping it if an identical object exists"""
+        with stage('vertex.upload') as record:
+            stats = self.transfer.upload_files([(local_path, gcs_name)], gcs_name)
+            record.add(stats.files)
+        if stats.failures:
+            raise RuntimeError(f"Failed to upload {local_path} to gs://{self.bucket_name}/{gcs_name}: "
+                               f"{stats.failures[0][1]}")
+        return f"gs://{self.bucket_name}/{gcs_name}"
+    
     def upload_config(self):
         """Upload config file to GCS"""
         if not os.path.exists(self.config_path):
@@ -354,62 +358,13 @@ training:
             f.write(default_config)
     
     def train_on_vertex(self, landmarks_gcs_path, config_gcs_path):
-        """Train model on Vertex AI"""
-        print("Setting up Vertex AI training job")
-        
-        # Create a unique job name
-        job_name = f"physioflow_training_{int(time.time())}"
-        
-        # Define container args
-        container_args = [
-            f"--config={config_gcs_path}",
-            f"--data-dir={landmarks_gcs_path}",
-            f"--output-dir=gs://{self.bucket_name}/models"
-        ]
-        
-        # Use correct Vertex AI container image
-        custom_container_image = "us-docker.pkg.dev/vertex-ai/training/tf-gpu.2-12:latest"
-        
-        # Create Python package
-        package_path = self._package_training_code()
-        
-        # Upload package to GCS
-        package_gcs_path = self.upload_to_gcs(
-            package_path, 
-            f"code/physioflow_training_{int(time.time())}"
-        )
-        
-        # Create and run the custom training job
-        worker_pool_specs = [
-            {
-                "machine_spec": {
-                    "machine_type": "n1-standard-8",
-                    "accelerator_type": "NVIDIA_TESLA_T4",
-                    "accelerator_count": 1,
-                },
-                "replica_count": 1,
-                "python_package_spec": {
-                    "executor_image_uri": custom_container_image,
-                    "package_uris": [package_gcs_path],
-                    "python_module": "trainer.task",
-                    "args": container_args,
-                },
-            }
-        ]
+        """Train model on Vertex AI (or the configured backend's trainer)"""
+        print("Setting up training job")
         
         try:
-            job = aiplatform.CustomJob(
-                display_name=job_name,
-                worker_pool_specs=worker_pool_specs,
-                staging_bucket=f"gs://{self.bucket_name}"
-            )
-            
-            print(f"Starting Vertex AI training job: {job_name}")
-            job.run()
-            print("Training job completed successfully")
+            model_dir = self.backend.run_training_job(self, landmarks_gcs_path, config_gcs_path)
             
             # Get model artifacts
-            model_dir = f"gs://{self.bucket_name}/models"
             print(f"Model artifacts available at: {model_dir}")
             return model_dir
             
@@ -459,6 +414,18 @@ setup(
             os.path.join(trainer_dir, "task.py")
         )
         
+        # Copy helper modules so the task can import them as top-level packages
+        ml_root = os.path.join(os.path.dirname(__file__), '..')
+        for module_path in TRAINING_SUPPORT_MODULES:
+            target_path = os.path.join(package_dir, module_path)
+            target_pkg = os.path.dirname(target_path)
+            os.makedirs(target_pkg, exist_ok=True)
+            init_file = os.path.join(target_pkg, "__init__.py")
+            if not os.path.exists(init_file):
+                with open(init_file, "w") as f:
+                    f.write("")
+            shutil.copy2(os.path.join(ml_root, module_path), target_path)
+        
         return package_dir
     
     def _local_training_fallback(self, landmarks_gcs_path):
@@ -473,23 +440,29 @@ setup(
         gcs_path = landmarks_gcs_path.replace(f"gs://{self.bucket_name}/", "")
         
         # Download files
-        blobs = self.storage_client.list_blobs(self.bucket_name, prefix=gcs_path)
-        for blob in blobs:
-            # Get relative path
-            rel_path = blob.name.replace(gcs_path, "").lstrip("/")
-            if not rel_path:
-                continue
-                
-            local_file = os.path.join(local_landmarks_dir, rel_path)
-            os.makedirs(os.path.dirname(local_file), exist_ok=True)
-            blob.download_to_filename(local_file)
+        with stage('vertex.download') as record:
+            stats = self.transfer.download_prefix(gcs_path, local_landmarks_dir)
+            record.add(stats.files)
+        if stats.failures:
+            print(f"Warning: {len(stats.failures)} landmark files failed to download")
+        
+        # Download the video metadata catalog for labels
+        catalog_path = os.path.join(self.local_data_dir, "catalog_from_gcs", CATALOG_FILENAME)
+        catalog_blob = self.bucket.blob(f"data/{CATALOG_FILENAME}")
+        if catalog_blob.exists():
+            os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+            catalog_blob.download_to_filename(catalog_path)
         
         # Train model locally
         config = load_config(self.config_path)
         local_model_dir = os.path.join(self.local_data_dir, "models")
         os.makedirs(local_model_dir, exist_ok=True)
         
-        tflite_path = train_model(config, local_model_dir)
+        tflite_path = train_model(
+            config, local_model_dir,
+            landmarks_dir=local_landmarks_dir,
+            catalog_path=catalog_path
+        )
         
         # Upload model back to GCS
         gcs_model_path = self.upload_to_gcs(local_model_dir, "models")
@@ -501,7 +474,7 @@ setup(
         os.makedirs(output_dir, exist_ok=True)
         
         # List model files in GCS
-        blobs = self.storage_client.list_blobs(self.bucket_name, prefix="models/")
+        blobs = self.bucket.list_blobs(prefix="models/")
         
         # Download TFLite model file
         for blob in blobs:
@@ -515,34 +488,183 @@ setup(
         return None
     
     def cleanup(self):
-        """Clean up temporary files"""
+        """Clean up temporary files (a persistent work_dir is kept for the stage cache)"""
+        self.backend.close()
+        if not self._owns_work_dir:
+            return
         print("Cleaning up temporary files")
         shutil.rmtree(self.local_data_dir)
     
+    def _gcs_prefix_exists(self, gcs_uri):
+        """Check that at least one object exists under a gs:// prefix"""
+        prefix = gcs_uri.replace(f"gs://{self.bucket_name}/", "")
+        return next(iter(self.bucket.list_blobs(prefix=prefix)), None) is not None
+    
+    def _validate_stage_output(self, output):
+        """Cached outputs are reusable while the local paths or GCS objects they point to exist"""
+        if isinstance(output, str) and output.startswith('gs://'):
+            return self._gcs_prefix_exists(output)
+        return local_output_exists(output)
+    
+    def _config_fingerprint(self):
+        """Content hash of the training config, so config edits invalidate training"""
+        return hash_file(self.config_path) if os.path.exists(self.config_path) else None
+    
+    def _search_fingerprint(self, search_term, max_videos):
+        """Hash of the search query, max_videos and the video ids YouTube currently returns
+        
+        New search results change the key, so collection reruns when there is
+        something new to download. If the search fails the key falls back to
+        the query alone and the cached collection is reused.
+        """
+        try:
+            video_ids = sorted(result['id'] for result in search_videos(search_term, max_videos))
+        except Exception as e:
+            print(f"Could not check YouTube for new videos, reusing cached collection: {e}")
+            video_ids = None
+        payload = {'search_term': search_term, 'max_videos': max_videos, 'video_ids': video_ids}
+        return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()
+    
+    def build_collect_dag(self, search_term=None, max_videos=10, local_video_dir=None):
+        """Express video collection as a cached stage
+        
+        Collection decides which videos exist, so it runs first; build_dag then
+        creates stages for each collected video.
+        """
+        dag = PipelineDAG(self.cache_dir, max_workers=1)
+        
+        # Step 1: Collect videos (local or YouTube); downloads run concurrently inside the stage
+        dag.add(Stage(
+            'collect',
+            lambda: self.collect_videos(search_term, max_videos, local_video_dir),
+            params={'search_term': search_term, 'max_videos': max_videos, 'local_video_dir': local_video_dir},
+            fingerprint=((lambda: hash_directory_listing(local_video_dir)) if local_video_dir
+                         else (lambda: self._search_fingerprint(search_term, max_videos))),
+            validate=self._validate_stage_output
+        ))
+        return dag
+    
+    def _add_video_stages(self, dag, video_path, target_specific_landmarks):
+        """Add the upload, annotate and landmark upload stages for one video
+        
+        Returns:
+            Name of the video's last stage
+        """
+        video_file = os.path.basename(video_path)
+        video_name = os.path.splitext(video_file)[0]
+        validate = self._validate_stage_output
+        upload_name = f"upload_video:{video_name}"
+        annotate_name = f"annotate:{video_name}"
+        landmarks_name = f"upload_landmarks:{video_name}"
+        
+        # Keyed on the file, so only new or changed videos are uploaded and annotated again
+        dag.add(Stage(
+            upload_name,
+            lambda: self.upload_file(video_path, f"data/videos/{video_file}"),
+            fingerprint=lambda: hash_file_stat(video_path),
+            validate=validate
+        ))
+        dag.add(Stage(
+            annotate_name,
+            lambda **inputs: self.annotate_video(inputs[upload_name], target_specific_landmarks),
+            inputs=[upload_name],
+            params={'target_specific_landmarks': target_specific_landmarks},
+            validate=validate
+        ))
+        
+        def upload_landmarks(**inputs):
+            landmarks_path = inputs[annotate_name]
+            if landmarks_path is None:
+                return None
+            return self.upload_file(landmarks_path, f"data/landmarks/{os.path.basename(landmarks_path)}")
+        
+        dag.add(Stage(landmarks_name, upload_landmarks, inputs=[annotate_name], validate=validate))
+        return landmarks_name
+    
+    def build_dag(self, video_dir, output_dir="ml/models", target_specific_landmarks=True,
+                  annotation_concurrency=8):
+        """Express the rest of the pipeline for the collected videos as a DAG of cached stages
+        
+        Every video gets its own upload, annotate and landmark upload stages, so
+        one video is annotated while others are still uploading.
+        """
+        # Only finished videos: interrupted downloads are left behind as <name>.mp4.part
+        video_files = sorted(f for f in os.listdir(video_dir) if f.endswith('.mp4'))
+        if not video_files:
+            raise ValueError(f"No videos collected in {video_dir}")
+        
+        # Annotations wait on long-running jobs; leave threads free for uploads
+        annotation_concurrency = self._annotation_concurrency(annotation_concurrency)
+        self._annotation_slots = threading.BoundedSemaphore(annotation_concurrency)
+        dag = PipelineDAG(self.cache_dir, max_workers=annotation_concurrency + 4)
+        validate = self._validate_stage_output
+        
+        # Steps 2-4: Upload each video, annotate it (Video Intelligence API or MediaPipe) and upload its landmarks
+        landmark_stages = [
+            self._add_video_stages(dag, os.path.join(video_dir, video_file), target_specific_landmarks)
+            for video_file in video_files
+        ]
+        
+        # Upload the metadata catalog for labels
+        catalog_path = catalog_path_for(video_dir)
+        dag.add(Stage(
+            'upload_catalog',
+            lambda: (self.upload_file(catalog_path, f"data/{CATALOG_FILENAME}")
+                     if os.path.exists(catalog_path) else None),
+            fingerprint=lambda: hash_file_stat(catalog_path) if os.path.exists(catalog_path) else None,
+            validate=lambda output: output is None or validate(output)
+        ))
+        
+        # Step 5: Upload config (independent of the data stages, so it runs alongside them)
+        dag.add(Stage(
+            'upload_config',
+            self.upload_config,
+            fingerprint=self._config_fingerprint,
+            validate=validate
+        ))
+        
+        # Step 6: Train on Vertex AI once every video has been processed
+        def train(**inputs):
+            if not any(inputs[name] for name in landmark_stages):
+                raise RuntimeError("No landmarks were extracted from any video")
+            return self.train_on_vertex(f"gs://{self.bucket_name}/data/landmarks", inputs['upload_config'])
+        
+        dag.add(Stage(
+            'train',
+            train,
+            inputs=landmark_stages + ['upload_catalog', 'upload_config'],
+            validate=validate
+        ))
+        
+        # Step 7: Download model (always runs, it is cheap and targets the caller's directory)
+        dag.add(Stage(
+            'download_model',
+            lambda train: self.download_model(output_dir),
+            inputs=['train'],
+            cache=False
+        ))
+        
+        return dag
+    
     def run_pipeline(self, search_term=None, max_videos=10, output_dir="ml/models", 
-                target_specific_landmarks=True, local_video_dir=None):
-        """Run the entire pipeline with optional local video source"""
+                target_specific_landmarks=True, local_video_dir=None, annotation_concurrency=8,
+                force_stages=()):
+        """Run the entire pipeline with optional local video source
+        
+        Stages whose inputs are unchanged since a previous run are reused from
+        the stage cache; force_stages lists stages (see PIPELINE_STAGES) to rerun regardless.
+        """
         try:
-            # Step 1: Collect videos (local or YouTube)
-            video_dir = self.collect_videos(search_term, max_videos, local_video_dir)
-            
-            # Step 2: Upload videos to GCS
-            videos_gcs_path = self.upload_to_gcs(video_dir, "data/videos")
-            
-            # Step 3: Process videos with Video Intelligence API, targeting knee and torso
-            landmarks_dir = self.process_video_from_gcs(videos_gcs_path, target_specific_landmarks)
+            unknown = [name for name in force_stages if name not in PIPELINE_STAGES]
+            if unknown:
+                raise ValueError(f"Cannot force unknown stages: {unknown}")
             
-            # Step 4: Upload landmarks to GCS
-            landmarks_gcs_path = self.upload_to_gcs(landmarks_dir, "data/landmarks")
+            collect_dag = self.build_collect_dag(search_term, max_videos, local_video_dir)
+            video_dir = collect_dag.run(force=collect_dag.select(force_stages))['collect']
             
-            # Step 5: Upload config
-            config_gcs_path = self.upload_config()
-            
-            # Step 6: Train on Vertex AI
-            model_gcs_path = self.train_on_vertex(landmarks_gcs_path, config_gcs_path)
-            
-            # Step 7: Download model
-            local_model_path = self.download_model(output_dir)
+            dag = self.build_dag(video_dir, output_dir, target_specific_landmarks, annotation_concurrency)
+            outputs = dag.run(force=dag.select(force_stages))
+            local_model_path = outputs['download_model']
             
             print("\n" + "="*80)
             print(f"Pipeline completed successfully!")
@@ -558,9 +680,13 @@ setup(
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description='PhysioFlow ML Pipeline on Vertex AI')
-    parser.add_argument('--project-id', required=True, help='GCP Project ID')
+    parser.add_argument('--backend', choices=['gcp', 'local'], default='gcp',
+                       help='Run on GCP, or offline with a local directory bucket, MediaPipe and in-process training')
+    parser.add_argument('--local-root', default='ml/data/local_bucket',
+                       help='Directory used as bucket storage by the local backend')
+    parser.add_argument('--project-id', default=None, help='GCP Project ID (required for the gcp backend)')
     parser.add_argument('--region', default='us-central1', help='GCP Region')
-    parser.add_argument('--bucket', required=True, help='GCS Bucket name')
+    parser.add_argument('--bucket', default='physioflow', help='GCS Bucket name')
     parser.add_argument('--config', default='ml/training/config.yaml', help='Config file path')
     parser.add_argument('--search', default='knee physiotherapy exercises', 
                        help='YouTube search term for training data')
@@ -572,15 +698,38 @@ def main():
                       help='Target knee and torso landmarks for physiotherapy analysis')
     parser.add_argument('--local-videos', type=str, default=None,
                       help='Path to directory containing local video files (skips YouTube download)')
+    parser.add_argument('--transfer-workers', type=int, default=16,
+                      help='Concurrent file transfers to and from GCS')
+    parser.add_argument('--annotation-concurrency', type=int, default=8,
+                      help='Maximum Video Intelligence annotation jobs in flight')
+    parser.add_argument('--work-dir', default=None,
+                      help='Persistent working directory; enables reuse of completed stages between runs')
+    parser.add_argument('--cache-dir', default=None,
+                      help='Stage cache directory (defaults to <work-dir>/stage_cache)')
+    parser.add_argument('--force-stage', action='append', default=[], choices=PIPELINE_STAGES,
+                      help='Rerun this stage even if cached (repeatable); per-video stages rerun for every video')
+    add_profiling_args(parser)
     
     args = parser.parse_args()
+    profile_report = configure_from_args(args)
+    
+    if args.backend == 'local':
+        backend = LocalBackend(args.local_root)
+    elif args.project_id is None:
+        parser.error("--project-id is required for the gcp backend")
+    else:
+        backend = GCPBackend(args.project_id, args.region, staging_bucket=f"gs://{args.bucket}")
     
     # Create and run the pipeline
     pipeline = PhysioFlowMLPipeline(
         args.project_id, 
         args.region, 
         args.bucket, 
-        args.config
+        args.config,
+        args.transfer_workers,
+        args.work_dir,
+        args.cache_dir,
+        backend
     )
     
     pipeline.run_pipeline(
@@ -588,8 +737,13 @@ def main():
         args.max_videos, 
         args.output_dir, 
         args.target_landmarks,
-        args.local_videos
+        args.local_videos,
+        args.annotation_concurrency,
+        args.force_stage
     )
+    
+    if profile_report:
+        get_profiler().write_report(profile_report)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Helpers for turning per-frame landmark data into fixed-length sequence windows
+"""
+import os
+import glob
+import numpy as np
+
+def video_id_from_path(parquet_file):
+    """Return the video id a landmarks parquet file was generated from"""
+    return os.path.basename(parquet_file).split('_landmarks')[0]
+
+def read_landmarks(parquet_file):
+    """Read a landmarks parquet file into a (frames, landmarks, dims) float32 array"""
+    import pandas as pd
+
+    df = pd.read_parquet(parquet_file)
+    frames = df.sort_values('frame_index')
+    if frames.empty:
+        return np.empty((0, 0, 0), dtype=np.float32)
+    return np.stack([np.stack(x) for x in frames['landmarks']]).astype(np.float32)
+
+def create_sequences(landmark_data, seq_length, stride=None):
+    """Slice per-frame landmarks into overlapping windows
+
+    Args:
+        landmark_data: Array of shape (frames, landmarks, dims)
+        seq_length: Number of frames per window
+        stride: Frames between window starts (defaults to 50% overlap)
+
+    Returns:
+        Array of shape (windows, seq_length, landmarks * dims)
+    """
+    if stride is None:
+        stride = max(seq_length // 2, 1)
+
+    num_frames = len(landmark_data)
+    if num_frames < seq_length:
+        num_features = int(np.prod(landmark_data.shape[1:])) if landmark_data.ndim > 1 else 0
+        return np.empty((0, seq_length, num_features), dtype=landmark_data.dtype)
+
+    # Flatten landmarks for each frame, then take strided windows
+    flat = landmark_data.reshape(num_frames, -1)
+    starts = range(0, num_frames - seq_length + 1, stride)
+    return np.stack([flat[start:start + seq_length] for start in starts])
+
+def load_landmark_windows(landmarks_dir, seq_length, stride=None, max_windows=None):
+    """Load windows from every parquet file in a directory
+
+    Returns:
+        List of (video_id, windows) tuples, one per parquet file with at least one window
+    """
+    parquet_files = sorted(glob.glob(os.path.join(landmarks_dir, "*.parquet")))
+    if not parquet_files:
+        raise ValueError(f"No parquet files found in {landmarks_dir}")
+
+    results = []
+    total = 0
+    for parquet_file in parquet_files:
+        windows = create_sequences(read_landmarks(parquet_file), seq_length, stride)
+        if len(windows) == 0:
+            continue
+
+        if max_windows is not None and total + len(windows) > max_windows:
+            windows = windows[:max_windows - total]
+        results.append((video_id_from_path(parquet_file), windows))
+        total += len(windows)
+
+        if max_windows is not None and total >= max_windows:
+            break
+
+    return results
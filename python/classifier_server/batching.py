@@ -0,0 +1,101 @@
+# python/classifier_server/batching.py
+"""
+Coalesces concurrent classification requests into batched model calls
+"""
+import asyncio
+import numpy as np
+
+class BatchingClassifier:
+    """Queues window batches from many callers and scores them together
+
+    Requests are gathered until max_batch_size windows are waiting or
+    max_wait_ms has passed since the first one arrived, then run as a
+    single model call in a worker thread.
+    """
+
+    def __init__(self, classifier, max_batch_size=64, max_wait_ms=5.0):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self.batches_run = 0
+        self.windows_scored = 0
+
+    async def start(self):
+        """Start the background batching loop"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def classify(self, windows):
+        """Score windows of shape (n, frames, features) and return probabilities"""
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 4:
+            windows = windows.reshape(len(windows), windows.shape[1], -1)
+        # Validate before queueing so one bad request cannot fail a shared batch
+        if windows.ndim != 3 or windows.shape[1:] != tuple(self.classifier.window_shape):
+            raise ValueError(f"Expected windows of shape (n, {', '.join(map(str, self.classifier.window_shape))}), "
+                             f"got {windows.shape}")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((windows, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        pending = [await self._queue.get()]
+        num_windows = len(pending[0][0])
+        deadline = loop.time() + self.max_wait
+
+        while num_windows < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            num_windows += len(item[0])
+
+        return pending
+
+    async def _run(self):
+        """Batching loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._collect()
+            # Drop requests whose callers have gone away
+            pending = [(w, f) for w, f in pending if not f.done()]
+            if not pending:
+                continue
+
+            sizes = [len(w) for w, _ in pending]
+            try:
+                batch = np.concatenate([w for w, _ in pending])
+                probabilities = await loop.run_in_executor(None, self.classifier.predict, batch)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.windows_scored += len(batch)
+
+            offset = 0
+            for (_, future), size in zip(pending, sizes):
+                if not future.done():
+                    future.set_result(probabilities[offset:offset + size])
+                offset += size
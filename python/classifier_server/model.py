@@ -0,0 +1,114 @@
+# python/classifier_server/model.py
+"""
+Loads an exported knee exercise model and its label map for batched scoring
+"""
+import os
+import glob
+import json
+import threading
+import numpy as np
+
+def label_map_for_model(model_path):
+    """Path of the label map exported with a knee_exercise_model_<timestamp> model
+
+    Raises:
+        FileNotFoundError: If the model is not named that way or its label map is missing
+    """
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    if not name.startswith("knee_exercise_model_"):
+        raise FileNotFoundError(f"Cannot derive a label map for {model_path}; "
+                                "set PHYSIOFLOW_LABEL_MAP_PATH")
+    timestamp = name[len("knee_exercise_model_"):]
+    label_map_path = os.path.join(os.path.dirname(model_path), f"label_map_{timestamp}.json")
+    if not os.path.exists(label_map_path):
+        raise FileNotFoundError(f"Label map not found for {model_path}: {label_map_path}")
+    return label_map_path
+
+def find_latest_model(models_dir, extension='.tflite'):
+    """Find the newest exported model and its matching label map
+
+    Returns:
+        (model_path, label_map_path) tuple
+    """
+    model_paths = sorted(glob.glob(os.path.join(models_dir, f"knee_exercise_model_*{extension}")))
+    if not model_paths:
+        raise FileNotFoundError(f"No knee_exercise_model_*{extension} found in {models_dir}")
+
+    model_path = model_paths[-1]
+    return model_path, label_map_for_model(model_path)
+
+def load_labels(label_map_path):
+    """Load the {index: label} map written by train_model into an ordered list"""
+    with open(label_map_path, 'r') as f:
+        label_map = json.load(f)
+    return [label_map[str(i)] for i in range(len(label_map))]
+
+class SequenceClassifier:
+    """Scores 30-frame landmark windows with a TFLite or Keras model"""
+
+    def __init__(self, model_path, label_map_path, num_threads=None, max_batch_size=256):
+        self.model_path = model_path
+        self.labels = load_labels(label_map_path)
+        self.max_batch_size = max_batch_size
+        # The TFLite interpreter is not thread-safe
+        self._lock = threading.Lock()
+        self._batch_size = None
+
+        import tensorflow as tf
+        if model_path.endswith('.tflite'):
+            self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+            self._interpreter.allocate_tensors()
+            input_details = self._interpreter.get_input_details()[0]
+            self._input_index = input_details['index']
+            self._output_index = self._interpreter.get_output_details()[0]['index']
+            self.window_shape = tuple(input_details['shape'][1:])
+            self._keras_model = None
+        else:
+            self._interpreter = None
+            self._keras_model = tf.keras.models.load_model(model_path)
+            self.window_shape = tuple(self._keras_model.input_shape[1:])
+
+    def _predict_tflite(self, batch):
+        """Run one batch through the interpreter, resizing only when the batch size changes"""
+        if self._batch_size != len(batch):
+            self._interpreter.resize_tensor_input(self._input_index, [len(batch), *self.window_shape])
+            self._interpreter.allocate_tensors()
+            self._batch_size = len(batch)
+        self._interpreter.set_tensor(self._input_index, batch)
+        self._interpreter.invoke()
+        return self._interpreter.get_tensor(self._output_index)
+
+    def predict(self, windows):
+        """Return class probabilities for windows of shape (n, frames, features)
+
+        Windows shaped (n, frames, landmarks, dims) are flattened per frame.
+        """
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 4:
+            windows = windows.reshape(len(windows), windows.shape[1], -1)
+        if windows.shape[1:] != self.window_shape:
+            raise ValueError(f"Expected windows of shape (n, {', '.join(map(str, self.window_shape))}), "
+                             f"got {windows.shape}")
+
+        if len(windows) == 0:
+            return np.empty((0, len(self.labels)), dtype=np.float32)
+
+        with self._lock:
+            if self._keras_model is not None:
+                return self._keras_model.predict(windows, batch_size=self.max_batch_size, verbose=0)
+
+            outputs = [self._predict_tflite(windows[i:i + self.max_batch_size])
+                       for i in range(0, len(windows), self.max_batch_size)]
+            return np.concatenate(outputs)
+
+    def describe(self, probabilities):
+        """Convert probability rows into label/confidence dictionaries"""
+        results = []
+        for row in probabilities:
+            best = int(np.argmax(row))
+            results.append({
+                'label': self.labels[best],
+                'confidence': float(row[best]),
+                'probabilities': {label: float(p) for label, p in zip(self.labels, row)},
+            })
+        return results
@@ -0,0 +1,238 @@
+# python/classifier_server/server.py
+"""
+Server-side exercise classification for recorded pose sequences
+Scores 30-frame landmark windows with the model exported by train_model
+"""
+import os
+import sys
+import json
+import glob
+import argparse
+from typing import List, Optional
+import numpy as np
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+import uvicorn
+
+from model import SequenceClassifier, find_latest_model, label_map_for_model
+from batching import BatchingClassifier
+from sessions import LandmarkSession, decode_frames, FRAME_BYTES, FRAME_FLOATS
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'ml'))
+from training.windows import create_sequences, read_landmarks, video_id_from_path
+
+app = FastAPI(title="PhysioFlow Exercise Classifier API")
+
+# Model configuration
+MODELS_DIR = os.environ.get("PHYSIOFLOW_MODELS_DIR", "ml/models")
+MODEL_PATH = os.environ.get("PHYSIOFLOW_MODEL_PATH")  # Defaults to the latest model in MODELS_DIR
+LABEL_MAP_PATH = os.environ.get("PHYSIOFLOW_LABEL_MAP_PATH")
+MAX_BATCH_SIZE = int(os.environ.get("PHYSIOFLOW_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.environ.get("PHYSIOFLOW_MAX_WAIT_MS", "5"))
+
+# Live streaming configuration
+MAX_SESSIONS = int(os.environ.get("PHYSIOFLOW_MAX_SESSIONS", "256"))
+STREAM_STRIDE = int(os.environ.get("PHYSIOFLOW_STREAM_STRIDE", "15"))
+
+classifier = None
+batcher = None
+sessions = {}
+
+class WindowsRequest(BaseModel):
+    # One or many windows of shape (frames, features) or (frames, landmarks, dims)
+    windows: List[list]
+
+class SessionRequest(BaseModel):
+    # Per-frame landmarks of shape (frames, landmarks, dims)
+    frames: List[List[List[float]]]
+    stride: Optional[int] = None
+
+def load_classifier(model_path=None, label_map_path=None):
+    """Load the configured model, falling back to the newest export"""
+    if model_path is None:
+        model_path, default_label_map = find_latest_model(MODELS_DIR)
+        label_map_path = label_map_path or default_label_map
+    elif label_map_path is None:
+        # An explicit model without a label map uses the one exported alongside it
+        label_map_path = label_map_for_model(model_path)
+    return SequenceClassifier(model_path, label_map_path, max_batch_size=max(MAX_BATCH_SIZE, 256))
+
+@app.on_event("startup")
+async def load_model():
+    global classifier, batcher
+    try:
+        print("Loading exercise classification model...")
+        classifier = load_classifier(MODEL_PATH, LABEL_MAP_PATH)
+        batcher = BatchingClassifier(classifier, MAX_BATCH_SIZE, MAX_WAIT_MS)
+        await batcher.start()
+        print(f"Model {classifier.model_path} loaded successfully!")
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        raise
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if batcher is not None:
+        await batcher.stop()
+
+@app.get("/health")
+async def health():
+    return {
+        "model": os.path.basename(classifier.model_path),
+        "labels": classifier.labels,
+        "window_shape": list(classifier.window_shape),
+        "batches_run": batcher.batches_run,
+        "windows_scored": batcher.windows_scored,
+        "active_sessions": len(sessions),
+    }
+
+@app.post("/classify")
+async def classify(request: WindowsRequest):
+    """Classify one or many landmark windows"""
+    try:
+        windows = np.asarray(request.windows, dtype=np.float32)
+        # A single window may be sent without the outer list
+        if windows.ndim == 2 or (windows.ndim == 3 and windows.shape[-1] != classifier.window_shape[-1]):
+            windows = windows[None]
+        probabilities = await batcher.classify(windows)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Classification error: {str(e)}")
+
+    return {"predictions": classifier.describe(probabilities)}
+
+@app.post("/classify_session")
+async def classify_session(request: SessionRequest):
+    """Window a recorded session and classify every window"""
+    try:
+        frames = np.asarray(request.frames, dtype=np.float32)
+        windows = create_sequences(frames, classifier.window_shape[0], request.stride)
+        if len(windows) == 0:
+            raise ValueError(f"Session needs at least {classifier.window_shape[0]} frames")
+        probabilities = await batcher.classify(windows)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Classification error: {str(e)}")
+
+    return {
+        "predictions": classifier.describe(probabilities),
+        "session_label": classifier.labels[int(np.argmax(probabilities.mean(axis=0)))],
+    }
+
+@app.websocket("/ws/sessions/{session_id}")
+async def stream_session(websocket: WebSocket, session_id: str):
+    """Classify a live landmark stream
+    
+    Clients send binary messages of one or more frames, each 33x4 little-endian
+    float32 (x, y, z, visibility), or the text message {"type": "reset"}.
+    The server replies with JSON events: "classification" at most once per
+    message once stride frames have arrived (the latest window only, scored
+    through the shared batcher) and "rep"
+    whenever the knee returns from a bend.
+    """
+    await websocket.accept()
+    if len(sessions) >= MAX_SESSIONS or session_id in sessions:
+        reason = "Too many active sessions" if session_id not in sessions else "Session already connected"
+        await websocket.close(code=1013, reason=reason)
+        return
+    
+    window_size, num_features = classifier.window_shape
+    if num_features != FRAME_FLOATS:
+        await websocket.close(code=1011, reason=f"Model expects {num_features} features per frame")
+        return
+    
+    session = LandmarkSession(session_id, window_size, STREAM_STRIDE)
+    sessions[session_id] = session
+    try:
+        await websocket.send_json({
+            "type": "ready",
+            "frame_bytes": FRAME_BYTES,
+            "window": window_size,
+            "stride": session.stride,
+        })
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("text") is not None:
+                try:
+                    command = json.loads(message["text"])
+                except ValueError:
+                    command = {}
+                if not isinstance(command, dict):
+                    command = {}
+                if command.get("type") == "reset":
+                    session.reset()
+                    await websocket.send_json({"type": "reset"})
+                else:
+                    await websocket.send_json({"type": "error", "detail": "Unknown command"})
+                continue
+            
+            try:
+                frames = decode_frames(message.get("bytes") or b"")
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            
+            window, end_frame, events = session.push(frames)
+            for event in events:
+                await websocket.send_json(event)
+            if window is None:
+                continue
+            
+            probabilities = await batcher.classify(window[np.newaxis])
+            prediction = classifier.describe(probabilities)[0]
+            changed = prediction["label"] != session.label
+            session.label = prediction["label"]
+            await websocket.send_json({
+                "type": "classification",
+                "frame": end_frame,
+                "label_changed": changed,
+                "reps": session.reps.count,
+                **prediction,
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sessions.pop(session_id, None)
+
+def score_directory(landmarks_dir, output_path, model_path=None, label_map_path=None, stride=None):
+    """Bulk-score every landmarks parquet file in a directory without running the server"""
+    scorer = load_classifier(model_path, label_map_path)
+    parquet_files = sorted(glob.glob(os.path.join(landmarks_dir, "*.parquet")))
+    print(f"Scoring {len(parquet_files)} sessions with {scorer.model_path}")
+
+    results = {}
+    for i, parquet_file in enumerate(parquet_files):
+        if i % 100 == 0:
+            print(f"Scoring session {i+1}/{len(parquet_files)}...")
+        windows = create_sequences(read_landmarks(parquet_file), scorer.window_shape[0], stride)
+        if len(windows) == 0:
+            continue
+        probabilities = scorer.predict(windows)
+        results[video_id_from_path(parquet_file)] = {
+            "session_label": scorer.labels[int(np.argmax(probabilities.mean(axis=0)))],
+            "window_labels": [scorer.labels[i] for i in np.argmax(probabilities, axis=1)],
+        }
+
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {len(results)} session results to {output_path}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='PhysioFlow exercise classification service')
+    parser.add_argument('--score-dir', default=None,
+                        help='Bulk-score landmark parquet files in this directory and exit')
+    parser.add_argument('--output', default='session_scores.json', help='Output path for --score-dir')
+    parser.add_argument('--stride', type=int, default=None, help='Frames between windows for --score-dir')
+    parser.add_argument('--port', type=int, default=8001, help='Port to serve on')
+    args = parser.parse_args()
+
+    if args.score_dir:
+        score_directory(args.score_dir, args.output, MODEL_PATH, LABEL_MAP_PATH, args.stride)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=args.port)
@@ -0,0 +1,129 @@
+# python/classifier_server/sessions.py
+"""
+Per-session state for live landmark streaming: a fixed-size ring buffer and rep detection
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4
+FRAME_FLOATS = NUM_LANDMARKS * LANDMARK_DIMS
+FRAME_BYTES = FRAME_FLOATS * 4  # little-endian float32
+
+LEFT_KNEE = (23, 25, 27)   # hip, knee, ankle
+RIGHT_KNEE = (24, 26, 28)
+
+def decode_frames(payload):
+    """Decode a binary message of one or more 33x4 float32 frames
+
+    Returns:
+        Array of shape (frames, 132)
+    """
+    if len(payload) == 0 or len(payload) % FRAME_BYTES:
+        raise ValueError(f"Binary messages must hold whole frames of {FRAME_BYTES} bytes "
+                         f"({NUM_LANDMARKS}x{LANDMARK_DIMS} float32), got {len(payload)} bytes")
+    return np.frombuffer(payload, dtype='<f4').reshape(-1, FRAME_FLOATS)
+
+def knee_angles(frames):
+    """Knee angle in degrees per frame, from the side with the better landmark visibility"""
+    landmarks = frames.reshape(len(frames), NUM_LANDMARKS, LANDMARK_DIMS)
+    angles = []
+    visibility = []
+    for hip, knee, ankle in (LEFT_KNEE, RIGHT_KNEE):
+        ba = landmarks[:, hip, :2] - landmarks[:, knee, :2]
+        bc = landmarks[:, ankle, :2] - landmarks[:, knee, :2]
+        norms = np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1)
+        cosine = np.sum(ba * bc, axis=1) / np.maximum(norms, 1e-6)
+        angles.append(np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0))))
+        visibility.append(landmarks[:, [hip, knee, ankle], 3].min(axis=1))
+    use_right = visibility[1] > visibility[0]
+    return np.where(use_right, angles[1], angles[0])
+
+class RepCounter:
+    """Counts reps from the knee angle with hysteresis
+
+    A rep is a bend below down_angle followed by a return above up_angle;
+    the gap between the thresholds stops jitter from counting extra reps.
+    """
+
+    def __init__(self, down_angle=110.0, up_angle=155.0):
+        self.down_angle = down_angle
+        self.up_angle = up_angle
+        self.count = 0
+        self.bent = False
+        self._min_angle = 180.0
+
+    def update(self, angles, first_frame):
+        """Feed knee angles for consecutive frames; returns rep events"""
+        events = []
+        for offset, angle in enumerate(angles):
+            if self.bent:
+                self._min_angle = min(self._min_angle, float(angle))
+                if angle > self.up_angle:
+                    self.bent = False
+                    self.count += 1
+                    events.append({
+                        "type": "rep",
+                        "count": self.count,
+                        "frame": first_frame + offset,
+                        "min_knee_angle": round(self._min_angle, 1),
+                    })
+            elif angle < self.down_angle:
+                self.bent = True
+                self._min_angle = float(angle)
+        return events
+
+class LandmarkSession:
+    """Streaming state for one client
+
+    Keeps only the last window_size frames in a preallocated ring buffer, so
+    memory per session is fixed however long the stream runs.
+
+    Args:
+        window_size: Frames per classifier window
+        stride: Frames between classifications
+    """
+
+    def __init__(self, session_id, window_size=30, stride=15):
+        self.session_id = session_id
+        self.window_size = window_size
+        self.stride = max(int(stride), 1)
+        self.buffer = np.zeros((window_size, FRAME_FLOATS), dtype=np.float32)
+        self.frames_seen = 0
+        self._since_classified = 0
+        self.reps = RepCounter()
+        self.label = None
+
+    def reset(self):
+        self.frames_seen = 0
+        self._since_classified = 0
+        self.reps = RepCounter()
+        self.label = None
+
+    def window(self):
+        """The latest window in chronological order"""
+        start = self.frames_seen % self.window_size
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def push(self, frames):
+        """Append frames
+
+        At most one window is due per call, however many strides the frames
+        span, so a large message cannot flood the shared batcher.
+
+        Returns:
+            (window, end_frame, events): the latest window if at least stride
+            frames arrived since the last classification (else None), the
+            frame number it ends on, and rep events
+        """
+        events = self.reps.update(knee_angles(frames), self.frames_seen)
+        # Only the last window_size frames can remain in the buffer
+        skipped = max(len(frames) - self.window_size, 0)
+        self.frames_seen += skipped
+        for frame in frames[skipped:]:
+            self.buffer[self.frames_seen % self.window_size] = frame
+            self.frames_seen += 1
+        self._since_classified += len(frames)
+        if self.frames_seen >= self.window_size and self._since_classified >= self.stride:
+            self._since_classified = 0
+            return self.window(), self.frames_seen - 1, events
+        return None, None, events
@@ -0,0 +1,177 @@
+# python/llama_server/admission.py
+"""
+Token-budget admission control and client-disconnect cancellation for generation requests
+"""
+import asyncio
+import heapq
+import itertools
+import math
+
+import torch
+from transformers import StoppingCriteria
+
+# Lower value = served first. queue_share caps how much of the queue budget a class may fill,
+# so background work is shed before it can crowd out live requests.
+PRIORITY_CLASSES = {
+    "therapist_report": {"priority": 0, "queue_share": 1.0},
+    "interactive": {"priority": 1, "queue_share": 1.0},
+    "background": {"priority": 2, "queue_share": 0.5},
+}
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; carries the HTTP status and Retry-After seconds"""
+
+    def __init__(self, status_code, retry_after, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+class AdmissionController:
+    """Bounds the token budget of running and queued generations
+
+    A request's cost is its prompt length plus max_tokens. Requests run
+    while the in-flight budget allows; otherwise they wait in a priority
+    queue whose total budget is also bounded. A full queue is rejected
+    immediately with 429, and a request that waits longer than
+    max_queue_wait seconds is rejected with 503, both with a Retry-After
+    estimate from the recent token throughput. Must be used from one
+    event loop.
+
+    Args:
+        max_inflight_tokens: Token budget of generations running at once
+        max_queued_tokens: Token budget of requests waiting to run
+        max_queue_wait: Seconds a request may wait before it is rejected
+        priority_classes: Mapping of class name -> {priority, queue_share}
+    """
+
+    def __init__(self, max_inflight_tokens=4096, max_queued_tokens=16384, max_queue_wait=30.0,
+                 priority_classes=None):
+        self.max_inflight_tokens = max_inflight_tokens
+        self.max_queued_tokens = max_queued_tokens
+        self.max_queue_wait = max_queue_wait
+        self.priority_classes = priority_classes or PRIORITY_CLASSES
+        self.inflight_tokens = 0
+        self.queued_tokens = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._tokens_per_second = None
+        self.stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+                      "cancelled": 0, "completed": 0}
+
+    def _retry_after(self, tokens_ahead):
+        """Seconds until roughly tokens_ahead tokens of work have drained"""
+        rate = self._tokens_per_second or 50.0
+        return max(1, math.ceil(tokens_ahead / rate))
+
+    def _fits(self, cost):
+        return self.inflight_tokens + cost <= self.max_inflight_tokens
+
+    def _drop_finished(self):
+        """Remove waiters that timed out or were cancelled so they no longer hold up the queue"""
+        if any(future.done() for *_, future in self._waiting):
+            self._waiting = [entry for entry in self._waiting if not entry[3].done()]
+            heapq.heapify(self._waiting)
+
+    def _wake_waiters(self):
+        """Start queued requests in priority order while the head of the queue fits"""
+        while self._waiting:
+            _, _, cost, future = self._waiting[0]
+            if future.done():  # timed out or cancelled while queued
+                heapq.heappop(self._waiting)
+                continue
+            if not self._fits(cost):
+                break
+            heapq.heappop(self._waiting)
+            self.queued_tokens -= cost
+            self.inflight_tokens += cost
+            future.set_result(True)
+
+    async def acquire(self, cost, priority_class="interactive"):
+        """Wait until cost tokens of budget are available; raises Overloaded when saturated"""
+        if priority_class not in self.priority_classes:
+            raise ValueError(f"Unknown priority class {priority_class!r}, "
+                             f"expected one of {sorted(self.priority_classes)}")
+        cost = min(cost, self.max_inflight_tokens)  # an oversized request runs alone
+        settings = self.priority_classes[priority_class]
+
+        self._drop_finished()
+        if not self._waiting and self._fits(cost):
+            self.inflight_tokens += cost
+            self.stats["admitted"] += 1
+            return cost
+
+        if self.queued_tokens + cost > self.max_queued_tokens * settings["queue_share"]:
+            self.stats["rejected_queue_full"] += 1
+            raise Overloaded(429, self._retry_after(self.inflight_tokens + self.queued_tokens),
+                             "Generation queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (settings["priority"], next(self._sequence), cost, future))
+        self.queued_tokens += cost
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_queue_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted just as the wait ended; hand the budget back
+                self.release(cost, 0, 0.0)
+            else:
+                future.cancel()
+                self.queued_tokens -= cost
+                # Requests queued behind this one may fit now, or take the fast path
+                self._drop_finished()
+                self._wake_waiters()
+            if isinstance(e, asyncio.CancelledError):
+                self.stats["cancelled"] += 1
+                raise
+            self.stats["rejected_timeout"] += 1
+            raise Overloaded(503, self._retry_after(self.inflight_tokens + self.queued_tokens),
+                             "Timed out waiting for generation capacity")
+
+        self.stats["admitted"] += 1
+        return cost
+
+    def release(self, cost, tokens_generated=0, seconds=0.0):
+        """Return a request's budget and update the throughput estimate"""
+        self.inflight_tokens -= cost
+        if tokens_generated and seconds > 0:
+            rate = tokens_generated / seconds
+            self._tokens_per_second = rate if self._tokens_per_second is None else \
+                0.8 * self._tokens_per_second + 0.2 * rate
+            self.stats["completed"] += 1
+        self._wake_waiters()
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            "inflight_tokens": self.inflight_tokens,
+            "queued_tokens": self.queued_tokens,
+            "queued_requests": sum(1 for *_, future in self._waiting if not future.done()),
+            "tokens_per_second": self._tokens_per_second,
+        }
+
+class CancellationCriteria(StoppingCriteria):
+    """Stops generate() as soon as a threading.Event is set"""
+
+    def __init__(self, cancel_event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.cancel_event.is_set(),
+                          dtype=torch.bool, device=input_ids.device)
+
+async def watch_disconnect(http_request, cancel_event, pending=None, poll_interval=0.25):
+    """Set cancel_event once the HTTP client has disconnected
+
+    Args:
+        pending: Optional task (e.g. a queued AdmissionController.acquire) to
+            cancel on disconnect, so the request leaves the queue right away
+    """
+    while not cancel_event.is_set():
+        if await http_request.is_disconnected():
+            print("Client disconnected, stopping generation")
+            cancel_event.set()
+            if pending is not None:
+                pending.cancel()
+            return
+        await asyncio.sleep(poll_interval)
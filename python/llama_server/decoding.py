@@ -0,0 +1,131 @@
+# python/llama_server/decoding.py
+"""
+Assisted (speculative) decoding support: forward-pass counting and acceptance metrics
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+class ForwardCounter:
+    """Counts forward passes of a model per thread
+
+    Registered as a forward hook on the top-level module, so each call of the
+    model (one decoding step or one verification pass) counts once. Counts
+    are thread-local, which keeps concurrent requests apart.
+    """
+
+    def __init__(self, model):
+        self._local = threading.local()
+        self._handle = model.register_forward_hook(self._hook)
+
+    def _hook(self, module, inputs, output):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+    def remove(self):
+        self._handle.remove()
+
+class DraftSettings:
+    """Serializes changes to the shared draft model's proposal length
+
+    transformers reads num_assistant_tokens from the draft model's own
+    generation_config rather than per generate() call, so concurrent
+    generations may share the draft only while they want the same value;
+    a request with a different value waits until the draft is idle.
+    """
+
+    def __init__(self, draft_model):
+        self.draft_model = draft_model
+        self._condition = threading.Condition()
+        self._active = 0
+
+    @contextmanager
+    def use(self, num_assistant_tokens):
+        config = self.draft_model.generation_config
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._active == 0 or config.num_assistant_tokens == num_assistant_tokens
+            )
+            config.num_assistant_tokens = num_assistant_tokens
+            self._active += 1
+        try:
+            yield self.draft_model
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+class DecodingMetrics:
+    """Aggregated generation statistics per endpoint
+
+    In assisted generation every draft forward pass proposes one token and
+    every main-model pass verifies the proposals and adds one token of its
+    own, so accepted draft tokens = new tokens - main passes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, new_tokens, seconds, main_passes, draft_passes, speculative):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'speculative_requests': 0,
+                'new_tokens': 0,
+                'seconds': 0.0,
+                'main_forward_passes': 0,
+                'draft_tokens_proposed': 0,
+                'draft_tokens_accepted': 0,
+            })
+            stats['requests'] += 1
+            stats['new_tokens'] += new_tokens
+            stats['seconds'] += seconds
+            stats['main_forward_passes'] += main_passes
+            if speculative:
+                stats['speculative_requests'] += 1
+                stats['draft_tokens_proposed'] += draft_passes
+                stats['draft_tokens_accepted'] += max(min(new_tokens - main_passes, draft_passes), 0)
+
+    def snapshot(self):
+        """Return per-endpoint totals with derived rates"""
+        with self._lock:
+            report = {}
+            for endpoint, stats in self._endpoints.items():
+                report[endpoint] = {
+                    **stats,
+                    'tokens_per_second': stats['new_tokens'] / stats['seconds'] if stats['seconds'] else 0.0,
+                    'tokens_per_main_pass': (stats['new_tokens'] / stats['main_forward_passes']
+                                             if stats['main_forward_passes'] else 0.0),
+                    'acceptance_rate': (stats['draft_tokens_accepted'] / stats['draft_tokens_proposed']
+                                        if stats['draft_tokens_proposed'] else None),
+                }
+            return report
+
+class GenerationTimer:
+    """Measures one generate call: wall time and forward passes of each model"""
+
+    def __init__(self, main_counter, draft_counter=None):
+        self.main_counter = main_counter
+        self.draft_counter = draft_counter
+        self.seconds = 0.0
+        self.main_passes = 0
+        self.draft_passes = 0
+
+    def __enter__(self):
+        self.main_counter.reset()
+        if self.draft_counter is not None:
+            self.draft_counter.reset()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        self.main_passes = self.main_counter.count
+        self.draft_passes = self.draft_counter.count if self.draft_counter is not None else 0
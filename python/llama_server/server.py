@@ -1,23 +1,64 @@
 # python/llama_server/server.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from typing import Optional
+import os
+import asyncio
+import threading
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteriaList
 import uvicorn
 
+from decoding import ForwardCounter, DecodingMetrics, GenerationTimer, DraftSettings
+from admission import AdmissionController, Overloaded, CancellationCriteria, watch_disconnect
+
 app = FastAPI(title="PhysioFlow LLaMA API")
 
 # Model configuration
-MODEL_PATH = "path/to/your/llama/model"  # Update this
+MODEL_PATH = os.environ.get("PHYSIOFLOW_LLAMA_MODEL_PATH", "path/to/your/llama/model")  # Update this
+
+# Optional small draft model for assisted (speculative) decoding; must share the main model's tokenizer
+DRAFT_MODEL_PATH = os.environ.get("PHYSIOFLOW_DRAFT_MODEL_PATH")
+NUM_ASSISTANT_TOKENS = int(os.environ.get("PHYSIOFLOW_NUM_ASSISTANT_TOKENS", "5"))
+
+# Per-endpoint decoding settings; requests may still opt out with speculative=false
+ENDPOINT_DECODING = {
+    "generate": {"speculative": True, "num_assistant_tokens": NUM_ASSISTANT_TOKENS},
+    "analyze_exercise": {"speculative": True, "num_assistant_tokens": NUM_ASSISTANT_TOKENS},
+}
+
+# Priority class per route (see admission.PRIORITY_CLASSES); fixed by the server,
+# never taken from the request body, so clients cannot promote themselves.
+# Form analyses feed therapist reports; /background routes serve refreshes and
+# prefetches nobody is waiting on, so they are shed first under load
+ROUTE_PRIORITY = {
+    "/generate": "interactive",
+    "/analyze_exercise": "therapist_report",
+    "/background/generate": "background",
+    "/background/analyze_exercise": "background",
+}
+
+# Token budgets for admission control (prompt tokens + max_tokens per request)
+MAX_INFLIGHT_TOKENS = int(os.environ.get("PHYSIOFLOW_MAX_INFLIGHT_TOKENS", "4096"))
+MAX_QUEUED_TOKENS = int(os.environ.get("PHYSIOFLOW_MAX_QUEUED_TOKENS", "16384"))
+MAX_QUEUE_WAIT_S = float(os.environ.get("PHYSIOFLOW_MAX_QUEUE_WAIT_S", "30"))
+
+draft_model = None
+draft_settings = None
+main_counter = None
+draft_counter = None
+metrics = DecodingMetrics()
+admission = AdmissionController(MAX_INFLIGHT_TOKENS, MAX_QUEUED_TOKENS, MAX_QUEUE_WAIT_S)
 
 class TextRequest(BaseModel):
     prompt: str
     max_tokens: int = 256
     temperature: float = 0.7
+    speculative: Optional[bool] = None  # None uses the endpoint default
 
 @app.on_event("startup")
 async def load_model():
-    global tokenizer, model
+    global tokenizer, model, main_counter
     try:
         print("Loading Me-LLaMA model...")
         tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
@@ -26,38 +67,141 @@ async def load_model():
             torch_dtype=torch.float16, 
             device_map="auto"
         )
+        main_counter = ForwardCounter(model)
         print("Model loaded successfully!")
     except Exception as e:
         print(f"Error loading model: {e}")
         raise
 
-@app.post("/generate")
-async def generate_text(request: TextRequest):
+    if DRAFT_MODEL_PATH:
+        load_draft_model(DRAFT_MODEL_PATH)
+
+def load_draft_model(draft_path):
+    """Load the draft model; generation falls back to plain decoding if it is unusable"""
+    global draft_model, draft_settings, draft_counter
+    try:
+        print(f"Loading draft model from {draft_path}...")
+        candidate = AutoModelForCausalLM.from_pretrained(
+            draft_path,
+            torch_dtype=torch.float16,
+            device_map="auto"
+        )
+        # Draft tokens are passed to the main model as ids, so the vocabularies must match
+        if candidate.config.vocab_size != model.config.vocab_size:
+            print(f"Draft model vocabulary ({candidate.config.vocab_size}) does not match "
+                  f"the main model ({model.config.vocab_size}); speculative decoding disabled")
+            return
+        # A fixed proposal length per endpoint instead of transformers' adaptive schedule
+        candidate.generation_config.num_assistant_tokens_schedule = "constant"
+        draft_model = candidate
+        draft_settings = DraftSettings(draft_model)
+        draft_counter = ForwardCounter(draft_model)
+        print("Draft model loaded, speculative decoding enabled")
+    except Exception as e:
+        print(f"Error loading draft model, speculative decoding disabled: {e}")
+
+def _generate(prompt, request, endpoint, cancel_event=None):
+    """Generate a completion for prompt, with assisted decoding when enabled for the endpoint
+
+    Generation stops early once cancel_event is set.
+
+    Returns:
+        (text, number of new tokens, seconds)
+    """
+    decoding = ENDPOINT_DECODING[endpoint]
+    speculative = decoding["speculative"] if request.speculative is None else request.speculative
+    speculative = speculative and draft_model is not None
+
+    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    generate_kwargs = {
+        "attention_mask": inputs.attention_mask,
+        "max_new_tokens": request.max_tokens,
+        "temperature": request.temperature,
+        "do_sample": True,
+    }
+    if cancel_event is not None:
+        generate_kwargs["stopping_criteria"] = StoppingCriteriaList([CancellationCriteria(cancel_event)])
+
+    if speculative:
+        # The draft proposes num_assistant_tokens tokens and the main model verifies them in
+        # one forward pass; speculative sampling keeps the main model's output distribution
+        with draft_settings.use(decoding["num_assistant_tokens"]) as assistant:
+            with GenerationTimer(main_counter, draft_counter) as timer:
+                outputs = model.generate(inputs.input_ids, assistant_model=assistant, **generate_kwargs)
+    else:
+        with GenerationTimer(main_counter) as timer:
+            outputs = model.generate(inputs.input_ids, **generate_kwargs)
+
+    # Decode only the generated part (not the prompt)
+    new_tokens = outputs[0][inputs.input_ids.shape[1]:]
+    metrics.record(endpoint, len(new_tokens), timer.seconds, timer.main_passes, timer.draft_passes, speculative)
+    return tokenizer.decode(new_tokens, skip_special_tokens=True), len(new_tokens), timer.seconds
+
+async def _run_generation(http_request, prompt, request, endpoint, route):
+    """Admit, run and (on client disconnect) cancel a generation
+
+    Generation runs in a worker thread so the event loop can keep polling
+    for disconnects and serving other requests. A client that disconnects
+    while queued is removed from the admission queue immediately.
+
+    Returns:
+        Generated text, or None if the client disconnected
+    """
+    cost = len(tokenizer(prompt).input_ids) + request.max_tokens
+    cancel_event = threading.Event()
+    admit = asyncio.ensure_future(admission.acquire(cost, ROUTE_PRIORITY[route]))
+    watcher = asyncio.create_task(watch_disconnect(http_request, cancel_event, pending=admit))
+    try:
+        try:
+            cost = await admit
+        except asyncio.CancelledError:
+            if cancel_event.is_set():  # the watcher cancelled the queued request
+                print(f"Client left /{endpoint} while queued")
+                return None
+            raise
+        tokens, seconds = 0, 0.0
+        try:
+            # The client may have left while the request was queued
+            if cancel_event.is_set():
+                return None
+            loop = asyncio.get_running_loop()
+            text, tokens, seconds = await loop.run_in_executor(
+                None, _generate, prompt, request, endpoint, cancel_event
+            )
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+        finally:
+            admission.release(cost, tokens, seconds)
+        if cancel_event.is_set():
+            print(f"Generation for /{endpoint} cancelled after {tokens} tokens")
+            return None
+        return text
+    finally:
+        watcher.cancel()
+
+def _overloaded_error(e):
+    return HTTPException(status_code=e.status_code, detail=e.detail,
+                         headers={"Retry-After": str(e.retry_after)})
+
+async def _generate_text(request, http_request, route):
     try:
         # Prepare exercise-specific prompt
         exercise_prompt = f"""As a physiotherapy AI assistant for PhysioFlow, 
         provide guidance on the following: {request.prompt}"""
         
         # Generate response
-        inputs = tokenizer(exercise_prompt, return_tensors="pt").to(model.device)
-        outputs = model.generate(
-            inputs.input_ids,
-            max_new_tokens=request.max_tokens,
-            temperature=request.temperature,
-            do_sample=True,
-        )
-        
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        # Extract just the generated part (remove the prompt)
-        response = response[len(exercise_prompt):]
+        response = await _run_generation(http_request, exercise_prompt, request, "generate", route)
         
-        return {"generated_text": response.strip()}
+        return {"generated_text": (response or "").strip()}
+    except Overloaded as e:
+        raise _overloaded_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
 
-@app.post("/analyze_exercise")
-async def analyze_exercise(request: TextRequest):
-    """Analyze exercise form based on description"""
+async def _analyze_exercise(request, http_request, route):
     try:
         analysis_prompt = f"""As a physiotherapy expert, analyze the following 
         exercise form and provide feedback: {request.prompt}
@@ -72,20 +216,44 @@ async def analyze_exercise(request: TextRequest):
         """
         
         # Generate analysis
-        inputs = tokenizer(analysis_prompt, return_tensors="pt").to(model.device)
-        outputs = model.generate(
-            inputs.input_ids,
-            max_new_tokens=request.max_tokens,
-            temperature=request.temperature,
-            do_sample=True,
-        )
+        analysis = await _run_generation(http_request, analysis_prompt, request, "analyze_exercise", route)
         
-        analysis = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        analysis = analysis[len(analysis_prompt):]
-        
-        return {"analysis": analysis.strip()}
+        return {"analysis": (analysis or "").strip()}
+    except Overloaded as e:
+        raise _overloaded_error(e)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
 
+@app.post("/generate")
+async def generate_text(request: TextRequest, http_request: Request):
+    return await _generate_text(request, http_request, "/generate")
+
+@app.post("/analyze_exercise")
+async def analyze_exercise(request: TextRequest, http_request: Request):
+    """Analyze exercise form based on description"""
+    return await _analyze_exercise(request, http_request, "/analyze_exercise")
+
+@app.post("/background/generate")
+async def generate_text_background(request: TextRequest, http_request: Request):
+    """/generate at background priority, for refreshes and prefetches"""
+    return await _generate_text(request, http_request, "/background/generate")
+
+@app.post("/background/analyze_exercise")
+async def analyze_exercise_background(request: TextRequest, http_request: Request):
+    """/analyze_exercise at background priority, for refreshes and prefetches"""
+    return await _analyze_exercise(request, http_request, "/background/analyze_exercise")
+
+@app.get("/metrics")
+async def get_metrics():
+    """Throughput and draft acceptance statistics per endpoint"""
+    return {
+        "speculative_decoding": draft_model is not None,
+        "draft_model": DRAFT_MODEL_PATH if draft_model is not None else None,
+        "endpoints": metrics.snapshot(),
+        "admission": admission.snapshot(),
+    }
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)